@@ -0,0 +1,274 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024  # Bytes read at a time when hashing an artifact
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_sha256(value: str) -> bool:
+    """A lowercase hex SHA-256 digest, the only form object names take, so never a path"""
+    return isinstance(value, str) and SHA256_PATTERN.fullmatch(value) is not None
+
+
+def file_sha256(path: str, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """Hash a file without reading it into memory at once"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def copy_file(source: str, destination: str):
+    """Atomically make destination a private copy of source"""
+    tmp_path = f"{destination}.copy.tmp"
+    with open(source, "rb") as src, open(tmp_path, "wb") as dst:
+        for chunk in iter(lambda: src.read(HASH_CHUNK_SIZE), b""):
+            dst.write(chunk)
+    os.replace(tmp_path, destination)
+
+
+def link_or_copy(source: str, destination: str):
+    """Atomically make destination the same bytes as source, sharing them via a hard link when possible"""
+    tmp_path = f"{destination}.link.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        # Different filesystems: fall back to a private copy
+        copy_file(source, destination)
+        return
+    os.replace(tmp_path, destination)
+
+
+class ArtifactStore:
+    """
+    Model files stored once by the SHA-256 of their content under objects/,
+    with refs.json mapping each file name in models_dir to the hash it holds.
+    Model files the store puts in the models directory are hard links to their
+    object, so identical models under several names share one copy on disk, and
+    promoting a stored hash under a name is a link swap rather than a new upload.
+    Files found there at startup are adopted by copying them into the store.
+    Objects no longer referenced are garbage collected, keeping the `keep_unreferenced`
+    most recently referenced and any referenced within `min_age_sec`. Objects are
+    never written in place, so a hash always describes its object's bytes.
+    Thread-safe: used from the model I/O pool.
+    """
+
+    def __init__(self, root: str, models_dir: str, keep_unreferenced: int = 5, min_age_sec: float = 3600):
+        self.root = root
+        self.models_dir = models_dir
+        self.objects_dir = os.path.join(root, "objects")
+        # Uploads are written here, on the same filesystem as objects/ so ingesting them is a rename
+        self.incoming_dir = os.path.join(root, "incoming")
+        self.refs_path = os.path.join(root, "refs.json")
+        self.keep_unreferenced = keep_unreferenced
+        self.min_age_sec = min_age_sec
+        self._lock = threading.RLock()  # Reentrant: link records the ref while holding it
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.incoming_dir, exist_ok=True)
+        saved = self._read_refs()
+        self._refs = saved.get("refs", {})
+        self._last_used = saved.get("lastUsed", {})  # Hash -> when a name last pointed at it
+        self.deduplicated = 0
+        self.collected = 0
+
+    def _read_refs(self) -> dict:
+        try:
+            with open(self.refs_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable artifact refs {self.refs_path}: {e}")
+            return {}
+
+    def _write_refs(self):
+        tmp_path = f"{self.refs_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"refs": self._refs, "lastUsed": self._last_used}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.refs_path)
+
+    def object_path(self, sha256: str) -> str:
+        if not is_sha256(sha256):
+            raise ValueError(f"Invalid artifact hash {sha256!r}")
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    def has(self, sha256: str) -> bool:
+        return is_sha256(sha256) and os.path.exists(self.object_path(sha256))
+
+    def names(self, sha256: str) -> list:
+        """Model file names currently holding this content"""
+        with self._lock:
+            return sorted(name for name, ref in self._refs.items() if ref["sha256"] == sha256)
+
+    def ref(self, name: str) -> Optional[str]:
+        with self._lock:
+            ref = self._refs.get(name)
+        return ref["sha256"] if ref is not None else None
+
+    def ingest(self, path: str, sha256: Optional[str] = None) -> str:
+        """
+        Move a verified file into the store, hashing it if its hash is not given.
+        If the content is already stored, the file is dropped instead.
+        Returns the hash; the caller links it to a name with `link`.
+        """
+        sha256 = sha256 or file_sha256(path)
+        destination = self.object_path(sha256)
+        with self._lock:
+            if os.path.exists(destination):
+                os.remove(path)
+                self.deduplicated += 1
+            else:
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                os.replace(path, destination)
+        return sha256
+
+    def link(self, sha256: str, name: str):
+        """
+        Point a model file name at stored content, replacing whatever the name held before.
+        Checked and linked under the lock, so gc cannot remove the object in between;
+        raises FileNotFoundError if it is not stored.
+        """
+        source = self.object_path(sha256)
+        with self._lock:
+            if not os.path.exists(source):
+                raise FileNotFoundError(f"Artifact {sha256} not found")
+            link_or_copy(source, os.path.join(self.models_dir, name))
+            self._set_ref(sha256, name)
+
+    def _set_ref(self, sha256: str, name: str):
+        stat = os.stat(os.path.join(self.models_dir, name))
+        with self._lock:
+            previous = self._refs.get(name)
+            now = time.time()
+            if previous is not None:
+                self._last_used[previous["sha256"]] = now
+            self._last_used[sha256] = now
+            self._refs[name] = {"sha256": sha256, "sizeBytes": stat.st_size, "mtimeNs": stat.st_mtime_ns}
+            self._write_refs()
+
+    def adopt(self, name: str) -> str:
+        """Bring an existing model file into the store, unless refs already record it unchanged"""
+        path = os.path.join(self.models_dir, name)
+        stat = os.stat(path)
+        with self._lock:
+            ref = self._refs.get(name)
+        if ref is not None and (ref["sizeBytes"], ref["mtimeNs"]) == (stat.st_size, stat.st_mtime_ns) and \
+                self.has(ref["sha256"]):
+            return ref["sha256"]
+        sha256 = file_sha256(path)
+        if not self.has(sha256):
+            os.makedirs(os.path.dirname(self.object_path(sha256)), exist_ok=True)
+            # Copied, not linked: the file is not the store's, and writing to it in place must not change the object
+            copy_file(path, self.object_path(sha256))
+        else:
+            self.deduplicated += 1
+        # The file already holds these bytes: it is recorded as is, never rewritten under a running server
+        self._set_ref(sha256, name)
+        return sha256
+
+    def adopt_all(self, suffix: str = ".joblib") -> dict:
+        """Adopt every model file in models_dir, returning each name's hash"""
+        return {
+            name: self.adopt(name) for name in sorted(os.listdir(self.models_dir))
+            if name.endswith(suffix) and not name.startswith(".")
+        }
+
+    def verify(self, sha256: str) -> bool:
+        """Re-hash a stored object; a corrupt object is removed so it is uploaded again"""
+        path = self.object_path(sha256)
+        if file_sha256(path) == sha256:
+            return True
+        logger.warning(f"Artifact {sha256} failed its integrity check and was removed")
+        os.remove(path)
+        return False
+
+    def _object_hashes(self) -> list:
+        return [
+            sha256 for prefix in os.listdir(self.objects_dir)
+            for sha256 in os.listdir(os.path.join(self.objects_dir, prefix)) if not sha256.endswith(".tmp")
+        ]
+
+    def gc(self, now: Optional[float] = None) -> list:
+        """Remove unreferenced objects beyond the keep_unreferenced most recently used, unless used within min_age_sec"""
+        now = time.time() if now is None else now
+        with self._lock:
+            referenced = {ref["sha256"] for ref in self._refs.values()}
+            unreferenced = sorted((
+                (self._last_used.get(sha256) or os.stat(self.object_path(sha256)).st_mtime, sha256)
+                for sha256 in self._object_hashes() if sha256 not in referenced
+            ), reverse=True)
+            removed = [
+                sha256 for used_at, sha256 in unreferenced[self.keep_unreferenced:]
+                if now - used_at >= self.min_age_sec
+            ]
+            for sha256 in removed:
+                os.remove(self.object_path(sha256))
+                self._last_used.pop(sha256, None)
+            if removed:
+                self._write_refs()
+            self.collected += len(removed)
+        if removed:
+            logger.info(f"Artifact store collected {len(removed)} unreferenced objects")
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            refs = {name: ref["sha256"] for name, ref in self._refs.items()}
+        objects = [self.object_path(sha256) for sha256 in self._object_hashes()]
+        return {
+            "objects": len(objects),
+            "storedBytes": sum(os.path.getsize(path) for path in objects),
+            "refs": refs,
+            "deduplicated": self.deduplicated,
+            "collected": self.collected
+        }
+
+
+class LoadedModels:
+    """
+    Deserialized, warmed-up models by content hash, so promoting a hash that was
+    served recently reuses the model object instead of loading it again.
+    Only accessed from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, max_size: int = 4):
+        self.max_size = max_size
+        self._models = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, sha256: str):
+        model = self._models.get(sha256)
+        if model is None:
+            self.misses += 1
+            return None
+        self._models.move_to_end(sha256)
+        self.hits += 1
+        return model
+
+    def put(self, sha256: str, model):
+        if self.max_size <= 0:
+            return
+        self._models[sha256] = model
+        self._models.move_to_end(sha256)
+        while len(self._models) > self.max_size:
+            self._models.popitem(last=False)
+
+    def __contains__(self, sha256: str) -> bool:
+        return sha256 in self._models
+
+    def stats(self) -> dict:
+        return {"size": len(self._models), "maxSize": self.max_size, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from typing import Callable
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row predictions into one model call.
+    Requests are queued, a background task drains the queue every max_wait_ms
+    or as soon as max_batch_size rows are waiting, runs predict_fn once over
+    the stacked rows off the event loop and resolves each caller's future.
+    If an executor (api.executor.BoundedExecutor) is given, predict_fn runs in it.
+    """
+
+    def __init__(
+            self,
+            predict_fn: Callable,
+            max_batch_size: int = 64,
+            max_wait_ms: float = 5,
+            executor=None
+        ):
+        self.predict_fn = predict_fn
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._task = None
+        self._batch = []  # Requests taken off the queue by the drain task and not resolved yet
+
+    def start(self):
+        """Start the background drain task on the running event loop."""
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the drain task and fail any requests still waiting, including a batch it was collecting or scoring."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        waiting, self._batch = self._batch, []
+        while self._queue is not None and not self._queue.empty():
+            waiting.append(self._queue.get_nowait())
+        for _, future in waiting:
+            if not future.done():
+                future.set_exception(RuntimeError("Batcher stopped before prediction"))
+
+    async def submit(self, row: np.ndarray):
+        """Queue a single observation and wait for its own prediction."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = self._batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+            self._batch = []
+
+    async def _flush(self, batch):
+        rows = np.vstack([row for row, _ in batch])
+        try:
+            if self.executor is not None:
+                predictions = await self.executor.run(self.predict_fn, rows)
+            else:
+                predictions = await asyncio.get_running_loop().run_in_executor(None, self.predict_fn, rows)
+        except Exception as e:
+            logger.warning(f"Batched prediction of {len(batch)} rows failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), prediction in zip(batch, predictions):
+            if not future.done():
+                future.set_result(prediction)
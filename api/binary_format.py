@@ -0,0 +1,102 @@
+import io
+import struct
+from typing import Optional
+
+import numpy as np
+
+from api.schema_config import FEATURE_NAMES
+
+
+NPY_MEDIA_TYPE = "application/x-npy"
+RAW_MEDIA_TYPE = "application/octet-stream"
+BINARY_MEDIA_TYPES = (NPY_MEDIA_TYPE, RAW_MEDIA_TYPE)
+
+# Raw bodies start with the number of rows and columns as little-endian uint32,
+# followed by row-major little-endian floats. "dtype=float32" may be given as a
+# Content-Type parameter, float64 is the default.
+RAW_HEADER = struct.Struct("<II")
+RAW_DTYPES = {"float32": np.dtype("<f4"), "float64": np.dtype("<f8")}
+
+MAX_REPORTED_ERRORS = 20
+
+
+def parse_media_type(header_value: Optional[str]):
+    """Split a Content-Type/Accept value into its media type and parameters."""
+    media_type, *params = (header_value or "").split(";")
+    params = dict(p.strip().split("=", 1) for p in params if "=" in p)
+    return media_type.strip().lower(), {k.lower(): v.strip() for k, v in params.items()}
+
+
+def is_binary(content_type: Optional[str]) -> bool:
+    return parse_media_type(content_type)[0] in BINARY_MEDIA_TYPES
+
+
+def response_media_type(accept: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """Binary media type to answer with, or None for JSON.
+    An explicit binary Accept wins, otherwise binary requests get binary responses
+    unless the client asked for JSON."""
+    accepted = [parse_media_type(value)[0] for value in (accept or "").split(",")]
+    for media_type in accepted:
+        if media_type in BINARY_MEDIA_TYPES:
+            return media_type
+    request_type = parse_media_type(content_type)[0]
+    if request_type in BINARY_MEDIA_TYPES and not any(t in ("application/json", "application/*") for t in accepted):
+        return request_type
+    return None
+
+
+def decode_observations(body: bytes, content_type: str) -> np.ndarray:
+    """Decode a binary body into an (n_rows, n_features) array without copying the data.
+    Raises ValueError if the body is malformed."""
+    media_type, params = parse_media_type(content_type)
+    if media_type == NPY_MEDIA_TYPE:
+        buffer = io.BytesIO(body)
+        version = np.lib.format.read_magic(buffer)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(buffer)
+        if dtype not in RAW_DTYPES.values():
+            raise ValueError(f"Unsupported .npy dtype {dtype}, expected little-endian float32 or float64")
+        count = int(np.prod(shape))
+        if len(body) - buffer.tell() != count * dtype.itemsize:
+            raise ValueError("The .npy body length does not match its header")
+        observations = np.frombuffer(body, dtype=dtype, count=count, offset=buffer.tell())
+        observations = observations.reshape(shape, order="F" if fortran_order else "C")
+    elif media_type == RAW_MEDIA_TYPE:
+        dtype = RAW_DTYPES.get(params.get("dtype", "float64"))
+        if dtype is None:
+            raise ValueError(f"Unsupported dtype '{params['dtype']}', expected one of {list(RAW_DTYPES)}")
+        if len(body) < RAW_HEADER.size:
+            raise ValueError("The body is shorter than the raw shape header")
+        n_rows, n_cols = RAW_HEADER.unpack_from(body)
+        if len(body) - RAW_HEADER.size != n_rows * n_cols * dtype.itemsize:
+            raise ValueError("The body length does not match its shape header")
+        observations = np.frombuffer(body, dtype=dtype, offset=RAW_HEADER.size).reshape(n_rows, n_cols)
+    else:
+        raise ValueError(f"Unsupported media type '{media_type}'")
+
+    if observations.ndim != 2 or observations.shape[1] != len(FEATURE_NAMES):
+        raise ValueError(f"Expected shape (n_rows, {len(FEATURE_NAMES)}), found {observations.shape}")
+    return observations
+
+
+def validate_observations(observations: np.ndarray) -> list:
+    """Vectorized equivalent of the Iris schema's gt=0 checks.
+    Returns pydantic-style errors located by row index and feature name."""
+    valid = np.isfinite(observations) & (observations > 0)
+    if valid.all():
+        return []
+    rows, cols = np.nonzero(~valid)
+    return [
+        {"loc": (row, FEATURE_NAMES[col]), "msg": "Input should be a finite number greater than 0", "type": "greater_than"}
+        for row, col in zip(rows[:MAX_REPORTED_ERRORS].tolist(), cols[:MAX_REPORTED_ERRORS].tolist())
+    ]
+
+
+def encode_predictions(predictions, media_type: str) -> bytes:
+    """Encode predicted classes as int64 in the requested binary format."""
+    predictions = np.asarray(predictions, dtype="<i8")
+    if media_type == NPY_MEDIA_TYPE:
+        buffer = io.BytesIO()
+        np.save(buffer, predictions, allow_pickle=False)
+        return buffer.getvalue()
+    return RAW_HEADER.pack(len(predictions), 1) + predictions.tobytes()
@@ -0,0 +1,52 @@
+"""
+Score a newline-delimited JSON file of Iris observations with constant memory.
+
+    python -m api.bulk_score observations.jsonl -o predictions.jsonl --model api/prod_models/rf-12-base.joblib
+
+Lines are read incrementally, scored in chunks through one vectorized predict
+per chunk and written out as they are produced, in the same format as the
+API's /predict_stream endpoint. Malformed lines are reported inline.
+"""
+import argparse
+import sys
+
+import joblib
+
+from api.forest_engine import compile_model
+from api.ndjson_scoring import DEFAULT_CHUNK_SIZE, DEFAULT_MAX_LINE_BYTES, score_ndjson_lines, split_lines
+
+
+READ_SIZE = 1024 * 1024  # Bytes read from the input at a time
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk score an NDJSON file of Iris observations.")
+    parser.add_argument("input", help="NDJSON file with one observation per line, '-' for stdin")
+    parser.add_argument("-o", "--output", default="-", help="Where to write NDJSON results, '-' for stdout")
+    parser.add_argument("--model", default="api/prod_models/rf-12-base.joblib", help="joblib model file")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per predict call")
+    parser.add_argument(
+        "--max-line-bytes", type=int, default=DEFAULT_MAX_LINE_BYTES, help="Longer lines are reported as malformed"
+    )
+    parser.add_argument("--compiled", action="store_true", help="Use the compiled forest inference backend")
+    args = parser.parse_args(argv)
+
+    model = joblib.load(args.model)
+    if args.compiled:
+        model = compile_model(model)
+
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    target = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        lines = split_lines(iter(lambda: source.read(READ_SIZE), b""), args.max_line_bytes)
+        for results in score_ndjson_lines(lines, model.predict, args.chunk_size):
+            target.write(results)
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if target is not sys.stdout.buffer:
+            target.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Compact, quantized file format for forest classifiers, and an exporter that checks it.
+
+    python -m api.compact_forest --models-dir scheduled_task/retrained_models --data api/tests/data -o compact_models
+
+Trees are repacked from scikit-learn's float64 node arrays into the smallest types
+that hold them: float32 thresholds (rounded down, so float32 features compare
+exactly as against the float64 originals), uint8 feature indices, uint16/uint32
+child pointers and one table of deduplicated leaf probabilities. The arrays can be
+compressed with zlib or lzma, or zstd/lz4 when those packages are installed.
+Every export is checked against the original model on the given rows, before and
+after a round trip through the file, and reports its size and load time next to joblib's.
+"""
+import argparse
+import io
+import json
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+from api.forest_engine import CompiledForest, compile_model
+
+
+COMPACT_MAGIC = b"IRISCOMPACT\x01"
+COMPACT_ARRAYS = ("feature", "threshold", "left", "right", "leaf_index", "leaf_values", "roots", "classes_")
+COMPRESSIONS = ("none", "zlib", "lzma", "zstd", "lz4")
+
+
+def smallest_uint(max_value: int, candidates=(np.uint8, np.uint16, np.uint32)) -> np.dtype:
+    for dtype in candidates:
+        if max_value <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.uint64)
+
+
+# Node pointers are at least 16-bit: uint8 would only save bytes on toy forests
+POINTER_TYPES = (np.uint16, np.uint32)
+
+
+def float32_at_most(values: np.ndarray) -> np.ndarray:
+    """The largest float32 not above each value: for any float32 x, x <= result exactly when x <= value"""
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def compressor(compression: str):
+    """(compress, decompress) functions for a codec; zstd and lz4 are optional dependencies"""
+    if compression == "none":
+        return bytes, bytes
+    if compression == "zlib":
+        import zlib
+        return (lambda data: zlib.compress(data, 9)), zlib.decompress
+    if compression == "lzma":
+        import lzma
+        return lzma.compress, lzma.decompress
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstd compression needs the 'zstandard' package")
+        return zstandard.ZstdCompressor(level=19).compress, zstandard.ZstdDecompressor().decompress
+    if compression == "lz4":
+        try:
+            import lz4.frame
+        except ImportError:
+            raise ImportError("lz4 compression needs the 'lz4' package")
+        return lz4.frame.compress, lz4.frame.decompress
+    raise ValueError(f"Unknown compression '{compression}', expected one of {COMPRESSIONS}")
+
+
+class CompactForest(CompiledForest):
+    """
+    A compiled forest stored in compact types, evaluated like CompiledForest.
+    Leaves hold an index into a table of distinct probability rows instead of
+    their own row, which most leaves of fully grown trees share.
+    Predictions match the compiled forest exactly.
+    """
+
+    def __init__(
+            self, feature, threshold, left, right, leaf_index, leaf_values, roots, max_depth, classes, n_features_in
+        ):
+        super().__init__(feature, threshold, left, right, None, roots, max_depth, classes, n_features_in)
+        self.leaf_index = leaf_index
+        self.leaf_values = leaf_values
+
+    @classmethod
+    def from_compiled(cls, compiled: CompiledForest) -> "CompactForest":
+        is_leaf = compiled.left == np.arange(len(compiled.left))
+        leaf_values, leaf_inverse = np.unique(compiled.leaf_proba[is_leaf], axis=0, return_inverse=True)
+        leaf_index = np.zeros(len(compiled.left), dtype=smallest_uint(max(len(leaf_values) - 1, 0), POINTER_TYPES))
+        leaf_index[is_leaf] = leaf_inverse.ravel()
+        pointer = smallest_uint(len(compiled.left) - 1, POINTER_TYPES)
+        return cls(
+            feature=compiled.feature.astype(smallest_uint(compiled.n_features_in_ - 1)),
+            threshold=float32_at_most(compiled.threshold),
+            left=compiled.left.astype(pointer),
+            right=compiled.right.astype(pointer),
+            leaf_index=leaf_index,
+            leaf_values=leaf_values,
+            roots=compiled.roots.astype(pointer),
+            max_depth=compiled.max_depth,
+            classes=compiled.classes_,
+            n_features_in=compiled.n_features_in_
+        )
+
+    @classmethod
+    def from_sklearn(cls, forest) -> "CompactForest":
+        return cls.from_compiled(CompiledForest.from_sklearn(forest))
+
+    def predict_proba(self, X) -> np.ndarray:
+        proba = self.leaf_values[self.leaf_index[self.apply(X)]].sum(axis=1)
+        proba /= self.n_estimators
+        return proba
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in COMPACT_ARRAYS)
+
+    def save(self, path: str, compression: str = "zlib"):
+        """Write the arrays, compressed as one payload, and rename the file into place atomically"""
+        compress, _ = compressor(compression)
+        arrays = {name: np.ascontiguousarray(getattr(self, name)) for name in COMPACT_ARRAYS}
+        specs, offset = {}, 0
+        for name, array in arrays.items():
+            specs[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset += array.nbytes
+        payload = compress(b"".join(array.tobytes() for array in arrays.values()))
+        header = json.dumps({
+            "max_depth": self.max_depth, "n_features_in": self.n_features_in_,
+            "compression": compression, "arrays": specs
+        }).encode()
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(COMPACT_MAGIC + struct.pack("<Q", len(header)) + header + payload)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @classmethod
+    def load(cls, path: str) -> "CompactForest":
+        with open(path, "rb") as f:
+            if f.read(len(COMPACT_MAGIC)) != COMPACT_MAGIC:
+                raise ValueError(f"{path} is not a compact forest file")
+            (header_length,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_length))
+            _, decompress = compressor(header["compression"])
+            payload = decompress(f.read())
+
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype, shape = np.dtype(spec["dtype"]), tuple(spec["shape"])
+            arrays[name] = np.frombuffer(
+                payload, dtype=dtype, count=int(np.prod(shape)), offset=spec["offset"]
+            ).reshape(shape)
+        return cls(
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            left=arrays["left"],
+            right=arrays["right"],
+            leaf_index=arrays["leaf_index"],
+            leaf_values=arrays["leaf_values"],
+            roots=arrays["roots"],
+            max_depth=header["max_depth"],
+            classes=arrays["classes_"],
+            n_features_in=header["n_features_in"]
+        )
+
+
+def check_parity(reference, candidate, X) -> None:
+    """Raise ValueError unless candidate predicts exactly what reference does on X"""
+    if not np.array_equal(reference.predict(X), candidate.predict(X)):
+        raise ValueError("Compact forest predictions differ from the original model")
+    if not np.array_equal(reference.predict_proba(X), candidate.predict_proba(X)):
+        raise ValueError("Compact forest probabilities differ from the original model")
+
+
+def export_compact_model(
+        model, path: str, X, compression: str = "zlib", compiled: CompiledForest = None, compare_joblib: bool = True
+    ) -> dict:
+    """
+    Write model as a compact forest file after checking it against the model on X,
+    then load the file back and check it again. Nothing is written if a check fails.
+    Returns the compact file's size and load time, next to those of the model's
+    joblib form if compare_joblib (which serializes the model once more, so
+    serving exports skip it). Pass `compiled` if the model was already compiled.
+    """
+    compiled = compiled if compiled is not None else compile_model(model)
+    if not isinstance(compiled, CompiledForest):
+        raise ValueError(f"{type(model).__name__} is not a forest classifier")
+    compact = CompactForest.from_compiled(compiled)
+    # The compiled forest is the reference: it is what the API serves, and its
+    # predictions already match scikit-learn's
+    check_parity(compiled, compact, X)
+    if not np.array_equal(model.predict(X), compact.predict(X)):
+        raise ValueError("Compact forest predictions differ from the original model")
+
+    compact.save(path, compression)
+    start = time.perf_counter()
+    loaded = CompactForest.load(path)
+    compact_load_ms = (time.perf_counter() - start) * 1000
+    try:
+        check_parity(compact, loaded, X)
+    except ValueError:
+        os.remove(path)
+        raise
+
+    report = {
+        "compression": compression,
+        "parityRows": len(X),
+        "nodes": len(compact.left),
+        "distinctLeaves": len(compact.leaf_values),
+        "compactBytes": os.path.getsize(path),
+        "inMemoryBytes": compact.nbytes,
+        "compactLoadMs": round(compact_load_ms, 3)
+    }
+    if compare_joblib:
+        report.update(joblib_comparison(model, report["compactBytes"]))
+    return report
+
+
+def joblib_comparison(model, compact_bytes: int) -> dict:
+    """Size and load time of the model's joblib form, for the export report"""
+    import joblib
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    start = time.perf_counter()
+    joblib.load(io.BytesIO(buffer.getvalue()))
+    joblib_load_ms = (time.perf_counter() - start) * 1000
+
+    joblib_bytes = buffer.getbuffer().nbytes
+    return {
+        "joblibBytes": joblib_bytes,
+        "sizeRatio": round(compact_bytes / joblib_bytes, 4),
+        "joblibLoadMs": round(joblib_load_ms, 3)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export forest models to the compact format with parity checks.")
+    parser.add_argument("--models-dir", default="scheduled_task/retrained_models")
+    parser.add_argument("--data", default="api/tests/data", help="Directory with X_test.npy to check parity on")
+    parser.add_argument("-o", "--output-dir", default="compact_models")
+    parser.add_argument("--compression", default="zlib", choices=COMPRESSIONS)
+    args = parser.parse_args(argv)
+
+    import joblib
+
+    X = np.load(os.path.join(args.data, "X_test.npy"))
+    os.makedirs(args.output_dir, exist_ok=True)
+    report = {}
+    for model_file in sorted(os.listdir(args.models_dir)):
+        model = joblib.load(os.path.join(args.models_dir, model_file))
+        path = os.path.join(args.output_dir, f"{model_file.split('.')[0]}.cforest")
+        report[model_file] = export_compact_model(model, path, X, args.compression)
+        print(f"{model_file:<20} {json.dumps(report[model_file])}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+import time
+from typing import Sequence
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# Fixed bins shared by the live window and the reference, so both are always comparable.
+# Iris measurements are in cm, values past the last edge fall in an overflow bin.
+DEFAULT_BIN_EDGES = np.arange(0.5, 10.01, 0.5)
+PSI_EPSILON = 1e-4  # Smoothing for empty bins in the population stability index
+
+
+class DriftMonitor:
+    """
+    Streaming histograms of production features and predicted classes over a
+    sliding time window, compared on demand with a stored reference profile.
+    The window is a ring of `n_slots` sub-windows: each prediction only adds to
+    the counts of the current slot, and slots older than the window are
+    cleared as the ring turns, so no raw observations are kept.
+    Only accessed from the event loop, so no locking is needed.
+    """
+
+    def __init__(
+            self,
+            feature_names: Sequence[str],
+            n_classes: int,
+            window_sec: float = 3600,
+            n_slots: int = 12,
+            bin_edges: np.ndarray = DEFAULT_BIN_EDGES,
+            clock=time.monotonic
+        ):
+        self.feature_names = list(feature_names)
+        self.n_classes = n_classes
+        self.bin_edges = np.asarray(bin_edges, dtype=np.float64)
+        self.n_bins = len(self.bin_edges) + 1
+        self.slot_sec = window_sec / n_slots
+        self.clock = clock
+        self.feature_counts = np.zeros((n_slots, len(self.feature_names), self.n_bins), dtype=np.int64)
+        self.class_counts = np.zeros((n_slots, n_classes), dtype=np.int64)
+        self.slot_epochs = np.full(n_slots, -1, dtype=np.int64)
+        self.reference = None
+
+    def _current_slot(self) -> int:
+        epoch = int(self.clock() // self.slot_sec)
+        slot = epoch % len(self.slot_epochs)
+        if self.slot_epochs[slot] != epoch:
+            self.feature_counts[slot] = 0
+            self.class_counts[slot] = 0
+            self.slot_epochs[slot] = epoch
+        return slot
+
+    def observe(self, observations: np.ndarray, predictions):
+        """Add scored rows to the current slot: a bin lookup and a bincount, no copies kept"""
+        slot = self._current_slot()
+        n_features = len(self.feature_names)
+        bins = np.searchsorted(self.bin_edges, observations, side="right")
+        offsets = np.arange(n_features) * self.n_bins
+        self.feature_counts[slot] += np.bincount(
+            (bins + offsets).ravel(), minlength=n_features * self.n_bins
+        ).reshape(n_features, self.n_bins)
+        predictions = np.asarray(predictions, dtype=np.int64)
+        self.class_counts[slot] += np.bincount(predictions.clip(0, self.n_classes - 1), minlength=self.n_classes)
+
+    def window(self) -> dict:
+        """Counts summed over the slots still inside the window"""
+        self._current_slot()
+        current_epoch = int(self.clock() // self.slot_sec)
+        live = self.slot_epochs > current_epoch - len(self.slot_epochs)
+        return {
+            "featureCounts": self.feature_counts[live].sum(axis=0),
+            "classCounts": self.class_counts[live].sum(axis=0)
+        }
+
+    def set_reference(self, feature_counts: np.ndarray, class_counts: np.ndarray):
+        self.reference = {
+            "featureCounts": np.asarray(feature_counts, dtype=np.int64),
+            "classCounts": np.asarray(class_counts, dtype=np.int64)
+        }
+
+    def snapshot_reference(self) -> dict:
+        """Use the current window as the reference profile"""
+        window = self.window()
+        self.set_reference(window["featureCounts"], window["classCounts"])
+        return self.reference
+
+    def save_reference(self, path: str):
+        """Write the reference profile atomically as JSON"""
+        reference = self.reference  # Replaced, never modified, so one read is a consistent profile
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "featureNames": self.feature_names,
+                "binEdges": self.bin_edges.tolist(),
+                "featureCounts": reference["featureCounts"].tolist(),
+                "classCounts": reference["classCounts"].tolist()
+            }, f)
+        os.replace(tmp_path, path)
+
+    def load_reference(self, path: str) -> bool:
+        """Read a saved reference profile, ignoring it if it was binned differently"""
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable drift reference {path}: {e}")
+            return False
+        if saved.get("featureNames") != self.feature_names or \
+                not np.array_equal(saved.get("binEdges"), self.bin_edges):
+            logger.warning(f"Ignoring drift reference {path}: features or bins differ")
+            return False
+        self.set_reference(saved["featureCounts"], saved["classCounts"])
+        return True
+
+    def report(
+            self, psi_threshold: float = 0.2, p_value_threshold: float = 0.01, min_samples: int = 100, window=None
+        ) -> dict:
+        """
+        PSI and KS per feature, and PSI and chi-square on predicted classes, window vs reference.
+        Pass a `window()` taken on the event loop to compute the report from it in another thread.
+        """
+        window = self.window() if window is None else window
+        window_count = int(window["classCounts"].sum())
+        reference_count = int(self.reference["classCounts"].sum()) if self.reference is not None else 0
+        report = {
+            "windowCount": window_count,
+            "referenceCount": reference_count,
+            "enoughData": (window_count >= min_samples) and (reference_count >= min_samples),
+            "features": {},
+            "predictions": None,
+            "driftDetected": False
+        }
+        if not report["enoughData"]:
+            return report
+
+        for idx, name in enumerate(self.feature_names):
+            reference, current = self.reference["featureCounts"][idx], window["featureCounts"][idx]
+            ks, ks_p_value = binned_ks(reference, current)
+            report["features"][name] = {
+                "psi": population_stability_index(reference, current),
+                "ks": ks,
+                "ksPValue": ks_p_value
+            }
+        chi_square, chi_square_p_value = chi_square_test(self.reference["classCounts"], window["classCounts"])
+        report["predictions"] = {
+            "psi": population_stability_index(self.reference["classCounts"], window["classCounts"]),
+            "chiSquare": chi_square,
+            "chiSquarePValue": chi_square_p_value
+        }
+
+        report["driftDetected"] = any(
+            (feature["psi"] > psi_threshold) or (feature["ksPValue"] < p_value_threshold)
+            for feature in report["features"].values()
+        ) or (report["predictions"]["psi"] > psi_threshold) or (chi_square_p_value < p_value_threshold)
+        return report
+
+
+def population_stability_index(reference_counts, current_counts, epsilon: float = PSI_EPSILON) -> float:
+    reference = np.asarray(reference_counts, dtype=np.float64)
+    current = np.asarray(current_counts, dtype=np.float64)
+    reference_share = np.maximum(reference / max(reference.sum(), 1), epsilon)
+    current_share = np.maximum(current / max(current.sum(), 1), epsilon)
+    return float(np.sum((current_share - reference_share) * np.log(current_share / reference_share)))
+
+
+def binned_ks(reference_counts, current_counts):
+    """Two-sample KS statistic between binned distributions, with its asymptotic p-value"""
+    from scipy import stats  # Deferred: only reports need it, and importing it slows API startup
+    n, m = float(np.sum(reference_counts)), float(np.sum(current_counts))
+    statistic = float(np.max(np.abs(np.cumsum(reference_counts) / n - np.cumsum(current_counts) / m)))
+    p_value = float(stats.kstwobign.sf(statistic * np.sqrt(n * m / (n + m))))
+    return statistic, p_value
+
+
+def chi_square_test(reference_counts, current_counts):
+    """Chi-square test of homogeneity between two count vectors, ignoring classes absent from both"""
+    from scipy import stats
+    table = np.vstack([reference_counts, current_counts])
+    table = table[:, table.sum(axis=0) > 0]
+    if table.shape[1] < 2:
+        return 0.0, 1.0
+    statistic, p_value, _, _ = stats.chi2_contingency(table, correction=False)
+    return float(statistic), float(p_value)
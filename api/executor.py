@@ -0,0 +1,92 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a pool already has max_workers running and max_queue waiting tasks."""
+
+
+class BoundedExecutor:
+    """
+    A thread or process pool with a concurrency limit, used to run blocking
+    work (inference, model (de)serialization) off the event loop.
+    Submissions beyond max_workers + max_queue are rejected instead of queued,
+    so callers can shed load with a 503 rather than pile up behind the pool.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, kind: str = "thread"):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind '{kind}', expected 'thread' or 'process'")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = (
+            ProcessPoolExecutor(max_workers=max_workers) if kind == "process"
+            else ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        )
+        # Only touched from the event loop thread, so plain ints are enough
+        self._pending = 0
+        self._waiters = deque()  # Futures of run_waiting callers, woken one per finished task
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn: Callable, *args):
+        """Run fn(*args) in the pool, or raise ExecutorSaturated when it is full."""
+        if self._pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise ExecutorSaturated(f"{self.name} pool is saturated ({self._pending} tasks pending)")
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+            self.completed += 1
+            self._wake_next()
+
+    async def run_waiting(self, fn: Callable, *args):
+        """
+        Run fn(*args) in the pool, waiting for a free slot rather than raising
+        ExecutorSaturated. For work already promised to a client, such as the
+        remaining chunks of a streamed response whose status was sent.
+        """
+        while self._pending >= self.max_workers + self.max_queue:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # A slot handed to this caller goes to the next one instead
+                if waiter.done() and not waiter.cancelled():
+                    self._wake_next()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        return await self.run(fn, *args)
+
+    def _wake_next(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    def stats(self) -> dict:
+        """Pool sizing information exposed by the API."""
+        capacity = self.max_workers + self.max_queue
+        return {
+            "kind": self.kind,
+            "maxWorkers": self.max_workers,
+            "maxQueue": self.max_queue,
+            "active": min(self._pending, self.max_workers),
+            "queueDepth": max(self._pending - self.max_workers, 0),
+            "saturation": round(self._pending / capacity, 4) if capacity else 1.0,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
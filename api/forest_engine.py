@@ -0,0 +1,162 @@
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+
+# Flat file layout: magic, little-endian uint64 header length, JSON header describing
+# each array (dtype, shape, offset), then the raw arrays aligned to FLAT_ALIGNMENT bytes.
+FLAT_MAGIC = b"IRISFOREST\x01"
+FLAT_ALIGNMENT = 64
+FLAT_ARRAYS = ("feature", "threshold", "left", "right", "leaf_proba", "roots", "classes_")
+
+
+class CompiledForest:
+    """
+    A scikit-learn forest classifier flattened into packed NumPy arrays.
+    All trees are stored back to back (feature, threshold, left/right child,
+    leaf class probabilities) and evaluated together: each step advances every
+    (row, tree) pair one level, so a prediction costs max_depth vectorized
+    steps instead of one Python-level call per estimator.
+    Predictions match the source model exactly.
+    """
+
+    def __init__(self, feature, threshold, left, right, leaf_proba, roots, max_depth, classes, n_features_in):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf_proba = leaf_proba
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.n_features_in_ = int(n_features_in)
+        self.n_estimators = len(roots)
+
+    @classmethod
+    def from_sklearn(cls, forest) -> "CompiledForest":
+        """Pack the fitted trees of a single-output forest classifier."""
+        features, thresholds, lefts, rights, probas, roots = [], [], [], [], [], []
+        offset, max_depth = 0, 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            # Leaves point to themselves, so extra traversal steps keep rows in place
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            # Normalized the same way as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :]
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            probas.append(value / normalizer)
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            leaf_proba=np.concatenate(probas).astype(np.float64),
+            roots=np.array(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=forest.classes_,
+            n_features_in=forest.n_features_in_
+        )
+
+    def save(self, path: str):
+        """Write the packed arrays to a flat file that can be memory-mapped by load.
+        The file is written next to its destination and renamed into place atomically."""
+        arrays = {name: np.ascontiguousarray(getattr(self, name)) for name in FLAT_ARRAYS}
+        specs, offset = {}, 0
+        for name, array in arrays.items():
+            specs[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset += -(-array.nbytes // FLAT_ALIGNMENT) * FLAT_ALIGNMENT
+        header = json.dumps({
+            "max_depth": self.max_depth, "n_features_in": self.n_features_in_, "arrays": specs
+        }).encode()
+        data_start = -(-(len(FLAT_MAGIC) + 8 + len(header)) // FLAT_ALIGNMENT) * FLAT_ALIGNMENT
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(FLAT_MAGIC + struct.pack("<Q", len(header)) + header)
+                for name, array in arrays.items():
+                    f.seek(data_start + specs[name]["offset"])
+                    f.write(array.tobytes())
+                f.truncate(data_start + offset)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: str = "r") -> "CompiledForest":
+        """Load a flat file written by save. With mmap_mode the arrays are memory-mapped,
+        so every process serving the same file shares one page-cached copy."""
+        with open(path, "rb") as f:
+            if f.read(len(FLAT_MAGIC)) != FLAT_MAGIC:
+                raise ValueError(f"{path} is not a compiled forest file")
+            (header_length,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_length))
+            data_start = -(-(len(FLAT_MAGIC) + 8 + header_length) // FLAT_ALIGNMENT) * FLAT_ALIGNMENT
+            arrays = {}
+            for name, spec in header["arrays"].items():
+                dtype, shape = np.dtype(spec["dtype"]), tuple(spec["shape"])
+                if mmap_mode is not None:
+                    arrays[name] = np.memmap(
+                        path, dtype=dtype, mode=mmap_mode, offset=data_start + spec["offset"], shape=shape
+                    )
+                else:
+                    f.seek(data_start + spec["offset"])
+                    arrays[name] = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+        return cls(
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            left=arrays["left"],
+            right=arrays["right"],
+            leaf_proba=arrays["leaf_proba"],
+            roots=arrays["roots"],
+            max_depth=header["max_depth"],
+            classes=arrays["classes_"],
+            n_features_in=header["n_features_in"]
+        )
+
+    def apply(self, X) -> np.ndarray:
+        """Return the leaf index reached by every row in every tree, shape (n_rows, n_trees)."""
+        # Trees compare float32 features against float64 thresholds, as scikit-learn does
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has shape {X.shape}, expected (n_rows, {self.n_features_in_})")
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_estimators))
+        for _ in range(self.max_depth):
+            values = np.take_along_axis(X, self.feature[nodes], axis=1)
+            nodes = np.where(values <= self.threshold[nodes], self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Average of per-tree class probabilities, as in RandomForestClassifier."""
+        proba = self.leaf_proba[self.apply(X)].sum(axis=1)
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def compile_model(model):
+    """Compile a fitted single-output forest classifier, returning any other model unchanged."""
+    estimators = getattr(model, "estimators_", None)
+    if (
+        estimators and getattr(model, "n_outputs_", None) == 1
+        and hasattr(model, "predict_proba") and all(hasattr(e, "tree_") for e in estimators)
+    ):
+        return CompiledForest.from_sklearn(model)
+    return model
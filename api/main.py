@@ -1,19 +1,122 @@
+import time
+IMPORT_STARTED = time.perf_counter()  # Start of the startup profile, before the imports below
+
 from contextlib import asynccontextmanager
+import hashlib
 import logging
-from pydantic import BaseModel
+import asyncio
+import os
+import tempfile
+from pydantic import BaseModel, ValidationError
 
 import numpy as np
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 
-from api.schema_config import Iris, FEATURE_NAMES
-from api.serving_utils import load_model, save_retrained_model, increment_model_version
+from api.artifact_store import ArtifactStore, LoadedModels, is_sha256
+from api.batching import MicroBatcher
+from api.drift_monitor import DriftMonitor
+from api.binary_format import (
+    BINARY_MEDIA_TYPES,
+    decode_observations,
+    encode_predictions,
+    is_binary,
+    response_media_type,
+    validate_observations
+)
+from api.executor import BoundedExecutor, ExecutorSaturated
+from api.forest_engine import compile_model
+from api.metrics import MetricsMiddleware, MetricsRegistry
+from api.model_registry import ModelRegistry
+from api.ndjson_scoring import DuplexStreamingResponse, iter_lines, score_ndjson_stream
+from api.prediction_cache import PredictionCache
+from api.prediction_log import PredictionLog
+from api.schema_config import Iris, IrisBatch, FEATURE_NAMES, MAX_BATCH_SIZE, RegistryRoutes, ShadowConfig
+from api.serving_utils import (
+    ServedModel,
+    load_compact_model,
+    load_mmap_model,
+    load_model,
+    save_retrained_model,
+    increment_model_version,
+    observations_to_array,
+    warm_up_model
+)
 
 
 MODELS_DIR = "api/prod_models"
+MODEL_CACHE_DIR = "api/model_cache"  # Memory-mapped flat copies of served forests
 DEFAULT_MODEL_FILE = "rf-12-base.joblib"
 
+# Optional dynamic batching of concurrent /predict calls
+DYNAMIC_BATCHING = os.getenv("DYNAMIC_BATCHING", "false").lower() == "true"
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "64"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+
+# Bounded pools keeping blocking inference and model (de)serialization off the event loop
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "4"))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "64"))
+MODEL_IO_EXECUTOR = os.getenv("MODEL_IO_EXECUTOR", "thread")  # "thread" or "process"
+MODEL_IO_WORKERS = int(os.getenv("MODEL_IO_WORKERS", "1"))
+MODEL_IO_QUEUE_SIZE = int(os.getenv("MODEL_IO_QUEUE_SIZE", "2"))
+RETRY_AFTER_SEC = 1
+
+# "compiled" serves forests through api.forest_engine instead of sklearn's predict,
+# "mmap" does the same from a memory-mapped flat file shared by all uvicorn workers,
+# "compact" from a quantized, compressed copy (api.compact_forest) for the least memory
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "sklearn")
+COMPACT_COMPRESSION = os.getenv("COMPACT_COMPRESSION", "zlib")  # none, zlib, lzma, zstd or lz4
+
+# LRU/TTL cache of predictions keyed on the feature values and model version, 0 disables
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL_SEC = float(os.getenv("PREDICTION_CACHE_TTL_SEC", "300"))
+
+# Rows scored per predict call by the streaming bulk-scoring endpoint
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "1000"))
+# Longer lines are reported as malformed and not buffered past this many bytes
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", str(64 * 1024)))
+
+# Synthetic batches run through a candidate model before it is published
+WARMUP_BATCHES = int(os.getenv("WARMUP_BATCHES", "3"))
+WARMUP_ROWS = int(os.getenv("WARMUP_ROWS", "64"))
+
+# Sliding window of production traffic compared with a stored reference profile
+DRIFT_WINDOW_SEC = float(os.getenv("DRIFT_WINDOW_SEC", "3600"))
+DRIFT_WINDOW_SLOTS = int(os.getenv("DRIFT_WINDOW_SLOTS", "12"))
+DRIFT_REFERENCE_PATH = os.getenv("DRIFT_REFERENCE_PATH", f"{MODEL_CACHE_DIR}/drift_reference.json")
+DRIFT_N_CLASSES = 3
+DRIFT_PSI_THRESHOLD = 0.2
+DRIFT_P_VALUE = 0.01
+DRIFT_MIN_SAMPLES = 100
+
+# Every prediction is buffered and flushed in the background to compressed .npz shards
+PREDICTION_LOG_DIR = os.getenv("PREDICTION_LOG_DIR", "api/prediction_logs")
+PREDICTION_LOG_CAPACITY = int(os.getenv("PREDICTION_LOG_CAPACITY", "65536"))  # 0 disables logging
+PREDICTION_LOG_FLUSH_ROWS = int(os.getenv("PREDICTION_LOG_FLUSH_ROWS", "8192"))
+PREDICTION_LOG_FLUSH_SEC = float(os.getenv("PREDICTION_LOG_FLUSH_SEC", "5"))
+PREDICTION_LOG_MAX_SHARDS = int(os.getenv("PREDICTION_LOG_MAX_SHARDS", "1000"))
+PREDICTION_LOG_POLICY = os.getenv("PREDICTION_LOG_POLICY", "drop")  # "drop" or "block" when full
+
+# Models kept resident next to the served one, for A/B routing (X-Model header or weights) and shadow scoring
+REGISTRY_MEMORY_BUDGET_MB = float(os.getenv("REGISTRY_MEMORY_BUDGET_MB", "512"))
+
+# Model files kept once per content hash (see api/artifact_store.py), so a model the API already
+# has is promoted by hash instead of uploaded again. Unreferenced artifacts are garbage collected
+# beyond the ARTIFACT_GC_KEEP most recently used, unless used within ARTIFACT_GC_MIN_AGE_SEC.
+ARTIFACTS_DIR = os.getenv("ARTIFACTS_DIR", "api/artifacts")
+ARTIFACT_GC_KEEP = int(os.getenv("ARTIFACT_GC_KEEP", "5"))
+ARTIFACT_GC_MIN_AGE_SEC = float(os.getenv("ARTIFACT_GC_MIN_AGE_SEC", "3600"))
+# Deserialized, warmed-up models kept by content hash, so re-promoting one is a pointer swap
+ARTIFACT_MODEL_CACHE_SIZE = int(os.getenv("ARTIFACT_MODEL_CACHE_SIZE", "4"))
+
+# "blocking" loads the default model before serving, "background" accepts requests at once
+# and reports "starting" (503) until it is loaded, to minimise time-to-first-ready
+STARTUP_MODE = os.getenv("STARTUP_MODE", "blocking")
+# Load the default model from its memory-mapped flat copy (served by api.forest_engine),
+# which after the first start skips unpickling and importing scikit-learn
+STARTUP_FAST_LOAD = os.getenv("STARTUP_FAST_LOAD", "false").lower() == "true"
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
 
@@ -23,51 +126,447 @@ class UpdateModelRequest(BaseModel):
     modelObject: str
 
 
-def set_served_model(model_filename, default=False):
-    """Set model state during app initialization and scheduled model updates."""
-    app.state.model = load_model(MODELS_DIR, model_filename)
-    app.state.model_file = model_filename
-    version = increment_model_version(app.state.model_version) if not default else "1.0"
-    app.state.model_version = version
-    logger.info(f"\nAPI model set to {model_filename} with model version {version}\n")
+def load_served_model(model_filename, model=None):
+    """Load a model for serving, from its memory-mapped flat copy when INFERENCE_BACKEND is "mmap",
+    or its compact copy when it is "compact"."""
+    if INFERENCE_BACKEND == "mmap":
+        return load_mmap_model(MODELS_DIR, model_filename, MODEL_CACHE_DIR, model)
+    if INFERENCE_BACKEND == "compact":
+        return load_compact_model(MODELS_DIR, model_filename, MODEL_CACHE_DIR, model, COMPACT_COMPRESSION)
+    return model if model is not None else load_model(MODELS_DIR, model_filename)
+
+
+def load_default_model_file():
+    """Load the default model, from its fast-load flat artifact when STARTUP_FAST_LOAD is set."""
+    if STARTUP_FAST_LOAD:
+        return load_mmap_model(MODELS_DIR, DEFAULT_MODEL_FILE, MODEL_CACHE_DIR)
+    return load_served_model(DEFAULT_MODEL_FILE)
+
+
+def prepare_model(model) -> tuple:
+    """Compile (if configured) and warm up a candidate model before it serves traffic.
+    Blocking, so updates run it in the inference pool. Returns the model and warm-up time in ms."""
+    model = compile_model(model) if INFERENCE_BACKEND == "compiled" else model
+    latencies = warm_up_model(model, len(FEATURE_NAMES), WARMUP_BATCHES, WARMUP_ROWS)
+    logger.info(f"Warm-up batch latencies (ms): {[round(latency, 3) for latency in latencies]}")
+    return model, sum(latencies)
+
+
+def set_served_model(model_filename, default=False, model=None, load_ms=0.0, warmup_ms=0.0, swap_ms=0.0):
+    """
+    Set model state during app initialization and scheduled model updates.
+    Model, name and version are published together as one immutable ServedModel,
+    so requests in flight finish on the previous snapshot, which is released once
+    they are done. If no prepared model is passed it is loaded and warmed up here.
+    """
+    if model is None:
+        start = time.perf_counter()
+        model = load_default_model_file() if model_filename == DEFAULT_MODEL_FILE else load_served_model(model_filename)
+        load_ms = (time.perf_counter() - start) * 1000
+        model, warmup_ms = prepare_model(model)
+        swap_ms = (time.perf_counter() - start) * 1000
+    previous = getattr(app.state, "served", None)
+    # Versions restart at 1.0 at startup, and also when no model was ever loaded because the default failed
+    version = increment_model_version(previous.model_version) if not default and previous is not None else "1.0"
+    app.state.served = ServedModel(model, model_filename, version, load_ms, warmup_ms, swap_ms)
+    if getattr(app.state, "metrics", None) is not None:
+        app.state.metrics.observe_swap(app.state.served)
+    # Predictions of the previous model must not be served any more
+    if getattr(app.state, "prediction_cache", None) is not None:
+        app.state.prediction_cache.clear()
+    logger.info(
+        f"\nAPI model set to {model_filename} with model version {version} "
+        f"(swap {swap_ms:.1f} ms: load {load_ms:.1f} ms, warm-up {warmup_ms:.1f} ms)\n"
+    )
+
+
+async def swap_served_model(model_filename, model=None, sha256=None):
+    """Load (unless given), compile and warm up a candidate off the event loop,
+    then publish it atomically. Concurrent updates are applied one at a time.
+    With the content hash of the file, a model already prepared for that hash is
+    published as is, and a newly prepared one is kept for the next promotion."""
+    async with app.state.swap_lock:
+        # A resident copy in the registry may come from the file being replaced
+        app.state.registry.discard(model_filename)
+        start = time.perf_counter()
+        prepared = app.state.loaded_models.get(sha256) if sha256 is not None else None
+        if prepared is not None:
+            set_served_model(model_filename, model=prepared, swap_ms=(time.perf_counter() - start) * 1000)
+            return
+        if model is None or INFERENCE_BACKEND in ("mmap", "compact"):
+            model = await app.state.model_io_pool.run(load_served_model, model_filename, model)
+        load_ms = (time.perf_counter() - start) * 1000
+        model, warmup_ms = await app.state.inference_pool.run(prepare_model, model)
+        swap_ms = (time.perf_counter() - start) * 1000
+        set_served_model(model_filename, model=model, load_ms=load_ms, warmup_ms=warmup_ms, swap_ms=swap_ms)
+        if sha256 is not None:
+            app.state.loaded_models.put(sha256, model)
+
+
+async def adopt_model_files():
+    """Record the model files already in MODELS_DIR in the artifact store, off the event loop,
+    so the scheduler does not upload models the API started with."""
+    try:
+        hashes = await asyncio.to_thread(app.state.artifact_store.adopt_all)
+    except Exception as e:
+        logger.warning(f"Failed to adopt model files into the artifact store: {e}")
+        return
+    served = app.state.served
+    if served is not None and served.model_file in hashes:
+        app.state.loaded_models.put(hashes[served.model_file], served.model)
+    logger.info(f"Artifact store holds {len(hashes)} model files from {MODELS_DIR}")
+
+
+def record_startup_phase(phase: str, start: float):
+    """Add a phase's duration in ms to the startup profile, returning the time it ended."""
+    end = time.perf_counter()
+    app.state.startup_profile["phasesMs"][phase] = (end - start) * 1000
+    return end
+
+
+def mark_ready():
+    profile = app.state.startup_profile
+    profile["ready"] = True
+    profile["timeToReadyMs"] = (time.perf_counter() - IMPORT_STARTED) * 1000
+    logger.info(
+        f"\nStartup ({profile['mode']}) ready in {profile['timeToReadyMs']:.1f} ms: "
+        f"import {profile['importMs']:.1f} ms, phases {({k: round(v, 1) for k, v in profile['phasesMs'].items()})}"
+    )
+
+
+async def load_default_model_in_background():
+    """Load and warm up the default model off the event loop while requests are already accepted."""
+    try:
+        async with app.state.swap_lock:
+            # A model published by an update in the meantime is kept
+            if app.state.served is None:
+                start = time.perf_counter()
+                model = await app.state.model_io_pool.run(load_default_model_file)
+                load_end = record_startup_phase("defaultModelLoad", start)
+                model, warmup_ms = await app.state.inference_pool.run(prepare_model, model)
+                record_startup_phase("defaultModelWarmup", load_end)
+                set_served_model(
+                    DEFAULT_MODEL_FILE, default=True, model=model, load_ms=(load_end - start) * 1000,
+                    warmup_ms=warmup_ms, swap_ms=(time.perf_counter() - start) * 1000
+                )
+                logger.info(f"\nDefault model loaded from: {app.state.served.model_file}")
+    except Exception as e:
+        logger.info(f"Failed to load default model: {e}")
+    mark_ready()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Allows app state to last through the lifespan of the application."""
+    start = time.perf_counter()
+    app.state.startup_profile.update({
+        "mode": STARTUP_MODE, "fastLoad": STARTUP_FAST_LOAD, "ready": False, "phasesMs": {}, "timeToReadyMs": None
+    })
+    app.state.served = None
+    app.state.metrics = MetricsRegistry()
+    app.state.drift_monitor = DriftMonitor(FEATURE_NAMES, DRIFT_N_CLASSES, DRIFT_WINDOW_SEC, DRIFT_WINDOW_SLOTS)
+    if app.state.drift_monitor.load_reference(DRIFT_REFERENCE_PATH):
+        logger.info(f"Drift reference profile loaded from: {DRIFT_REFERENCE_PATH}")
+    app.state.prediction_cache = (
+        PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL_SEC or None)
+        if PREDICTION_CACHE_SIZE > 0 else None
+    )
+    app.state.artifact_store = ArtifactStore(ARTIFACTS_DIR, MODELS_DIR, ARTIFACT_GC_KEEP, ARTIFACT_GC_MIN_AGE_SEC)
+    app.state.loaded_models = LoadedModels(ARTIFACT_MODEL_CACHE_SIZE)
+
+    start = record_startup_phase("state", start)
+
     def load_default_model():
         try:
           # Load a default model at application startup
           set_served_model(DEFAULT_MODEL_FILE, default=True)
-          logger.info(f"\nDefault model loaded from: {app.state.model_file}")
+          logger.info(f"\nDefault model loaded from: {app.state.served.model_file}")
         except Exception as e:
-          logger.info("Failed to load default model:", e)
-          app.state.model, app.state.model_file, app.state.model_version = None, None, None
-    load_default_model()
+          logger.info(f"Failed to load default model: {e}")
+          app.state.served = None
+    if STARTUP_MODE != "background":
+        load_default_model()
+        start = record_startup_phase("defaultModel", start)
+    app.state.swap_lock = asyncio.Lock()
+
+    app.state.inference_pool = BoundedExecutor(
+        "inference", INFERENCE_WORKERS, INFERENCE_QUEUE_SIZE
+    )
+    app.state.model_io_pool = BoundedExecutor(
+        "model-io", MODEL_IO_WORKERS, MODEL_IO_QUEUE_SIZE, kind=MODEL_IO_EXECUTOR
+    )
+
+    async def load_registry_model(model_filename):
+        start = time.perf_counter()
+        model = await app.state.model_io_pool.run(load_served_model, model_filename)
+        load_ms = (time.perf_counter() - start) * 1000
+        model, warmup_ms = await app.state.inference_pool.run(prepare_model, model)
+        # Routed models are versioned by file name, which keeps their cached predictions apart
+        return ServedModel(model, model_filename, model_filename, load_ms, warmup_ms, 0.0)
+    app.state.registry = ModelRegistry(load_registry_model, int(REGISTRY_MEMORY_BUDGET_MB * 1e6))
+
+    app.state.prediction_log = None
+    if PREDICTION_LOG_CAPACITY > 0:
+        app.state.prediction_log = PredictionLog(
+            PREDICTION_LOG_DIR,
+            len(FEATURE_NAMES),
+            capacity=PREDICTION_LOG_CAPACITY,
+            flush_rows=PREDICTION_LOG_FLUSH_ROWS,
+            flush_interval_sec=PREDICTION_LOG_FLUSH_SEC,
+            max_shards=PREDICTION_LOG_MAX_SHARDS,
+            policy=PREDICTION_LOG_POLICY
+        )
+        app.state.prediction_log.start()
+
+    # Coalesce concurrent /predict calls into one model call when enabled
+    app.state.batcher = None
+    if DYNAMIC_BATCHING:
+        def predict_with_snapshot(rows):
+            # Each prediction carries the snapshot that produced it, for the response's model name
+            served = app.state.served
+            return [(prediction, served) for prediction in served.model.predict(rows)]
+
+        app.state.batcher = MicroBatcher(
+            predict_with_snapshot,
+            BATCH_MAX_SIZE,
+            BATCH_MAX_WAIT_MS,
+            executor=app.state.inference_pool
+        )
+        app.state.batcher.start()
+        logger.info(f"Dynamic batching enabled (max size {BATCH_MAX_SIZE}, max wait {BATCH_MAX_WAIT_MS} ms)")
+    record_startup_phase("services", start)
+
+    startup_task = None
+    if STARTUP_MODE == "background":
+        startup_task = asyncio.create_task(load_default_model_in_background())
+    else:
+        mark_ready()
+    # Hashing existing model files is not needed to serve, so it happens after startup
+    adopt_task = asyncio.create_task(adopt_model_files())
     yield
+    for task in (startup_task, adopt_task):
+        if task is not None and not task.done():
+            task.cancel()
+    if app.state.batcher is not None:
+        await app.state.batcher.stop()
+    if app.state.prediction_log is not None:
+        await app.state.prediction_log.stop()
+    await app.state.registry.stop()
+    app.state.inference_pool.shutdown()
+    app.state.model_io_pool.shutdown()
     # Clean up the last loaded model
-    app.state.model, app.state.model_file, app.state.model_version = None, None, None
+    app.state.served = None
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+app.state.startup_profile = {"mode": STARTUP_MODE, "fastLoad": STARTUP_FAST_LOAD, "ready": False, "phasesMs": {}}
+
+
+def is_starting() -> bool:
+    return not app.state.startup_profile["ready"]
+
+
+def require_served_model() -> ServedModel:
+    """The snapshot to serve a request with: 503 while the default model is still loading, 400 if none is loaded."""
+    served = getattr(app.state, "served", None)
+    if served is None:
+        if is_starting():
+            raise HTTPException(status_code=503, detail="starting", headers={"Retry-After": str(RETRY_AFTER_SEC)})
+        raise HTTPException(status_code=400, detail="No model loaded")
+    return served
 
 
 @app.get("/")
 def health_check():
-    """Ensures the API is able to receive requests well."""
+    """Ensures the API is able to receive requests well, "starting" (503) until it is ready."""
+    if is_starting():
+        return JSONResponse(
+            status_code=503, content={"health_check": "starting"}, headers={"Retry-After": str(RETRY_AFTER_SEC)}
+        )
     return JSONResponse(status_code=200, content={"health_check": "success"})
 
 
+@app.get("/startup_profile")
+def get_startup_profile() -> dict:
+    """Reports import time, each startup phase and time-to-ready in ms, to catch cold start regressions."""
+    return JSONResponse(status_code=200, content=app.state.startup_profile)
+
+
 @app.get("/current_model")
 def get_current_model() -> dict:
     """Returns name of current model set in the application state."""
-    if not hasattr(app.state, "model") or app.state.model is None:
+    served = getattr(app.state, "served", None)
+    if served is None:
         return {"currentModel": None}
     return JSONResponse(
         status_code=200, 
         content={
-            "currentModelName": app.state.model_file,
-            "currentModelVersion": app.state.model_version
+            "currentModelName": served.model_file,
+            "currentModelVersion": served.model_version
+        }
+    )
+
+
+@app.get("/executor_stats")
+def get_executor_stats() -> dict:
+    """Reports saturation and queue depth of the inference and model I/O pools."""
+    return JSONResponse(
+        status_code=200,
+        content={
+            "inference": app.state.inference_pool.stats(),
+            "modelIO": app.state.model_io_pool.stats()
+        }
+    )
+
+
+@app.get("/cache_stats")
+def get_cache_stats() -> dict:
+    """Reports prediction cache size, hits, misses and evictions."""
+    cache = app.state.prediction_cache
+    return JSONResponse(
+        status_code=200,
+        content={"enabled": cache is not None, **(cache.stats() if cache is not None else {})}
+    )
+
+
+@app.get("/drift_report")
+async def get_drift_report() -> dict:
+    """
+    Compares production traffic in the sliding window with the reference profile:
+    PSI and KS per feature, PSI and chi-square on predicted classes.
+    Computed from binned counts only, no raw observations are retained.
+    """
+    drift_monitor = app.state.drift_monitor
+    if drift_monitor.reference is None:
+        raise HTTPException(status_code=404, detail="No drift reference profile, POST /drift_reference first")
+    # The window is summed on the event loop, where predictions update it; only the statistics run in a thread
+    report = await asyncio.to_thread(
+        drift_monitor.report, DRIFT_PSI_THRESHOLD, DRIFT_P_VALUE, DRIFT_MIN_SAMPLES, drift_monitor.window()
+    )
+    return JSONResponse(status_code=200, content=report)
+
+
+@app.post("/drift_reference")
+async def set_drift_reference() -> dict:
+    """Stores the traffic in the current window as the reference profile for drift reports."""
+    reference = app.state.drift_monitor.snapshot_reference()
+    reference_count = int(reference["classCounts"].sum())
+    if reference_count == 0:
+        raise HTTPException(status_code=400, detail="No predictions in the current window to use as reference")
+    await asyncio.to_thread(app.state.drift_monitor.save_reference, DRIFT_REFERENCE_PATH)
+    logger.info(f"\nDrift reference profile set from {reference_count} predictions")
+    return JSONResponse(status_code=200, content={"referenceCount": reference_count})
+
+
+@app.get("/prediction_log_stats")
+def get_prediction_log_stats() -> dict:
+    """Reports prediction log buffer depth, dropped rows and flushed shards."""
+    prediction_log = app.state.prediction_log
+    return JSONResponse(
+        status_code=200,
+        content={"enabled": prediction_log is not None, **(prediction_log.stats() if prediction_log is not None else {})}
+    )
+
+
+@app.get("/registry")
+async def get_registry() -> dict:
+    """Reports resident models, traffic weights, the shadow model, per-model latency and shadow agreement."""
+    return JSONResponse(status_code=200, content=app.state.registry.stats())
+
+
+@app.post("/registry/routes")
+async def set_registry_routes(routes: RegistryRoutes) -> dict:
+    """
+    Splits /predict and /predict_batch traffic between models in MODELS_DIR by weight,
+    e.g. {"weights": {"rf-24.joblib": 0.9, "rf-96.joblib": 0.1}}. Empty weights send
+    everything to the served model. Routed models are loaded before the split applies.
+    """
+    for model_filename in routes.weights:
+        await app.state.registry.get(registry_model_filename(model_filename))
+    app.state.registry.set_routes({registry_model_filename(name): weight for name, weight in routes.weights.items()})
+    logger.info(f"\nTraffic weights set to {app.state.registry.routes}")
+    return JSONResponse(status_code=200, content={"routes": app.state.registry.routes})
+
+
+@app.post("/registry/shadow")
+async def set_registry_shadow(shadow: ShadowConfig) -> dict:
+    """
+    Scores a sampled fraction of requests with a shadow model after they are answered,
+    recording how often it agrees with the live prediction. A null model turns it off.
+    """
+    model_filename = registry_model_filename(shadow.model) if shadow.model else None
+    if model_filename is not None:
+        await app.state.registry.get(model_filename)
+    app.state.registry.set_shadow(model_filename, shadow.fraction)
+    logger.info(f"\nShadow model set to {model_filename} on {shadow.fraction:.0%} of requests")
+    return JSONResponse(status_code=200, content={"model": model_filename, "fraction": app.state.registry.shadow_fraction})
+
+
+@app.get("/metrics")
+async def get_metrics() -> PlainTextResponse:
+    """Prometheus metrics: latency per route and stage, requests by status,
+    predicted class counts, the served model and model load/swap durations.
+    Rendered on the event loop, which is where the metrics are recorded."""
+    gauges, counters = {}, {}
+    for pool_name, pool in (("inference", app.state.inference_pool), ("model_io", app.state.model_io_pool)):
+        stats = pool.stats()
+        gauges[f"iris_api_{pool_name}_pool_active"] = stats["active"]
+        gauges[f"iris_api_{pool_name}_pool_queue_depth"] = stats["queueDepth"]
+        counters[f"iris_api_{pool_name}_pool_rejected_total"] = stats["rejected"]
+    if app.state.prediction_cache is not None:
+        cache_stats = app.state.prediction_cache.stats()
+        gauges["iris_api_prediction_cache_size"] = cache_stats["size"]
+        counters["iris_api_prediction_cache_hits_total"] = cache_stats["hits"]
+        counters["iris_api_prediction_cache_misses_total"] = cache_stats["misses"]
+    if app.state.prediction_log is not None:
+        log_stats = app.state.prediction_log.stats()
+        gauges["iris_api_prediction_log_depth"] = log_stats["depth"]
+        counters["iris_api_prediction_log_dropped_total"] = log_stats["dropped"]
+        counters["iris_api_prediction_log_flushed_total"] = log_stats["flushed"]
+    return PlainTextResponse(
+        app.state.metrics.render(app.state.served, gauges, counters),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
+def validate_model_filename(model_filename: str):
+    """Model files are addressed by plain names inside MODELS_DIR."""
+    if not model_filename or os.path.basename(model_filename) != model_filename or model_filename.startswith("."):
+        raise HTTPException(status_code=400, detail=f"Invalid model filename '{model_filename}'")
+
+
+def validate_sha256(sha256: str) -> str:
+    """Artifacts are addressed by hex SHA-256 digests only, which can never name a path."""
+    sha256 = sha256.lower()
+    if not is_sha256(sha256):
+        raise HTTPException(status_code=400, detail=f"Invalid artifact hash '{sha256}'")
+    return sha256
+
+
+def fsync_file(f):
+    """Flush a file object's buffer and its data to disk."""
+    f.flush()
+    os.fsync(f.fileno())
+
+
+async def collect_artifacts():
+    try:
+        await asyncio.to_thread(app.state.artifact_store.gc)
+    except Exception as e:
+        logger.warning(f"Artifact garbage collection failed: {e}")
+
+
+def model_update_response(model_filename: str, **details) -> JSONResponse:
+    served = app.state.served
+    status = "success" if served.model_file == model_filename else "failure"
+    return JSONResponse(
+        status_code=200,
+        content={
+            "status": status,
+            "updatedModelName": served.model_file,
+            "updatedModelVersion": served.model_version,
+            **details
         }
     )
 
@@ -76,29 +575,142 @@ def get_current_model() -> dict:
 async def update_model(request: UpdateModelRequest) -> dict:
     """Allowed scheduled re-training tasks to change the model this API serves."""
     try:
-        # Save a copy in case it needs to be re-loaded
-        save_retrained_model(request.modelObject, MODELS_DIR, request.modelFilename)
-        # Change the API state to serve this new model
-        set_served_model(request.modelFilename)
+        # Save a copy in case it needs to be re-loaded, decoding it off the event loop
+        await app.state.model_io_pool.run(
+            save_retrained_model, request.modelObject, MODELS_DIR, request.modelFilename
+        )
+        await asyncio.to_thread(app.state.artifact_store.adopt, request.modelFilename)
+        # Load and warm up the new model in the background, then swap it in atomically
+        await swap_served_model(request.modelFilename)
 
+    except ExecutorSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    
-    status = "success" if app.state.model_file == request.modelFilename else "failure"
 
+    await collect_artifacts()
+    return model_update_response(request.modelFilename)
+
+
+@app.post("/upload_model")
+async def upload_model(request: Request, modelFilename: str) -> dict:
+    """
+    Streams a raw joblib model body straight to a temporary file in the artifact
+    store, verifies its SHA-256 against the optional X-Content-SHA256 header,
+    stores it by that hash, links it into MODELS_DIR as modelFilename and
+    deserializes it once to serve it (unless a model with the same hash is loaded).
+    Unlike /update_model, the model is never held in memory as base64 or bytes.
+    """
+    validate_model_filename(modelFilename)
+    expected_sha256 = request.headers.get("x-content-sha256")
+    store = app.state.artifact_store
+
+    fd, tmp_path = tempfile.mkstemp(dir=store.incoming_dir, prefix=".upload-", suffix=".tmp")
+    try:
+        digest, size = hashlib.sha256(), 0
+        with os.fdopen(fd, "wb") as tmp_file:
+            # Disk writes and the fsync can stall, so they run in a thread rather than on the event loop
+            async for chunk in request.stream():
+                digest.update(chunk)
+                await asyncio.to_thread(tmp_file.write, chunk)
+                size += len(chunk)
+            await asyncio.to_thread(fsync_file, tmp_file)
+
+        sha256 = digest.hexdigest()
+        if expected_sha256 is not None and sha256 != expected_sha256.lower():
+            raise HTTPException(
+                status_code=400,
+                detail=f"Checksum mismatch: expected {expected_sha256}, received {sha256}"
+            )
+        # Deserialize once from the temporary file before it replaces any served copy
+        model = None
+        if sha256 not in app.state.loaded_models:
+            model = await app.state.model_io_pool.run(load_model, store.incoming_dir, os.path.basename(tmp_path))
+        await asyncio.to_thread(store.ingest, tmp_path, sha256)
+        await asyncio.to_thread(store.link, sha256, modelFilename)
+        await swap_served_model(modelFilename, model=model, sha256=sha256)
+
+    except (HTTPException, ExecutorSaturated):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    await collect_artifacts()
+    return model_update_response(modelFilename, sha256=sha256, sizeBytes=size)
+
+
+@app.get("/artifacts")
+def get_artifacts() -> dict:
+    """Reports stored model artifacts, which file names point at them and the model cache by hash."""
+    return JSONResponse(
+        status_code=200,
+        content={**app.state.artifact_store.stats(), "loadedModels": app.state.loaded_models.stats()}
+    )
+
+
+@app.get("/artifacts/{sha256}")
+def get_artifact(sha256: str) -> dict:
+    """Tells a client whether the API already has a model with this content hash, so it can skip uploading it."""
+    sha256 = validate_sha256(sha256)
+    store = app.state.artifact_store
+    if not store.has(sha256):
+        raise HTTPException(status_code=404, detail=f"Artifact {sha256} not found")
     return JSONResponse(
         status_code=200,
         content={
-            "status": status,
-            "updatedModelName": app.state.model_file,
-            "updatedModelVersion": app.state.model_version
+            "sha256": sha256,
+            "sizeBytes": os.path.getsize(store.object_path(sha256)),
+            "names": store.names(sha256),
+            "loaded": sha256 in app.state.loaded_models
         }
     )
 
+
+@app.post("/promote_model")
+async def promote_model(modelFilename: str, sha256: str) -> dict:
+    """
+    Serves a model the API already stores, by content hash, under modelFilename.
+    The file name is re-pointed at the stored bytes; a model still loaded for that
+    hash is swapped in directly, otherwise the artifact is verified and loaded first.
+    """
+    validate_model_filename(modelFilename)
+    sha256 = validate_sha256(sha256)
+    store = app.state.artifact_store
+    try:
+        if not store.has(sha256):
+            raise HTTPException(status_code=404, detail=f"Artifact {sha256} not found")
+        if sha256 not in app.state.loaded_models and not await asyncio.to_thread(store.verify, sha256):
+            raise HTTPException(status_code=404, detail=f"Artifact {sha256} failed its integrity check")
+        await asyncio.to_thread(store.link, sha256, modelFilename)
+        await swap_served_model(modelFilename, sha256=sha256)
+
+    except (HTTPException, ExecutorSaturated):
+        raise
+    except FileNotFoundError:
+        # Collected by a concurrent update since it was looked up: the caller uploads it instead
+        raise HTTPException(status_code=404, detail=f"Artifact {sha256} not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    await collect_artifacts()
+    return model_update_response(modelFilename, sha256=sha256)
+
+
+@app.post("/artifacts/gc")
+async def collect_artifacts_now() -> dict:
+    """Garbage collects unreferenced artifacts now, rather than after the next model update."""
+    removed = await asyncio.to_thread(app.state.artifact_store.gc)
+    return JSONResponse(status_code=200, content={"removed": removed})
+
+
 @app.exception_handler(RequestValidationError)
 def input_error_response(request: Request, exc: RequestValidationError) -> JSONResponse:
     """Notify the user that the input format was unable to be processed"""
-    model_name = app.state.model_file.split(".")[0]
+    served = getattr(app.state, "served", None)
+    model_name = served.name if served is not None else None
     
     error_msg = "Please ensure all feature values provided are positive numbers."
     formatted_errors = [
@@ -116,29 +728,238 @@ def input_error_response(request: Request, exc: RequestValidationError) -> JSONR
     )
 
 
-@app.post("/predict")
-async def predict(features: Iris) -> dict:
+@app.exception_handler(ExecutorSaturated)
+def saturated_response(request: Request, exc: ExecutorSaturated) -> JSONResponse:
+    """Shed load when a worker pool is full, asking the client to retry shortly"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(RETRY_AFTER_SEC)}
+    )
+
+
+def request_body_docs(schema) -> dict:
+    """OpenAPI request body for routes that read the raw request,
+    so the docs still show the JSON schema next to the binary formats."""
+    json_schema = schema.model_json_schema()
+    definitions = json_schema.pop("$defs", {})
+
+    def inline(node):
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return inline(definitions[node["$ref"].split("/")[-1]])
+            return {key: inline(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [inline(value) for value in node]
+        return node
+
+    content = {"application/json": {"schema": inline(json_schema)}}
+    content.update({media_type: {"schema": {"type": "string", "format": "binary"}} for media_type in BINARY_MEDIA_TYPES})
+    return {"requestBody": {"required": True, "content": content}}
+
+
+async def read_observations(request: Request, schema) -> np.ndarray:
+    """
+    Read a prediction body into a float array in FEATURE_NAMES order.
+    JSON bodies are validated by the pydantic schema. Binary bodies (see
+    api/binary_format.py) are decoded without copying and validated in one
+    vectorized check. Both report errors through input_error_response.
+    """
+    metrics = app.state.metrics
+    with metrics.stage("body_read"):
+        body = await request.body()
+    content_type = request.headers.get("content-type")
+    if is_binary(content_type):
+        with metrics.stage("validation"):
+            try:
+                observations = decode_observations(body, content_type)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            errors = validate_observations(observations)
+        if errors:
+            raise RequestValidationError(errors)
+        return observations
+
+    with metrics.stage("validation"):
+        try:
+            parsed = schema.model_validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError([{**err, "loc": ("body", *err["loc"])} for err in e.errors()])
+    with metrics.stage("array_build"):
+        rows = parsed.observations if isinstance(parsed, IrisBatch) else [parsed]
+        return observations_to_array(rows, FEATURE_NAMES)
+
+
+def registry_model_filename(name: str) -> str:
+    """Model file in MODELS_DIR for a model name, with or without its .joblib extension"""
+    model_filename = name if name.endswith(".joblib") else f"{name}.joblib"
+    if os.path.basename(model_filename) != model_filename or model_filename.startswith("."):
+        raise HTTPException(status_code=400, detail=f"Invalid model name '{name}'")
+    return model_filename
+
+
+async def route_request(request: Request, served: ServedModel) -> tuple:
+    """
+    Pick the model answering a request: the one named by the X-Model header, else
+    a weighted choice among routed models, else the served model.
+    Returns the snapshot to use and whether it is a routed (non-served) model.
+    """
+    name = request.headers.get("x-model") or app.state.registry.pick_route()
+    if name is None:
+        return served, False
+    model_filename = registry_model_filename(name)
+    if model_filename == served.model_file:
+        return served, False
+    return await app.state.registry.get(model_filename), True
+
+
+async def predict_on_snapshot(snapshot: ServedModel, observations: np.ndarray):
+    return await app.state.inference_pool.run(snapshot.model.predict, observations)
+
+
+def prediction_response(request: Request, predictions: list, model_name: str, single: bool):
+    """Answer in the binary format negotiated by Accept/Content-Type, or in JSON."""
+    app.state.metrics.count_predictions(predictions)
+    with app.state.metrics.stage("response_serialization"):
+        media_type = response_media_type(request.headers.get("accept"), request.headers.get("content-type"))
+        if media_type is not None:
+            return Response(
+                content=encode_predictions(predictions, media_type),
+                media_type=media_type,
+                headers={"X-Model": model_name}
+            )
+        return JSONResponse(
+            status_code=200,
+            content={
+                "species": predictions[0] if single else predictions,
+                "model": model_name
+            }
+        )
+
+
+@app.post("/predict", openapi_extra=request_body_docs(Iris))
+async def predict(request: Request) -> dict:
     """
     Predicts Iris species.
     Checks if JSON input follows Iris schema defined by Pydantic.
     If so, it preprocesses and predicts the observation.
     Otherwise, it sends a error specifying what to correct.
+    A single binary row (application/x-npy or application/octet-stream) is also accepted.
     """
-    # Check if any model was loaded
-    if not hasattr(app.state, "model") or app.state.model is None:
-        raise HTTPException(status_code=400, detail="No model loaded")
+    # Check if any model was loaded, the request is served by this snapshot throughout
+    started = time.perf_counter()
+    served = require_served_model()
 
     # Preprocess observation
-    observation = np.array([[getattr(features, i) for i in FEATURE_NAMES]])
+    observation = await read_observations(request, Iris)
+    if observation.shape[0] != 1:
+        raise HTTPException(status_code=400, detail="/predict expects one observation, use /predict_batch")
+    feature_values = tuple(observation[0].tolist())
+    served, routed = await route_request(request, served)
 
-    # Perform prediction
-    model_name = app.state.model_file.split(".")[0]
-    prediction = int(app.state.model.predict(observation)[0])
+    # Repeated observations are answered from the cache without calling the model
+    cache = app.state.prediction_cache
+    prediction = cache.get(feature_values, served.model_version) if cache is not None else None
 
-    return JSONResponse(
-        status_code=200,
-        content={
-            "species": prediction,
-            "model": model_name
-        }
+    # Perform prediction, coalesced with concurrent requests when batching is on
+    if prediction is None:
+        predict_start = time.perf_counter()
+        with app.state.metrics.stage("model_predict"):
+            if app.state.batcher is not None and not routed:
+                prediction, served = await app.state.batcher.submit(observation)
+                prediction = int(prediction)
+            else:
+                predictions = await predict_on_snapshot(served, observation)
+                prediction = int(predictions[0])
+        app.state.registry.observe(served.model_file, time.perf_counter() - predict_start, 1)
+        if cache is not None:
+            cache.put(feature_values, served.model_version, prediction)
+    app.state.registry.maybe_shadow(served.model_file, observation, [prediction], predict_on_snapshot)
+
+    app.state.drift_monitor.observe(observation, [prediction])
+    if app.state.prediction_log is not None:
+        await app.state.prediction_log.log(
+            observation, [prediction], served.model_version, (time.perf_counter() - started) * 1000
+        )
+    return prediction_response(request, [prediction], served.name, single=True)
+
+
+@app.post("/predict_batch", openapi_extra=request_body_docs(IrisBatch))
+async def predict_batch(request: Request) -> dict:
+    """
+    Predicts Iris species for many observations with a single model call.
+    Accepts a list of observations or a columnar payload (see IrisBatch),
+    or binary rows (application/x-npy or application/octet-stream).
+    Invalid rows are reported by index, e.g. "observations.3.petalwidth".
+    """
+    started = time.perf_counter()
+    served = require_served_model()
+
+    # Stack every row into one contiguous array in FEATURE_NAMES order
+    observations = await read_observations(request, IrisBatch)
+    if not 0 < observations.shape[0] <= MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batches must have between 1 and {MAX_BATCH_SIZE} rows")
+    served, _ = await route_request(request, served)
+
+    # Look up cached rows first, then one vectorized prediction for the rest
+    cache = app.state.prediction_cache
+    predict_start = time.perf_counter()
+    if cache is None:
+        with app.state.metrics.stage("model_predict"):
+            predictions = await predict_on_snapshot(served, observations)
+        predictions = predictions.astype(int).tolist()
+        app.state.registry.observe(served.model_file, time.perf_counter() - predict_start, len(predictions))
+    else:
+        keys = [tuple(row) for row in observations.tolist()]
+        predictions = [cache.get(key, served.model_version) for key in keys]
+        missing = [idx for idx, prediction in enumerate(predictions) if prediction is None]
+        if missing:
+            with app.state.metrics.stage("model_predict"):
+                computed = await predict_on_snapshot(served, observations[missing])
+            for idx, prediction in zip(missing, computed.astype(int).tolist()):
+                predictions[idx] = prediction
+                cache.put(keys[idx], served.model_version, prediction)
+            app.state.registry.observe(served.model_file, time.perf_counter() - predict_start, len(missing))
+    app.state.registry.maybe_shadow(served.model_file, observations, predictions, predict_on_snapshot)
+
+    app.state.drift_monitor.observe(observations, predictions)
+    if app.state.prediction_log is not None:
+        await app.state.prediction_log.log(
+            observations, predictions, served.model_version, (time.perf_counter() - started) * 1000
+        )
+    return prediction_response(request, predictions, served.name, single=False)
+
+
+@app.post("/predict_stream")
+async def predict_stream(request: Request):
+    """
+    Scores a newline-delimited JSON body of Iris observations as it arrives.
+    Rows are scored STREAM_CHUNK_SIZE at a time and results are streamed back
+    as NDJSON, one {"line", "species"} object per input line, so neither the
+    input nor the results are held in memory. Malformed lines are reported
+    inline with an errorMessage instead of aborting the stream.
+    """
+    # The whole stream is scored by the model served when it started
+    served = require_served_model()
+
+    async def predict_chunk(observations):
+        started = time.perf_counter()
+        # Earlier chunks are already sent, so a busy pool is waited for rather than cutting the stream short
+        predictions = await app.state.inference_pool.run_waiting(served.model.predict, observations)
+        app.state.metrics.count_predictions(predictions.tolist())
+        app.state.drift_monitor.observe(observations, predictions)
+        if app.state.prediction_log is not None:
+            await app.state.prediction_log.log(
+                observations, predictions, served.model_version, (time.perf_counter() - started) * 1000
+            )
+        return predictions
+
+    return DuplexStreamingResponse(
+        score_ndjson_stream(iter_lines(request.stream(), STREAM_MAX_LINE_BYTES), predict_chunk, STREAM_CHUNK_SIZE),
+        media_type="application/x-ndjson",
+        headers={"X-Model": served.name}
     )
+
+
+# Everything above ran at import: module imports, app and route construction
+app.state.startup_profile["importMs"] = (time.perf_counter() - IMPORT_STARTED) * 1000
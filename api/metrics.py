@@ -0,0 +1,166 @@
+import time
+from bisect import bisect_left
+from collections import Counter
+
+
+# Latency bucket upper bounds in seconds, shared by every histogram
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Stages of a prediction request. JSON bodies are parsed and validated in one pass
+# by pydantic-core, so "validation" covers both; binary bodies are decoded and
+# checked there too.
+STAGES = ("body_read", "validation", "array_build", "model_predict", "response_serialization")
+
+
+class Histogram:
+    """Prometheus-style histogram over preallocated buckets."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> list:
+        lines, cumulative = [], 0
+        bucket_labels = labels + "," if labels else ""
+        total_labels = f"{{{labels}}}" if labels else ""
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{bucket_labels}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{bucket_labels}le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{total_labels} {self.sum}")
+        lines.append(f"{name}_count{total_labels} {self.count}")
+        return lines
+
+
+class StageTimer:
+    """Context manager recording the time spent in one request stage."""
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class MetricsRegistry:
+    """
+    Request, stage, prediction and model swap metrics of the API.
+    Everything is recorded from the event loop thread, so plain counters and
+    preallocated buckets are safe without locks and cost a few list updates.
+    """
+
+    def __init__(self):
+        self.route_latency = {}
+        self.stage_latency = {stage: Histogram() for stage in STAGES}
+        self.requests = Counter()
+        self.predicted_classes = Counter()
+        self.swap_latency = Histogram()
+        self.load_latency = Histogram()
+        self.warmup_latency = Histogram()
+
+    def observe_request(self, route: str, status: int, seconds: float):
+        histogram = self.route_latency.get(route)
+        if histogram is None:
+            histogram = self.route_latency[route] = Histogram()
+        histogram.observe(seconds)
+        self.requests[(route, status)] += 1
+
+    def stage(self, stage: str) -> StageTimer:
+        return StageTimer(self.stage_latency[stage])
+
+    def count_predictions(self, predictions):
+        self.predicted_classes.update(predictions)
+
+    def observe_swap(self, served):
+        self.load_latency.observe(served.load_ms / 1000)
+        self.warmup_latency.observe(served.warmup_ms / 1000)
+        self.swap_latency.observe(served.swap_ms / 1000)
+
+    def render(self, served=None, gauges: dict = None, counters: dict = None) -> str:
+        """Prometheus text exposition format, with extra gauges and counters given as {name: value}."""
+        lines = [
+            "# HELP iris_api_request_duration_seconds Request latency by route",
+            "# TYPE iris_api_request_duration_seconds histogram"
+        ]
+        for route, histogram in sorted(self.route_latency.items()):
+            lines += histogram.render("iris_api_request_duration_seconds", f'route="{route}"')
+
+        lines += [
+            "# HELP iris_api_stage_duration_seconds Prediction request latency by stage",
+            "# TYPE iris_api_stage_duration_seconds histogram"
+        ]
+        for stage, histogram in self.stage_latency.items():
+            lines += histogram.render("iris_api_stage_duration_seconds", f'stage="{stage}"')
+
+        lines += ["# HELP iris_api_requests_total Requests by route and status", "# TYPE iris_api_requests_total counter"]
+        for (route, status), count in sorted(self.requests.items()):
+            lines.append(f'iris_api_requests_total{{route="{route}",status="{status}"}} {count}')
+
+        lines += ["# HELP iris_api_predictions_total Predictions by class", "# TYPE iris_api_predictions_total counter"]
+        for species, count in sorted(self.predicted_classes.items()):
+            lines.append(f'iris_api_predictions_total{{species="{species}"}} {count}')
+
+        for name, histogram, description in (
+            ("iris_api_model_load_duration_seconds", self.load_latency, "Model load time per swap"),
+            ("iris_api_model_warmup_duration_seconds", self.warmup_latency, "Model warm-up time per swap"),
+            ("iris_api_model_swap_duration_seconds", self.swap_latency, "Total model swap time")
+        ):
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+            lines += histogram.render(name, "")
+
+        if served is not None:
+            lines += [
+                "# HELP iris_api_model_info Currently served model",
+                "# TYPE iris_api_model_info gauge",
+                f'iris_api_model_info{{model="{served.name}",version="{served.model_version}"}} 1'
+            ]
+        for name, value in (gauges or {}).items():
+            lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+        for name, value in (counters or {}).items():
+            lines += [f"# TYPE {name} counter", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request by route template and status.
+    Written as plain ASGI rather than BaseHTTPMiddleware so streaming responses
+    pass through untouched. Reads the registry from app.state.metrics.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start, status = time.perf_counter(), 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics = getattr(scope["app"].state, "metrics", None)
+            if metrics is not None:
+                route = scope.get("route")
+                metrics.observe_request(route.path if route is not None else "unmatched", status, time.perf_counter() - start)
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import pickle
+import random
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+import numpy as np
+
+from api.executor import ExecutorSaturated
+from api.metrics import Histogram
+
+
+logger = logging.getLogger(__name__)
+
+
+def model_arrays(model) -> list:
+    """
+    The NumPy arrays holding a model's parameters: tree node arrays of
+    scikit-learn forests, or the array attributes of compiled forests
+    and other models. Empty if the model keeps none directly.
+    """
+    model = getattr(model, "model", model)  # A ServedModel wraps the model it serves
+    if isinstance(model, np.ndarray):
+        return [model]
+    if hasattr(model, "estimators_"):
+        trees = [getattr(estimator, "tree_", None) for estimator in model.estimators_]
+        if all(tree is not None for tree in trees):
+            return [array for tree in trees for array in (tree.__getstate__()["nodes"], tree.value)]
+    return [value for value in vars(model).values() if isinstance(value, np.ndarray)]
+
+
+def estimate_model_bytes(model) -> int:
+    """Approximate in-memory size of a model by its arrays, or by its pickled size for models without any"""
+    arrays = model_arrays(model)
+    if arrays:
+        return sum(array.nbytes for array in arrays)
+    try:
+        return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+class ModelStats:
+    """Prediction latency of one model, from the event loop only."""
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.rows = 0
+
+    def observe(self, seconds: float, rows: int):
+        self.latency.observe(seconds)
+        self.rows += rows
+
+    def to_dict(self) -> dict:
+        count = self.latency.count
+        return {
+            "requests": count,
+            "rows": self.rows,
+            "meanMs": self.latency.sum / count * 1000 if count else None
+        }
+
+
+class ShadowStats:
+    """How often a shadow model agrees with the model that answered."""
+
+    def __init__(self):
+        self.compared = 0
+        self.agreed = 0
+        self.skipped = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "compared": self.compared,
+            "agreed": self.agreed,
+            "skipped": self.skipped,
+            "agreementRate": self.agreed / self.compared if self.compared else None
+        }
+
+
+class ModelRegistry:
+    """
+    Several models from the models directory kept resident next to the served one.
+    Models are loaded on first use by `loader` (an async function taking a file
+    name), and the least recently used are evicted once their estimated size
+    exceeds memory_budget_bytes. Traffic can be split between named models by
+    weight, and a shadow model can score a sampled fraction of requests after
+    the response is sent, to compare its predictions with live ones.
+    Only accessed from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, loader: Callable[[str], Awaitable], memory_budget_bytes: int, rng: Optional[random.Random] = None):
+        self.loader = loader
+        self.memory_budget_bytes = memory_budget_bytes
+        self.rng = rng or random.Random()
+        self._models = OrderedDict()  # name -> (model, estimated bytes)
+        self._loading = {}  # name -> future of a load in progress
+        self.routes = {}  # name -> weight
+        self.shadow_model = None
+        self.shadow_fraction = 0.0
+        self.model_stats = {}
+        self.shadow_stats = {}
+        self.evictions = 0
+        self._shadow_tasks = set()
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(size for _, size in self._models.values())
+
+    async def get(self, name: str):
+        """Return a resident model, loading it (once, however many callers wait) if needed"""
+        if name in self._models:
+            self._models.move_to_end(name)
+            return self._models[name][0]
+        if name not in self._loading:
+            self._loading[name] = asyncio.ensure_future(self._load(name))
+        return await asyncio.shield(self._loading[name])
+
+    async def _load(self, name: str):
+        try:
+            model = await self.loader(name)
+            # Sizing can fall back to pickling the whole model, so it stays off the event loop
+            size = await asyncio.to_thread(estimate_model_bytes, model)
+            self._models[name] = (model, size)
+            self._evict(keep=name)
+            logger.info(f"Registry loaded {name} ({size / 1e6:.1f} MB, {len(self._models)} resident)")
+            return model
+        finally:
+            del self._loading[name]
+
+    def _evict(self, keep: str):
+        while self.resident_bytes > self.memory_budget_bytes and len(self._models) > 1:
+            name = next(iter(self._models))
+            if name == keep:
+                break
+            del self._models[name]
+            self.evictions += 1
+            logger.info(f"Registry evicted {name} to stay within {self.memory_budget_bytes / 1e6:.1f} MB")
+
+    def discard(self, name: str):
+        """Drop a resident model, e.g. because its file was replaced; it is reloaded on next use"""
+        self._models.pop(name, None)
+
+    def set_routes(self, weights: Dict[str, float]):
+        self.routes = {name: weight for name, weight in weights.items() if weight > 0}
+
+    def set_shadow(self, name: Optional[str], fraction: float):
+        self.shadow_model = name
+        self.shadow_fraction = fraction if name else 0.0
+
+    def pick_route(self) -> Optional[str]:
+        """Weighted choice of a routed model, None to answer with the served model"""
+        if not self.routes:
+            return None
+        names = list(self.routes)
+        return self.rng.choices(names, weights=[self.routes[name] for name in names])[0]
+
+    def observe(self, name: str, seconds: float, rows: int):
+        stats = self.model_stats.get(name)
+        if stats is None:
+            stats = self.model_stats[name] = ModelStats()
+        stats.observe(seconds, rows)
+
+    def maybe_shadow(self, primary_name: str, observations, predictions, predict: Callable[[object, object], Awaitable]):
+        """Sample this request for shadow scoring; the comparison runs in a task the caller does not wait on"""
+        shadow_name = self.shadow_model
+        if shadow_name is None or shadow_name == primary_name or self.rng.random() >= self.shadow_fraction:
+            return
+        task = asyncio.create_task(self._shadow(shadow_name, primary_name, observations, list(predictions), predict))
+        self._shadow_tasks.add(task)
+        task.add_done_callback(self._shadow_tasks.discard)
+
+    async def _shadow(self, shadow_name, primary_name, observations, predictions, predict):
+        stats = self.shadow_stats.get((primary_name, shadow_name))
+        if stats is None:
+            stats = self.shadow_stats[(primary_name, shadow_name)] = ShadowStats()
+        try:
+            model = await self.get(shadow_name)
+            start = time.perf_counter()
+            shadow_predictions = await predict(model, observations)
+            self.observe(shadow_name, time.perf_counter() - start, len(predictions))
+        except ExecutorSaturated:
+            # Shadow scoring never competes with live traffic for a full pool
+            stats.skipped += 1
+            return
+        except Exception as e:
+            stats.skipped += 1
+            logger.warning(f"Shadow scoring with {shadow_name} failed: {e}")
+            return
+        stats.compared += len(predictions)
+        stats.agreed += sum(int(a) == int(b) for a, b in zip(predictions, shadow_predictions))
+
+    async def stop(self):
+        """Cancel shadow comparisons still running"""
+        for task in list(self._shadow_tasks):
+            task.cancel()
+        await asyncio.gather(*self._shadow_tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "memoryBudgetBytes": self.memory_budget_bytes,
+            "residentBytes": self.resident_bytes,
+            "resident": [{"name": name, "bytes": size} for name, (_, size) in self._models.items()],
+            "evictions": self.evictions,
+            "routes": self.routes,
+            "shadow": {"model": self.shadow_model, "fraction": self.shadow_fraction},
+            "models": {name: stats.to_dict() for name, stats in self.model_stats.items()},
+            "shadowAgreement": [
+                {"primary": primary, "shadow": shadow, **stats.to_dict()}
+                for (primary, shadow), stats in self.shadow_stats.items()
+            ]
+        }
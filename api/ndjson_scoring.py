@@ -0,0 +1,162 @@
+import json
+from typing import AsyncIterator, Callable, Iterable, Iterator
+
+import numpy as np
+from pydantic import ValidationError
+from starlette.responses import StreamingResponse
+
+from api.schema_config import Iris, FEATURE_NAMES
+
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_MAX_LINE_BYTES = 64 * 1024  # An observation is ~100 bytes, anything this long is not one
+
+
+def parse_observation_line(line: bytes):
+    """Parse one NDJSON line into a feature row, returning (row, None) or (None, error message)."""
+    try:
+        features = Iris.model_validate_json(line)
+    except ValidationError as e:
+        return None, "; ".join(
+            f"{'.'.join(str(loc) for loc in err['loc']) or 'line'}: {err['msg']}" for err in e.errors()
+        )
+    return [getattr(features, name) for name in FEATURE_NAMES], None
+
+
+class ChunkBuffer:
+    """
+    Collects parsed lines until chunk_size of them are waiting, so each chunk
+    is scored with one vectorized predict. Malformed lines keep their position
+    and are written inline between the predictions of their chunk; they count
+    towards the chunk too, so a run of bad lines is still written out as it comes.
+    """
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.entries = []  # (line number, error message or None)
+        self.rows = []
+
+    def add(self, line_number: int, line: bytes) -> bool:
+        """Buffer a line, returning True once the chunk should be scored."""
+        if isinstance(line, OversizedLine):
+            row, error = None, f"line: longer than the {len(line)} byte limit"
+        else:
+            row, error = parse_observation_line(line)
+        self.entries.append((line_number, error))
+        if row is not None:
+            self.rows.append(row)
+        return len(self.entries) >= self.chunk_size
+
+    def features(self) -> np.ndarray:
+        return np.array(self.rows, dtype=np.float64).reshape(-1, len(FEATURE_NAMES))
+
+    def flush(self, predictions) -> bytes:
+        """Format the buffered lines as NDJSON results and reset the buffer."""
+        predictions = iter(np.asarray(predictions).astype(int).tolist())
+        results = [
+            {"line": line_number, "species": next(predictions)} if error is None
+            else {"line": line_number, "species": None, "errorMessage": error}
+            for line_number, error in self.entries
+        ]
+        self.entries, self.rows = [], []
+        return "".join(json.dumps(result) + "\n" for result in results).encode()
+
+
+class OversizedLine(bytes):
+    """The first max_line_bytes of a line that was longer; the rest of it was dropped unread."""
+
+
+class LineSplitter:
+    """
+    Splits byte chunks into lines, holding at most max_line_bytes of a partial
+    line. Bytes past that limit are dropped up to the next newline and the line
+    is returned as an OversizedLine, so a missing newline cannot grow memory.
+    """
+
+    def __init__(self, max_line_bytes: int = DEFAULT_MAX_LINE_BYTES):
+        self.max_line_bytes = max_line_bytes
+        self.partial = bytearray()
+        self.oversized = False
+
+    def _line(self) -> bytes:
+        line = OversizedLine(self.partial) if self.oversized else bytes(self.partial)
+        self.partial.clear()
+        self.oversized = False
+        return line
+
+    def _append(self, data: bytes):
+        if not self.oversized:
+            self.partial += data[:self.max_line_bytes + 1 - len(self.partial)]
+            if len(self.partial) > self.max_line_bytes:
+                del self.partial[self.max_line_bytes:]
+                self.oversized = True
+
+    def feed(self, chunk: bytes) -> list:
+        """Complete lines ending in this chunk"""
+        lines, start = [], 0
+        while (end := chunk.find(b"\n", start)) != -1:
+            self._append(chunk[start:end])
+            lines.append(self._line())
+            start = end + 1
+        self._append(chunk[start:])
+        return lines
+
+    def finish(self) -> list:
+        """The last line, if the input did not end with a newline"""
+        return [self._line()] if self.partial or self.oversized else []
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int = DEFAULT_MAX_LINE_BYTES) -> AsyncIterator[bytes]:
+    """Split an async stream of byte chunks into lines without reading it all."""
+    splitter = LineSplitter(max_line_bytes)
+    async for chunk in chunks:
+        for line in splitter.feed(chunk):
+            yield line
+    for line in splitter.finish():
+        yield line
+
+
+def split_lines(chunks: Iterable[bytes], max_line_bytes: int = DEFAULT_MAX_LINE_BYTES) -> Iterator[bytes]:
+    """Synchronous counterpart of iter_lines, used by the bulk scoring CLI."""
+    splitter = LineSplitter(max_line_bytes)
+    for chunk in chunks:
+        yield from splitter.feed(chunk)
+    yield from splitter.finish()
+
+
+async def score_ndjson_stream(lines: AsyncIterator[bytes], predict: Callable, chunk_size: int) -> AsyncIterator[bytes]:
+    """Score NDJSON lines chunk by chunk, where predict is an async function of a feature array."""
+    buffer, line_number = ChunkBuffer(chunk_size), 0
+    async for line in lines:
+        line_number += 1
+        if (line.strip() or isinstance(line, OversizedLine)) and buffer.add(line_number, line):
+            features = buffer.features()
+            yield buffer.flush(await predict(features) if len(features) else [])
+    if buffer.entries:
+        features = buffer.features()
+        yield buffer.flush(await predict(features) if len(features) else [])
+
+
+def score_ndjson_lines(lines: Iterable[bytes], predict: Callable, chunk_size: int) -> Iterator[bytes]:
+    """Synchronous counterpart of score_ndjson_stream, used by the bulk scoring CLI."""
+    buffer = ChunkBuffer(chunk_size)
+    for line_number, line in enumerate(lines, start=1):
+        if (line.strip() or isinstance(line, OversizedLine)) and buffer.add(line_number, line):
+            features = buffer.features()
+            yield buffer.flush(predict(features) if len(features) else [])
+    if buffer.entries:
+        features = buffer.features()
+        yield buffer.flush(predict(features) if len(features) else [])
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that does not listen for client disconnects.
+    The default response consumes receive() to detect disconnects, which would
+    swallow request body chunks that are still being read while results stream out.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
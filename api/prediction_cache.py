@@ -0,0 +1,57 @@
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class PredictionCache:
+    """
+    In-process LRU cache of predictions with an optional time-to-live.
+    Keys are the exact feature tuple plus the model version that produced the
+    prediction, and the whole cache is cleared whenever the served model changes.
+    Only accessed from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl_sec: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl_sec = ttl_sec
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, features: tuple, model_version: Hashable):
+        """Return the cached prediction, or None on a miss or expired entry."""
+        key = (features, model_version)
+        entry = self._entries.get(key)
+        if entry is not None:
+            prediction, expires_at = entry
+            if expires_at is None or expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return prediction
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, features: tuple, model_version: Hashable, prediction):
+        expires_at = time.monotonic() + self.ttl_sec if self.ttl_sec else None
+        self._entries[(features, model_version)] = (prediction, expires_at)
+        self._entries.move_to_end((features, model_version))
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxSize": self.max_size,
+            "ttlSec": self.ttl_sec,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRate": round(self.hits / lookups, 4) if lookups else None
+        }
@@ -0,0 +1,194 @@
+import asyncio
+import glob
+import logging
+import os
+import time
+from typing import Iterator, Optional
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+SHARD_PATTERN = "predictions-*.npz"
+
+
+class PredictionLog:
+    """
+    Records every served prediction without writing on the request path.
+    Rows go into preallocated ring buffers (features, prediction, model version,
+    latency, timestamp); a background task copies out whatever is pending every
+    flush_interval_sec, or as soon as flush_rows are waiting, and writes it to a
+    compressed .npz shard in a worker thread. Only the newest max_shards are kept.
+    When the buffer is full, the "drop" policy discards new rows and counts them,
+    the "block" policy makes the request wait for the next flush.
+    Rows are only added from the event loop, so no locking is needed.
+    """
+
+    def __init__(
+            self,
+            directory: str,
+            n_features: int,
+            capacity: int = 65_536,
+            flush_rows: int = 8_192,
+            flush_interval_sec: float = 5,
+            max_shards: int = 1_000,
+            policy: str = "drop"
+        ):
+        if policy not in ("drop", "block"):
+            raise ValueError(f"Unknown prediction log policy: {policy}")
+        self.directory = directory
+        self.capacity = capacity
+        self.flush_rows = min(flush_rows, capacity)
+        self.flush_interval_sec = flush_interval_sec
+        self.max_shards = max_shards
+        self.policy = policy
+
+        self.features = np.zeros((capacity, n_features), dtype=np.float64)
+        self.predictions = np.zeros(capacity, dtype=np.int64)
+        self.model_versions = np.empty(capacity, dtype=object)
+        self.latency_ms = np.zeros(capacity, dtype=np.float32)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self._head = 0  # Next row to write
+        self._depth = 0  # Rows written but not yet flushed
+
+        self.logged = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.shards_written = 0
+        self.last_flush_ms = 0.0
+        self._sequence = 0
+        self._task = None
+        self._stopping = False
+        self._flush_requested = None
+        self._space_available = None
+
+    def start(self):
+        """Start the background flush task on the running event loop."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._flush_requested = asyncio.Event()
+        self._space_available = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush task and write out whatever is still buffered."""
+        if self._task is not None:
+            # Not cancelled: a shard write in progress would carry on in its thread,
+            # racing the final flush below
+            self._stopping = True
+            self._flush_requested.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def log(self, observations: np.ndarray, predictions, model_version: str, latency_ms: float):
+        """Buffer scored rows; only waits if the buffer is full under the "block" policy"""
+        predictions = np.asarray(predictions, dtype=np.int64)
+        start = 0
+        while start < len(predictions):
+            free = self.capacity - self._depth
+            if free == 0:
+                if self.policy == "drop":
+                    self.dropped += len(predictions) - start
+                    return
+                self._space_available.clear()
+                self._flush_requested.set()
+                await self._space_available.wait()
+                continue
+            count = min(free, len(predictions) - start)
+            self._write(observations[start:start + count], predictions[start:start + count], model_version, latency_ms)
+            start += count
+        if self._depth >= self.flush_rows and self._flush_requested is not None:
+            self._flush_requested.set()
+
+    def _write(self, observations, predictions, model_version, latency_ms):
+        count = len(predictions)
+        positions = (self._head + np.arange(count)) % self.capacity
+        self.features[positions] = observations
+        self.predictions[positions] = predictions
+        self.model_versions[positions] = model_version
+        self.latency_ms[positions] = latency_ms
+        self.timestamps[positions] = time.time()
+        self._head = (self._head + count) % self.capacity
+        self._depth += count
+        self.logged += count
+
+    def _take_pending(self) -> Optional[dict]:
+        """Copy the pending rows out in order and free their slots"""
+        if self._depth == 0:
+            return None
+        positions = (self._head - self._depth + np.arange(self._depth)) % self.capacity
+        pending = {
+            "features": self.features[positions],
+            "predictions": self.predictions[positions],
+            "model_versions": self.model_versions[positions].astype(str),
+            "latency_ms": self.latency_ms[positions],
+            "timestamps": self.timestamps[positions]
+        }
+        self._depth = 0
+        if self._space_available is not None:
+            self._space_available.set()
+        return pending
+
+    async def flush(self):
+        """Write pending rows to a new shard off the event loop"""
+        pending = self._take_pending()
+        if pending is None:
+            return
+        self._sequence += 1
+        start = time.perf_counter()
+        path = await asyncio.to_thread(self._write_shard, pending, self._sequence)
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+        self.flushed += len(pending["predictions"])
+        self.shards_written += 1
+        logger.debug(f"Flushed {len(pending['predictions'])} predictions to {path}")
+
+    def _write_shard(self, pending: dict, sequence: int) -> str:
+        path = os.path.join(self.directory, f"predictions-{time.time_ns()}-{sequence:06d}.npz")
+        # Written under a name readers skip, then renamed, so no reader sees a partial shard
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f, **pending)
+        os.replace(tmp_path, path)
+        for stale_path in sorted(glob.glob(os.path.join(self.directory, SHARD_PATTERN)))[:-self.max_shards]:
+            os.remove(stale_path)
+        return path
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval_sec)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Failed to flush prediction log: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "policy": self.policy,
+            "capacity": self.capacity,
+            "depth": self._depth,
+            "logged": self.logged,
+            "dropped": self.dropped,
+            "flushed": self.flushed,
+            "shardsWritten": self.shards_written,
+            "lastFlushMs": self.last_flush_ms
+        }
+
+
+def iter_log_shards(directory: str) -> Iterator[dict]:
+    """Read prediction log shards oldest first, one dict of arrays per shard"""
+    for path in sorted(glob.glob(os.path.join(directory, SHARD_PATTERN))):
+        with np.load(path) as shard:
+            yield {name: shard[name] for name in shard.files}
+
+
+def load_prediction_logs(directory: str) -> Optional[dict]:
+    """Concatenate every shard, e.g. as evaluation data for the scheduler; None if there are none"""
+    shards = list(iter_log_shards(directory))
+    if not shards:
+        return None
+    return {name: np.concatenate([shard[name] for shard in shards]) for name in shards[0]}
@@ -1,4 +1,9 @@
-from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+
+MAX_BATCH_SIZE = 10_000
 
 
 class Iris(BaseModel):
@@ -8,4 +13,49 @@ class Iris(BaseModel):
     petalwidth: float = Field(..., gt=0, description="Must be > 0")
 
 
-FEATURE_NAMES = list(Iris.__fields__.keys())
\ No newline at end of file
+FEATURE_NAMES = list(Iris.__fields__.keys())
+
+
+class IrisBatch(BaseModel):
+    """
+    A batch of observations, sent either row-wise as a list of Iris objects
+    or column-wise as {"columns": {feature_name: [values, ...]}}.
+    Columnar payloads are transposed into rows so errors are reported by row index.
+    """
+    observations: List[Iris] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+    @model_validator(mode="before")
+    @classmethod
+    def columns_to_observations(cls, data):
+        if not isinstance(data, dict) or "columns" not in data:
+            return data
+        columns = data["columns"]
+        if not isinstance(columns, dict):
+            raise ValueError("columns must map each feature name to a list of values")
+        missing = [name for name in FEATURE_NAMES if name not in columns]
+        if missing:
+            raise ValueError(f"columns is missing features: {missing}")
+        if not all(isinstance(columns[name], list) for name in FEATURE_NAMES):
+            raise ValueError("each feature column must be a list of values")
+        lengths = {len(columns[name]) for name in FEATURE_NAMES}
+        if len(lengths) != 1:
+            raise ValueError("all feature columns must have the same length")
+        rows = zip(*(columns[name] for name in FEATURE_NAMES))
+        return {"observations": [dict(zip(FEATURE_NAMES, row)) for row in rows]}
+
+
+class RegistryRoutes(BaseModel):
+    """Traffic weight of each model file, e.g. {"rf-24.joblib": 0.9, "rf-96.joblib": 0.1}"""
+    weights: Dict[str, float] = Field(..., description="Weights must be >= 0")
+
+    @model_validator(mode="after")
+    def check_weights(self):
+        if any(weight < 0 for weight in self.weights.values()):
+            raise ValueError("weights must be >= 0")
+        return self
+
+
+class ShadowConfig(BaseModel):
+    """Model scored in the shadow of live traffic on a sampled fraction of requests"""
+    model: Optional[str] = None
+    fraction: float = Field(0.1, ge=0, le=1, description="Must be between 0 and 1")
@@ -1,13 +1,36 @@
 import base64
+import glob
 import io
-from typing import Any
-import joblib
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable
+import numpy as np
 
 from fastapi import HTTPException
 
+from api.forest_engine import CompiledForest, compile_model
+
+
+@dataclass(frozen=True)
+class ServedModel:
+    """Immutable snapshot of the served model, published to app state in a single assignment.
+    Requests read the snapshot once, so they finish on the model they started with."""
+    model: Any
+    model_file: str
+    model_version: str
+    load_ms: float = 0.0
+    warmup_ms: float = 0.0
+    swap_ms: float = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.model_file.split(".")[0]
+
 
 def load_model(models_dir, model_filename: str) -> Any:
   """Load a model using joblib from the container model directory."""
+  import joblib  # Deferred: only needed once a model is loaded, keeps API import fast
   try:
     return joblib.load(f"{models_dir}/{model_filename}")
   except FileNotFoundError:
@@ -16,14 +39,99 @@ def load_model(models_dir, model_filename: str) -> Any:
     raise HTTPException(status_code=500, detail=str(e))
 
 
+def load_mmap_model(models_dir, model_filename: str, cache_dir: str, model=None) -> Any:
+    """
+    Load a forest from a memory-mapped flat copy of its compiled arrays, so all
+    workers on a node share one page-cached copy and loading is near-instant.
+    The flat copy is built on first use (from model if given, else from the joblib
+    file) and keyed on the joblib file's size and mtime, so replaced files are rebuilt.
+    Models that are not forests are returned as loaded by joblib.
+    """
+    try:
+        stat = os.stat(f"{models_dir}/{model_filename}")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Model file '{model_filename}' not found")
+    flat_path = os.path.join(cache_dir, f"{model_filename}.{stat.st_size}-{stat.st_mtime_ns}.forest")
+
+    if not os.path.exists(flat_path):
+        model = model if model is not None else load_model(models_dir, model_filename)
+        compiled = compile_model(model)
+        if not isinstance(compiled, CompiledForest):
+            return model
+        os.makedirs(cache_dir, exist_ok=True)
+        compiled.save(flat_path)
+        # Flat copies of earlier versions of this file are no longer needed
+        for stale_path in glob.glob(os.path.join(cache_dir, glob.escape(model_filename) + ".*.forest")):
+            if stale_path != flat_path:
+                os.remove(stale_path)
+
+    return CompiledForest.load(flat_path, mmap_mode="r")
+
+
+def load_compact_model(models_dir, model_filename: str, cache_dir: str, model=None, compression: str = "zlib") -> Any:
+    """
+    Load a forest from its compact, quantized copy (see api.compact_forest), which
+    takes a fraction of the memory and load time of the joblib file.
+    The copy is exported on first use with a parity check on synthetic rows, and
+    keyed on the joblib file's size and mtime like the memory-mapped copies.
+    Models that are not forests are returned as loaded by joblib.
+    """
+    from api.compact_forest import CompactForest, export_compact_model
+
+    try:
+        stat = os.stat(f"{models_dir}/{model_filename}")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Model file '{model_filename}' not found")
+    compact_path = os.path.join(cache_dir, f"{model_filename}.{stat.st_size}-{stat.st_mtime_ns}.cforest")
+
+    if not os.path.exists(compact_path):
+        model = model if model is not None else load_model(models_dir, model_filename)
+        compiled = compile_model(model)
+        if not isinstance(compiled, CompiledForest):
+            return model
+        os.makedirs(cache_dir, exist_ok=True)
+        parity_rows = np.random.default_rng(0).uniform(0.1, 10.0, size=(1_000, model.n_features_in_))
+        # Only the parity checks: the joblib size and load time comparison is for the CLI report
+        export_compact_model(model, compact_path, parity_rows, compression, compiled=compiled, compare_joblib=False)
+        for stale_path in glob.glob(os.path.join(cache_dir, glob.escape(model_filename) + ".*.cforest")):
+            if stale_path != compact_path:
+                os.remove(stale_path)
+
+    return CompactForest.load(compact_path)
+
+
 def save_retrained_model(model_object, models_dir, model_filename):
     """When a re-trained model is sent to the API, 
     it should be saved as a backup copy for re-loading."""
     # Decode base64 back into bytes
+    import joblib
     model_bytes = base64.b64decode(model_object)
     # Load into sklearn using BytesIO
     new_model = joblib.load(io.BytesIO(model_bytes))
-    joblib.dump(new_model, f"{models_dir}/{model_filename}")
+    # Written aside and renamed, since the existing file may be a hard link into the artifact store
+    tmp_path = f"{models_dir}/.{model_filename}.tmp"
+    joblib.dump(new_model, tmp_path)
+    os.replace(tmp_path, f"{models_dir}/{model_filename}")
+
+
+def observations_to_array(observations: Iterable, feature_names: list) -> np.ndarray:
+    """Stack validated observations into one contiguous float array in feature order."""
+    return np.array(
+        [[getattr(obs, name) for name in feature_names] for obs in observations],
+        dtype=np.float64
+    )
+
+
+def warm_up_model(model, n_features: int, batches: int = 3, rows: int = 64) -> list:
+    """Run a few synthetic batches through a freshly loaded model so its memory
+    is paged in before it serves traffic. Returns each batch's latency in ms."""
+    synthetic = np.random.default_rng(0).uniform(0.1, 10.0, size=(rows, n_features))
+    latencies = []
+    for _ in range(batches):
+        start = time.perf_counter()
+        model.predict(synthetic)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
 
 
 def increment_model_version(version):
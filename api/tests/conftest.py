@@ -0,0 +1,21 @@
+import shutil
+
+import pytest
+
+import api.main
+
+
+@pytest.fixture(autouse=True)
+def scratch_state_dirs(tmp_path_factory, monkeypatch):
+    """
+    Keep everything the app writes out of api/: prediction logs, stored artifacts
+    and model files, served from a copy holding only the default model. They go
+    in a directory of their own, so tests can still expect tmp_path to start empty.
+    """
+    state_dir = tmp_path_factory.mktemp("api_state")
+    models_dir = state_dir / "prod_models"
+    models_dir.mkdir()
+    shutil.copy(f"{api.main.MODELS_DIR}/{api.main.DEFAULT_MODEL_FILE}", models_dir)
+    monkeypatch.setattr(api.main, "MODELS_DIR", str(models_dir))
+    monkeypatch.setattr(api.main, "PREDICTION_LOG_DIR", str(state_dir / "prediction_logs"))
+    monkeypatch.setattr(api.main, "ARTIFACTS_DIR", str(state_dir / "artifacts"))
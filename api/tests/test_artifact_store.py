@@ -0,0 +1,154 @@
+import asyncio
+import os
+import shutil
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import api.main
+from api.artifact_store import ArtifactStore, file_sha256
+from api.main import app
+from scheduled_task.scheduled_task_utils.http_client import create_api_client
+from scheduled_task.scheduled_task_utils.model_update_utils import update_model_served
+
+
+RETRAINED_MODELS_DIR = "scheduled_task/retrained_models"
+
+
+class RecordingTransport(httpx.ASGITransport):
+    """Records the path of every request sent to the app"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.paths = []
+
+    async def handle_async_request(self, request):
+        self.paths.append(request.url.path)
+        return await super().handle_async_request(request)
+
+
+@pytest.fixture(autouse=True)
+def artifacts_dir(tmp_path, monkeypatch):
+    """An empty artifact store next to a models directory holding only the default model"""
+    models_dir = tmp_path / "models"
+    models_dir.mkdir()
+    shutil.copy(f"{api.main.MODELS_DIR}/{api.main.DEFAULT_MODEL_FILE}", models_dir)
+    monkeypatch.setattr(api.main, "MODELS_DIR", str(models_dir))
+    monkeypatch.setattr(api.main, "ARTIFACTS_DIR", str(tmp_path / "artifacts"))
+    return tmp_path / "artifacts"
+
+
+def test_repromotion_skips_upload_and_reuses_loaded_model():
+    """A model the API already has is promoted by hash: no upload, no reload, same model object"""
+    transport = RecordingTransport(app=app)
+
+    async def promote(model_files):
+        async with create_api_client(transport=transport, base_url="http://test") as client:
+            return [await update_model_served(client, "", RETRAINED_MODELS_DIR, model_file) for model_file in model_files]
+
+    with TestClient(app) as client:
+        asyncio.run(promote(["rf-24.joblib"]))
+        first_model = app.state.served.model
+        updates = asyncio.run(promote(["rf-96.joblib", "rf-24.joblib"]))
+        served = app.state.served
+        artifacts = client.get("/artifacts").json()
+
+    assert (updates == [("rf-96.joblib", "1.2"), ("rf-24.joblib", "1.3")]) and \
+        (transport.paths.count("/upload_model") == 2) and (transport.paths.count("/promote_model") == 1) and \
+        (served.model is first_model) and (served.load_ms == 0) and \
+        (artifacts["refs"]["rf-24.joblib"] == file_sha256(f"{RETRAINED_MODELS_DIR}/rf-24.joblib")) and \
+        (artifacts["loadedModels"]["hits"] == 1)
+
+
+def test_identical_models_are_stored_once():
+    """The same bytes uploaded under two names are one object, shared by both model files"""
+    with open(f"{RETRAINED_MODELS_DIR}/rf-24.joblib", "rb") as f:
+        model_bytes = f.read()
+
+    with TestClient(app) as client:
+        for name in ("rf-24.joblib", "rf-24-copy.joblib"):
+            client.post("/upload_model", params={"modelFilename": name}, content=model_bytes)
+        sha256 = file_sha256(f"{RETRAINED_MODELS_DIR}/rf-24.joblib")
+        artifact = client.get(f"/artifacts/{sha256}").json()
+        missing = client.get(f"/artifacts/{'0' * 64}")
+
+    stat, copy_stat = (os.stat(f"{api.main.MODELS_DIR}/{name}") for name in ("rf-24.joblib", "rf-24-copy.joblib"))
+    assert (artifact["names"] == ["rf-24-copy.joblib", "rf-24.joblib"]) and artifact["loaded"] and \
+        (missing.status_code == 404) and (stat.st_ino == copy_stat.st_ino)
+
+
+def test_corrupt_artifact_is_not_promoted():
+    """An object whose bytes no longer match its hash is removed instead of served"""
+    sha256 = file_sha256(f"{RETRAINED_MODELS_DIR}/rf-96.joblib")
+    with TestClient(app) as client:
+        with open(f"{RETRAINED_MODELS_DIR}/rf-96.joblib", "rb") as f:
+            client.post("/upload_model", params={"modelFilename": "rf-96.joblib"}, content=f.read())
+        # Forget the loaded model, then damage the stored object
+        app.state.loaded_models = api.main.LoadedModels(0)
+        object_path = app.state.artifact_store.object_path(sha256)
+        os.remove(f"{api.main.MODELS_DIR}/rf-96.joblib")
+        with open(object_path, "r+b") as f:
+            f.write(b"corrupt")
+        response = client.post("/promote_model", params={"modelFilename": "rf-96.joblib", "sha256": sha256})
+        exists = client.get(f"/artifacts/{sha256}")
+
+    assert (response.status_code == 404) and (exists.status_code == 404)
+
+
+def test_path_like_hashes_are_rejected(tmp_path):
+    """Hashes are never resolved as paths, so a traversal cannot reach or delete files outside the store"""
+    victim = tmp_path / "victim.txt"
+    victim.write_text("keep me")
+    with TestClient(app) as client:
+        # Relative to the objects/<prefix> directory a hash would be looked up in
+        traversal = os.path.relpath(victim, os.path.join(app.state.artifact_store.objects_dir, "xx"))
+        promoted = client.post("/promote_model", params={"modelFilename": "x.joblib", "sha256": traversal})
+        looked_up = client.get("/artifacts/..victim.txt")
+        short = client.get(f"/artifacts/{'a' * 63}")
+
+    assert (promoted.status_code == 400) and (looked_up.status_code == 400) and (short.status_code == 400) and \
+        (victim.read_text() == "keep me") and not os.path.exists(f"{api.main.MODELS_DIR}/x.joblib")
+
+
+def test_gc_keeps_referenced_and_recent_artifacts(tmp_path):
+    """Unreferenced objects beyond the newest keep_unreferenced are collected once older than min_age_sec"""
+    store = ArtifactStore(str(tmp_path / "store"), api.main.MODELS_DIR, keep_unreferenced=1, min_age_sec=60)
+    hashes = []
+    for version in range(4):
+        path = tmp_path / f"upload-{version}"
+        path.write_bytes(f"model {version}".encode())
+        hashes.append(store.ingest(str(path)))
+        # Each version replaces the last under the same name
+        store.link(hashes[-1], "model.joblib")
+
+    too_recent = store.gc()
+    removed = store.gc(now=os.path.getmtime(store.refs_path) + 120)
+
+    assert (too_recent == []) and (sorted(removed) == sorted(hashes[:2])) and \
+        all(store.has(sha256) for sha256 in hashes[2:]) and (store.ref("model.joblib") == hashes[3])
+
+
+def test_adopted_files_are_not_shared_with_the_store(tmp_path):
+    """Overwriting an adopted model file in place leaves its stored object, and that object's hash, intact"""
+    models_dir = tmp_path / "adopted"
+    models_dir.mkdir()
+    shutil.copy(f"{RETRAINED_MODELS_DIR}/rf-24.joblib", models_dir / "model.joblib")
+    store = ArtifactStore(str(tmp_path / "store"), str(models_dir))
+    sha256 = store.adopt("model.joblib")
+    # Like `cp other.joblib model.joblib`, which truncates and rewrites the existing inode
+    with open(models_dir / "model.joblib", "r+b") as f:
+        f.truncate(0)
+        f.write(b"another model")
+
+    assert store.verify(sha256) and (file_sha256(store.object_path(sha256)) == sha256)
+
+
+def test_artifact_collected_during_promotion_is_not_found(monkeypatch):
+    """An object removed between the lookup and the link answers 404, so the scheduler falls back to uploading"""
+    with TestClient(app) as client:
+        # The store reports the object, which is then gone when it is verified and linked
+        monkeypatch.setattr(app.state.artifact_store, "has", lambda sha256: True)
+        response = client.post("/promote_model", params={"modelFilename": "rf-24.joblib", "sha256": "a" * 64})
+
+    assert (response.status_code == 404) and not os.path.exists(f"{api.main.MODELS_DIR}/rf-24.joblib")
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+
+import joblib
+from fastapi.testclient import TestClient
+import numpy as np
+
+import api.main
+from api.main import app, MODELS_DIR, DEFAULT_MODEL_FILE
+from api.batching import MicroBatcher
+from api.schema_config import FEATURE_NAMES
+
+
+DATA_PATH = "api/tests/data"
+TEST_FEATURES = np.load(f'{DATA_PATH}/X_test.npy')
+MODEL = joblib.load(f"{MODELS_DIR}/{DEFAULT_MODEL_FILE}")
+
+
+def test_concurrent_requests_are_coalesced():
+    """Concurrent submissions are answered with their own prediction from fewer model calls"""
+    batch_sizes = []
+
+    def predict_fn(rows):
+        batch_sizes.append(len(rows))
+        return MODEL.predict(rows)
+
+    async def run():
+        batcher = MicroBatcher(predict_fn, max_batch_size=16, max_wait_ms=20)
+        batcher.start()
+        results = await asyncio.gather(*(batcher.submit(row[None, :]) for row in TEST_FEATURES))
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(run())
+
+    assert (results == MODEL.predict(TEST_FEATURES).tolist()) and \
+        (sum(batch_sizes) == len(TEST_FEATURES)) and (max(batch_sizes) <= 16) and \
+        (len(batch_sizes) < len(TEST_FEATURES))
+
+
+def test_stop_fails_requests_in_a_running_batch():
+    """Callers whose batch is being scored when the batcher stops get an error instead of waiting forever"""
+    release = threading.Event()
+
+    async def run():
+        batcher = MicroBatcher(lambda rows: release.wait() and MODEL.predict(rows), max_batch_size=2, max_wait_ms=1)
+        batcher.start()
+        requests = [asyncio.create_task(batcher.submit(row[None, :])) for row in TEST_FEATURES[:3]]
+        await asyncio.sleep(0.05)
+        await batcher.stop()
+        results = await asyncio.wait_for(asyncio.gather(*requests, return_exceptions=True), 1)
+        release.set()
+        return results
+
+    results = asyncio.run(run())
+
+    assert (len(results) == 3) and all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_predict_with_dynamic_batching(monkeypatch):
+    """The /predict response shape is unchanged when dynamic batching is enabled"""
+    monkeypatch.setattr(api.main, "DYNAMIC_BATCHING", True)
+    payload = dict(zip(FEATURE_NAMES, TEST_FEATURES[0].tolist()))
+    with TestClient(app) as client:
+        response = client.post("/predict", json=payload)
+
+    assert (response.status_code == 200) and (response.json() == {
+        "species": int(MODEL.predict(TEST_FEATURES[:1])[0]), "model": "rf-12-base"
+    })
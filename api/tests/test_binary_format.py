@@ -0,0 +1,69 @@
+import io
+import joblib
+from fastapi.testclient import TestClient
+import numpy as np
+
+from api.main import app, MODELS_DIR, DEFAULT_MODEL_FILE
+from api.binary_format import RAW_HEADER, decode_observations
+
+
+DATA_PATH = "api/tests/data"
+TEST_FEATURES = np.load(f'{DATA_PATH}/X_test.npy')
+EXPECTED_PREDICTIONS = joblib.load(f"{MODELS_DIR}/{DEFAULT_MODEL_FILE}").predict(TEST_FEATURES).tolist()
+
+
+def to_npy(array):
+    buffer = io.BytesIO()
+    np.save(buffer, array)
+    return buffer.getvalue()
+
+
+def test_decode_is_zero_copy():
+    """Binary bodies are viewed in place rather than copied"""
+    body = RAW_HEADER.pack(*TEST_FEATURES.shape) + TEST_FEATURES.astype("<f8").tobytes()
+    observations = decode_observations(body, "application/octet-stream")
+
+    assert (not observations.flags.owndata) and np.array_equal(observations, TEST_FEATURES)
+
+
+def test_predict_batch_npy_round_trip():
+    """A .npy body gets a .npy response with the same predictions as JSON"""
+    with TestClient(app) as client:
+        response = client.post(
+            "/predict_batch", content=to_npy(TEST_FEATURES), headers={"Content-Type": "application/x-npy"}
+        )
+    predictions = np.load(io.BytesIO(response.content))
+
+    assert (response.status_code == 200) and (response.headers["X-Model"] == "rf-12-base") and \
+        (predictions.tolist() == EXPECTED_PREDICTIONS)
+
+
+def test_predict_raw_float32_with_json_response():
+    """A raw float32 row can be sent to /predict and answered in JSON"""
+    row = TEST_FEATURES[:1].astype("<f4")
+    with TestClient(app) as client:
+        response = client.post(
+            "/predict",
+            content=RAW_HEADER.pack(*row.shape) + row.tobytes(),
+            headers={"Content-Type": "application/octet-stream; dtype=float32", "Accept": "application/json"}
+        )
+    expected = int(joblib.load(f"{MODELS_DIR}/{DEFAULT_MODEL_FILE}").predict(row)[0])
+
+    assert (response.status_code == 200) and (response.json() == {"species": expected, "model": "rf-12-base"})
+
+
+def test_binary_validation_errors_by_row():
+    """Non-positive or non-finite values are rejected in one vectorized check, reported by row"""
+    observations = TEST_FEATURES[:4].copy()
+    observations[2, 3], observations[3, 0] = -1, np.nan
+    with TestClient(app) as client:
+        response = client.post(
+            "/predict_batch", content=to_npy(observations), headers={"Content-Type": "application/x-npy"}
+        )
+        malformed = client.post(
+            "/predict_batch", content=b"\x00" * 3, headers={"Content-Type": "application/octet-stream"}
+        )
+
+    assert (response.status_code == 400) and \
+        ([e["field"] for e in response.json()["errorDetails"]] == ["2.petalwidth", "3.sepallength"]) and \
+        (malformed.status_code == 400)
@@ -0,0 +1,67 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import api.main
+from api.compact_forest import CompactForest, export_compact_model, float32_at_most
+from api.forest_engine import CompiledForest
+from api.main import app
+from api.schema_config import FEATURE_NAMES
+
+
+DATA_PATH = "api/tests/data"
+TEST_FEATURES = np.load(f'{DATA_PATH}/X_test.npy')
+TEST_SET = [dict(zip(FEATURE_NAMES, row)) for row in TEST_FEATURES.tolist()]
+RETRAINED_MODELS_DIR = "scheduled_task/retrained_models"
+AVAILABLE_MODELS = os.listdir(RETRAINED_MODELS_DIR)
+
+
+@pytest.mark.parametrize("compression", ["none", "zlib", "lzma"])
+@pytest.mark.parametrize("model_filename", AVAILABLE_MODELS)
+def test_export_matches_original_model(model_filename, compression, tmp_path):
+    """The compact file is smaller than joblib's and predicts exactly like the original, also off the test set"""
+    model = joblib.load(f"{RETRAINED_MODELS_DIR}/{model_filename}")
+    report = export_compact_model(model, f"{tmp_path}/model.cforest", TEST_FEATURES, compression)
+    loaded = CompactForest.load(f"{tmp_path}/model.cforest")
+    rows = np.random.default_rng(0).uniform(0, 8, size=(5_000, TEST_FEATURES.shape[1]))
+
+    assert (report["compactBytes"] < report["joblibBytes"]) and (report["parityRows"] == len(TEST_FEATURES)) and \
+        np.array_equal(loaded.predict(rows), model.predict(rows)) and \
+        np.array_equal(loaded.predict_proba(rows), CompiledForest.from_sklearn(model).predict_proba(rows)) and \
+        (loaded.feature.dtype == np.uint8) and (loaded.threshold.dtype == np.float32) and \
+        (loaded.left.dtype == np.uint16) and (len(loaded.leaf_values) < (loaded.left == np.arange(len(loaded.left))).sum())
+
+
+def test_float32_thresholds_keep_comparisons_exact():
+    """Rounding thresholds down to float32 keeps every float32 feature on the same side of the split"""
+    rng = np.random.default_rng(0)
+    thresholds = rng.uniform(0, 10, size=10_000)
+    rounded = float32_at_most(thresholds)
+    # float32 values at and around each threshold, where rounding to nearest would flip comparisons
+    nearest = thresholds.astype(np.float32)
+    candidates = np.stack([np.nextafter(nearest, np.float32(-np.inf)), nearest, np.nextafter(nearest, np.float32(np.inf))])
+
+    assert np.array_equal(candidates <= thresholds, candidates <= rounded)
+
+
+def test_unknown_compression_is_rejected(tmp_path):
+    model = joblib.load(f"{RETRAINED_MODELS_DIR}/rf-24.joblib")
+    with pytest.raises(ValueError):
+        export_compact_model(model, f"{tmp_path}/model.cforest", TEST_FEATURES, "snappy")
+    assert not os.listdir(tmp_path)
+
+
+def test_compact_backend_serves_identical_predictions(tmp_path, monkeypatch):
+    """With the compact backend the API serves the quantized copy and answers like the joblib model"""
+    expected = joblib.load(f"{api.main.MODELS_DIR}/{api.main.DEFAULT_MODEL_FILE}").predict(TEST_FEATURES).tolist()
+    monkeypatch.setattr(api.main, "INFERENCE_BACKEND", "compact")
+    monkeypatch.setattr(api.main, "MODEL_CACHE_DIR", str(tmp_path))
+    with TestClient(app) as client:
+        predictions = client.post("/predict_batch", json={"observations": TEST_SET}).json()["species"]
+        served = app.state.served.model
+
+    assert isinstance(served, CompactForest) and (predictions == expected) and \
+        any(name.endswith(".cforest") for name in os.listdir(tmp_path))
@@ -0,0 +1,72 @@
+import numpy as np
+
+from scheduled_task.scheduled_task_utils.data_quality_check import (
+    DataProfile,
+    QuantileSketch,
+    check_test_set,
+    profile_test_set
+)
+
+
+DATA_PATH = "api/tests/data"
+TEST_FEATURES = np.load(f'{DATA_PATH}/X_test.npy')
+TEST_LABELS = np.load(f'{DATA_PATH}/y_test.npy')
+
+
+def test_profile_matches_full_pass_statistics():
+    """Chunked Welford moments, ranges and class counts equal whole-array numpy results"""
+    profile = profile_test_set(TEST_FEATURES, TEST_LABELS, chunk_size=4)
+
+    assert (profile.rows == len(TEST_LABELS)) and \
+        np.allclose(profile.mean, TEST_FEATURES.mean(axis=0)) and \
+        np.allclose(profile.variance, TEST_FEATURES.var(axis=0)) and \
+        np.array_equal(profile.min, TEST_FEATURES.min(axis=0)) and \
+        np.array_equal(profile.max, TEST_FEATURES.max(axis=0)) and \
+        np.array_equal(profile.label_counts, np.bincount(TEST_LABELS))
+
+
+def test_merged_and_persisted_profiles_agree(tmp_path):
+    """Profiles of separate halves merge into the profile of the whole, and survive a save/load"""
+    half = len(TEST_LABELS) // 2
+    merged = profile_test_set(TEST_FEATURES[:half], TEST_LABELS[:half]).merge(
+        profile_test_set(TEST_FEATURES[half:], TEST_LABELS[half:])
+    )
+    merged.save(str(tmp_path / "profile.json"))
+    loaded = DataProfile.load(str(tmp_path / "profile.json"))
+    whole = profile_test_set(TEST_FEATURES, TEST_LABELS)
+
+    assert np.allclose(loaded.mean, whole.mean) and np.allclose(loaded.m2, whole.m2) and \
+        np.array_equal(loaded.label_counts, whole.label_counts) and \
+        (loaded.quantiles([0.5]) == merged.quantiles([0.5]))
+
+
+def test_quantile_sketch_rank_error():
+    values = np.random.default_rng(0).normal(size=200_000)
+    sketch = QuantileSketch()
+    for chunk in np.array_split(values, 20):
+        sketch.update(chunk)
+    estimates = sketch.quantiles([0.01, 0.5, 0.99])
+
+    assert all(abs(np.mean(values <= estimate) - q) < 0.02 for q, estimate in zip([0.01, 0.5, 0.99], estimates))
+
+
+def test_check_flags_nonfinite_values_and_invalid_labels():
+    features = TEST_FEATURES.copy()
+    features[0, 1] = np.inf
+    labels = TEST_LABELS.copy()
+    labels[-1] = 7
+
+    assert check_test_set(TEST_FEATURES, TEST_LABELS, chunk_size=4) and \
+        not check_test_set(features, TEST_LABELS, chunk_size=4) and \
+        not check_test_set(TEST_FEATURES, labels, chunk_size=4) and \
+        check_test_set(TEST_FEATURES, labels, chunk_size=4, valid_labels=(0, 1, 2, 7))
+
+
+def test_huge_labels_are_invalid_not_counted():
+    """A label far above the valid ones is reported as invalid without sizing the class histogram by it"""
+    labels = TEST_LABELS.copy()
+    labels[0] = 2 ** 40
+    profile = profile_test_set(TEST_FEATURES, labels, chunk_size=4)
+
+    assert (len(profile.label_counts) == 3) and (profile.invalid_labels == [2 ** 40]) and \
+        (profile.label_counts.sum() == len(labels) - 1) and not check_test_set(TEST_FEATURES, labels)
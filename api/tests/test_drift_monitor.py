@@ -0,0 +1,69 @@
+import numpy as np
+from fastapi.testclient import TestClient
+from scipy.stats import ks_2samp
+
+import api.main
+from api.drift_monitor import DEFAULT_BIN_EDGES, DriftMonitor, binned_ks
+from api.main import app
+from api.schema_config import FEATURE_NAMES
+
+
+DATA_PATH = "api/tests/data"
+TEST_FEATURES = np.load(f'{DATA_PATH}/X_test.npy')
+TEST_SET = [dict(zip(FEATURE_NAMES, row)) for row in TEST_FEATURES.tolist()]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_window_forgets_expired_slots():
+    """Counts older than the window are dropped as the slot ring turns"""
+    clock = FakeClock()
+    monitor = DriftMonitor(FEATURE_NAMES, 3, window_sec=60, n_slots=6, clock=clock)
+    monitor.observe(TEST_FEATURES[:10], [0] * 10)
+    clock.now = 30
+    monitor.observe(TEST_FEATURES[10:15], [1] * 5)
+    during = monitor.window()
+    clock.now = 65
+    after = monitor.window()
+
+    assert (during["classCounts"].tolist() == [10, 5, 0]) and (after["classCounts"].tolist() == [0, 5, 0]) and \
+        (during["featureCounts"].sum() == 15 * len(FEATURE_NAMES))
+
+
+def test_binned_ks_matches_scipy():
+    rng = np.random.default_rng(0)
+    reference = np.searchsorted(DEFAULT_BIN_EDGES, rng.normal(5, 1, 2000), side="right")
+    current = np.searchsorted(DEFAULT_BIN_EDGES, rng.normal(5.3, 1, 1500), side="right")
+    n_bins = len(DEFAULT_BIN_EDGES) + 1
+    statistic, _ = binned_ks(np.bincount(reference, minlength=n_bins), np.bincount(current, minlength=n_bins))
+
+    assert np.isclose(statistic, ks_2samp(reference, current).statistic)
+
+
+def test_drift_report_endpoints(tmp_path, monkeypatch):
+    """Traffic feeds the window, which becomes the reference, and shifted traffic is flagged"""
+    monkeypatch.setattr(api.main, "DRIFT_REFERENCE_PATH", str(tmp_path / "drift_reference.json"))
+    monkeypatch.setattr(api.main, "DRIFT_MIN_SAMPLES", 20)
+    shifted_set = [{**row, "petallength": row["petallength"] + 3} for row in TEST_SET]
+
+    with TestClient(app) as client:
+        missing_reference = client.get("/drift_report")
+        client.post("/predict_batch", json={"observations": TEST_SET})
+        reference = client.post("/drift_reference")
+        stable_report = client.get("/drift_report").json()
+
+        app.state.drift_monitor.slot_epochs[:] = -1  # Empty the window
+        client.post("/predict_batch", json={"observations": shifted_set})
+        shifted_report = client.get("/drift_report").json()
+
+    assert (missing_reference.status_code == 404) and \
+        (reference.json()["referenceCount"] == len(TEST_SET)) and (tmp_path / "drift_reference.json").exists() and \
+        stable_report["enoughData"] and not stable_report["driftDetected"] and \
+        shifted_report["driftDetected"] and (shifted_report["features"]["petallength"]["psi"] > 0.2) and \
+        (shifted_report["features"]["sepallength"]["psi"] == 0)
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+import pytest
+from fastapi.testclient import TestClient
+
+from api.main import app
+from api.executor import BoundedExecutor, ExecutorSaturated
+
+
+def test_executor_rejects_when_saturated():
+    """Submissions beyond max_workers + max_queue are rejected instead of queued"""
+    release = threading.Event()
+
+    async def run():
+        pool = BoundedExecutor("test", max_workers=1, max_queue=1)
+        running = [asyncio.create_task(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        stats = pool.stats()
+        with pytest.raises(ExecutorSaturated):
+            await pool.run(release.wait)
+        release.set()
+        await asyncio.gather(*running)
+        pool.shutdown()
+        return stats, pool.stats()
+
+    saturated_stats, final_stats = asyncio.run(run())
+
+    assert (saturated_stats["active"] == 1) and (saturated_stats["queueDepth"] == 1) and \
+        (saturated_stats["saturation"] == 1.0) and \
+        (final_stats["completed"] == 2) and (final_stats["rejected"] == 1)
+
+
+def test_run_waiting_queues_instead_of_rejecting():
+    """run_waiting callers wait for a free slot and all complete, without counting as rejected"""
+    release = threading.Event()
+
+    async def run():
+        pool = BoundedExecutor("test", max_workers=1, max_queue=0)
+        running = asyncio.create_task(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        waiting = [asyncio.create_task(pool.run_waiting(lambda i=i: i)) for i in range(3)]
+        await asyncio.sleep(0.05)
+        blocked = not any(task.done() for task in waiting)
+        release.set()
+        results = await asyncio.gather(*waiting)
+        await running
+        pool.shutdown()
+        return blocked, results, pool.stats()
+
+    blocked, results, stats = asyncio.run(run())
+
+    assert blocked and (results == [0, 1, 2]) and (stats["completed"] == 4) and (stats["rejected"] == 0)
+
+
+def test_saturated_pool_returns_503(monkeypatch):
+    """A full inference pool sheds load with a 503 and a Retry-After header"""
+    with TestClient(app) as client:
+        monkeypatch.setattr(app.state.inference_pool, "max_workers", 0)
+        monkeypatch.setattr(app.state.inference_pool, "max_queue", 0)
+        response = client.post("/predict", json={
+            "sepallength": 5.1, "sepalwidth": 3.5, "petallength": 1.4, "petalwidth": 0.2
+        })
+        stats = client.get("/executor_stats").json()
+
+    assert (response.status_code == 503) and (response.headers["Retry-After"] == "1") and \
+        (stats["inference"]["rejected"] == 1)
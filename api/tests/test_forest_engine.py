@@ -0,0 +1,66 @@
+import os
+import joblib
+import pytest
+from fastapi.testclient import TestClient
+import numpy as np
+
+import api.main
+from api.main import app
+from api.forest_engine import CompiledForest, compile_model
+from api.serving_utils import load_mmap_model
+from api.schema_config import FEATURE_NAMES
+
+
+MODELS_DIR, DATA_PATH = "scheduled_task/retrained_models", "api/tests/data"
+AVAILABLE_MODELS = os.listdir(MODELS_DIR)
+TEST_FEATURES = np.load(f'{DATA_PATH}/X_test.npy')
+
+
+@pytest.mark.parametrize("model_filename", AVAILABLE_MODELS)
+def test_compiled_forest_parity(model_filename):
+    """The compiled forest gives exactly the same predictions as scikit-learn"""
+    model = joblib.load(f"{MODELS_DIR}/{model_filename}")
+    compiled = compile_model(model)
+
+    assert isinstance(compiled, CompiledForest) and \
+        np.array_equal(compiled.predict(TEST_FEATURES), model.predict(TEST_FEATURES)) and \
+        np.allclose(compiled.predict_proba(TEST_FEATURES), model.predict_proba(TEST_FEATURES), atol=1e-12)
+
+
+def test_predict_with_compiled_backend(monkeypatch):
+    """The API serves predictions through the compiled backend when configured"""
+    monkeypatch.setattr(api.main, "INFERENCE_BACKEND", "compiled")
+    payload = dict(zip(FEATURE_NAMES, TEST_FEATURES[0].tolist()))
+    with TestClient(app) as client:
+        response = client.post("/predict", json=payload)
+        served_model = app.state.served.model
+
+    expected = int(joblib.load(f"{MODELS_DIR}/rf-12-base.joblib").predict(TEST_FEATURES[:1])[0])
+    assert isinstance(served_model, CompiledForest) and (response.status_code == 200) and \
+        (response.json() == {"species": expected, "model": "rf-12-base"})
+
+
+@pytest.mark.parametrize("model_filename", AVAILABLE_MODELS)
+def test_mmap_model_round_trip(model_filename, tmp_path):
+    """The flat file is memory-mapped on load and predicts like the original forest"""
+    model = joblib.load(f"{MODELS_DIR}/{model_filename}")
+    loaded = load_mmap_model(MODELS_DIR, model_filename, str(tmp_path))
+    reloaded = load_mmap_model(MODELS_DIR, model_filename, str(tmp_path))
+
+    assert isinstance(loaded.threshold, np.memmap) and (len(os.listdir(tmp_path)) == 1) and \
+        np.array_equal(loaded.predict(TEST_FEATURES), model.predict(TEST_FEATURES)) and \
+        np.array_equal(reloaded.predict_proba(TEST_FEATURES), model.predict_proba(TEST_FEATURES))
+
+
+def test_predict_with_mmap_backend(monkeypatch, tmp_path):
+    """The API serves the default model from its memory-mapped flat copy when configured"""
+    monkeypatch.setattr(api.main, "INFERENCE_BACKEND", "mmap")
+    monkeypatch.setattr(api.main, "MODEL_CACHE_DIR", str(tmp_path))
+    payload = dict(zip(FEATURE_NAMES, TEST_FEATURES[0].tolist()))
+    with TestClient(app) as client:
+        response = client.post("/predict", json=payload)
+        served_model = app.state.served.model
+
+    expected = int(joblib.load(f"{MODELS_DIR}/rf-12-base.joblib").predict(TEST_FEATURES[:1])[0])
+    assert isinstance(served_model.left, np.memmap) and (response.status_code == 200) and \
+        (response.json() == {"species": expected, "model": "rf-12-base"})
@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+
+from api.schema_config import FEATURE_NAMES
+from scheduled_task.scheduled_task_utils.data_quality_check import check_test_set
+from scheduled_task.scheduled_task_utils.holdout_dataset import HoldoutDataset
+
+
+DATA_PATH = "api/tests/data"
+TEST_FEATURES = np.load(f'{DATA_PATH}/X_test.npy')
+TEST_LABELS = np.load(f'{DATA_PATH}/y_test.npy')
+
+
+def test_holdout_dataset_is_memory_mapped_and_chunked():
+    """Chunks cover every row in order and payloads are built lazily from the mapped file"""
+    dataset = HoldoutDataset(DATA_PATH, chunk_size=7)
+    chunks = list(dataset.iter_chunks())
+    payloads = dataset.payloads(limit=5)
+
+    assert isinstance(dataset.features, np.memmap) and (len(chunks) == -(-len(TEST_LABELS) // 7)) and \
+        np.array_equal(np.concatenate([features for features, _ in chunks]), TEST_FEATURES) and \
+        np.array_equal(np.concatenate([labels for _, labels in chunks]), TEST_LABELS) and \
+        (len(payloads) == 5) and (payloads[-1] == dict(zip(FEATURE_NAMES, TEST_FEATURES[4].tolist())))
+
+
+def test_holdout_dataset_reloads_changed_files(tmp_path):
+    np.save(tmp_path / "X_test.npy", TEST_FEATURES)
+    np.save(tmp_path / "y_test.npy", TEST_LABELS)
+    dataset = HoldoutDataset(str(tmp_path))
+    unchanged = dataset.reload_if_changed()
+
+    # Replace the files the way a data refresh would, by renaming new ones over them
+    np.save(tmp_path / "X_new.npy", TEST_FEATURES[:10])
+    np.save(tmp_path / "y_new.npy", TEST_LABELS[:10])
+    os.replace(tmp_path / "X_new.npy", tmp_path / "X_test.npy")
+    os.replace(tmp_path / "y_new.npy", tmp_path / "y_test.npy")
+
+    assert (not unchanged) and dataset.reload_if_changed() and (len(dataset) == 10)
+
+
+def test_chunked_data_quality_check():
+    """Checks over small chunks reach the same verdicts as over the whole set"""
+    features_with_nan = TEST_FEATURES.copy()
+    features_with_nan[-1, 0] = np.nan
+
+    assert check_test_set(TEST_FEATURES, TEST_LABELS, chunk_size=4) and \
+        not check_test_set(features_with_nan, TEST_LABELS, chunk_size=4)
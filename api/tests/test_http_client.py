@@ -0,0 +1,30 @@
+import asyncio
+import httpx
+from fastapi.testclient import TestClient
+
+from api.main import app
+from scheduled_task.scheduled_task_utils.health_check import ping_api_health
+from scheduled_task.scheduled_task_utils.http_client import ConnectionStats, create_api_client
+from scheduled_task.scheduled_task_utils.model_update_utils import get_current_model
+
+
+def test_shared_client_records_connection_reuse():
+    """Health and current model calls share one client whose requests are counted"""
+    connection_stats = ConnectionStats()
+
+    async def run():
+        async with create_api_client(
+            stats=connection_stats, transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            healthy = await ping_api_health(client, "/", retries=1)
+            current_model = await get_current_model(client, "")
+            # Only the first request of a pool opens a connection when served over TCP
+            await connection_stats.trace("connection.connect_tcp.started", {})
+            return healthy, current_model
+
+    with TestClient(app):
+        healthy, current_model = asyncio.run(run())
+
+    assert healthy and (current_model == ("rf-12-base.joblib", "1.0")) and \
+        (connection_stats.requests == 2) and (connection_stats.new_connections == 1) and \
+        (connection_stats.reuse_rate == 0.5)
@@ -0,0 +1,92 @@
+import asyncio
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from scheduled_task.scheduled_task_utils.job_control import DriftAlarm, JobTrigger, run_stage, watch_models_dir
+
+
+def test_stages_run_concurrently_within_budgets():
+    """Independent stages overlap, and a stage over its budget or failing yields None without stopping the others"""
+    async def stage(result, seconds):
+        await asyncio.sleep(seconds)
+        return result
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    async def run():
+        start = asyncio.get_running_loop().time()
+        results = await asyncio.gather(
+            run_stage("a", stage("a", 0.2), 1), run_stage("b", stage("b", 0.2), 1),
+            run_stage("slow", stage("slow", 5), 0.1), run_stage("failing", failing(), 1)
+        )
+        return results, asyncio.get_running_loop().time() - start
+
+    results, elapsed = asyncio.run(run())
+
+    assert (results == ["a", "b", None, None]) and (elapsed < 0.35)
+
+
+def test_events_during_a_run_are_coalesced_into_one_follow_up():
+    """A trigger runs the job at once; triggers while it runs start exactly one more run after it"""
+    runs = []
+
+    async def run():
+        scheduler = AsyncIOScheduler(job_defaults={"max_instances": 1, "coalesce": True})
+        trigger = JobTrigger(scheduler, "job")
+
+        async def job():
+            runs.append(asyncio.get_running_loop().time())
+            await asyncio.sleep(0.2)
+        scheduler.add_job(trigger.wrap(job), "interval", hours=1, id="job")
+        scheduler.start()
+        trigger.fire("first event")
+        await asyncio.sleep(0.1)
+        trigger.fire("second event")
+        trigger.fire("third event")
+        await asyncio.sleep(0.8)
+        scheduler.shutdown(wait=False)
+
+    asyncio.run(run())
+
+    assert (len(runs) == 2) and (runs[1] - runs[0] >= 0.2)
+
+
+def test_new_model_files_are_reported(tmp_path):
+    """Model files added to the watched directory are reported by name; other files are ignored"""
+    reported = []
+
+    async def run():
+        stop_event = asyncio.Event()
+        watcher = asyncio.create_task(watch_models_dir(str(tmp_path), reported.extend, debounce_ms=50, stop_event=stop_event))
+        await asyncio.sleep(0.3)
+        (tmp_path / "notes.txt").write_text("not a model")
+        (tmp_path / "rf-48.joblib").write_bytes(b"model")
+        for _ in range(100):
+            if reported:
+                break
+            await asyncio.sleep(0.05)
+        stop_event.set()
+        await watcher
+
+    asyncio.run(run())
+
+    assert reported == ["rf-48.joblib"]
+
+
+def test_drift_alarm_fires_when_drift_starts():
+    """The alarm fires on the change to drifted, not on every poll while drift persists"""
+    verdicts = iter([None, False, True, True, False, True])
+    alarms = []
+
+    async def check():
+        return next(verdicts)
+
+    async def run():
+        alarm = DriftAlarm(check, alarms.append)
+        for _ in range(6):
+            await alarm.poll()
+
+    asyncio.run(run())
+
+    assert alarms == ["production drift alarm"] * 2
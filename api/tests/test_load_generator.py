@@ -0,0 +1,51 @@
+import asyncio
+import httpx
+from fastapi.testclient import TestClient
+import numpy as np
+
+from api.main import app
+from api.schema_config import FEATURE_NAMES
+from scheduled_task.scheduled_task_utils.load_generator import LatencyHistogram, run_load_test
+
+
+DATA_PATH = "api/tests/data"
+TEST_FEATURES = np.load(f'{DATA_PATH}/X_test.npy')
+TEST_SET = [dict(zip(FEATURE_NAMES, row)) for row in TEST_FEATURES.tolist()]
+
+
+def test_histogram_percentiles_within_bucket_error():
+    """Percentiles from the log-bucketed histogram are within about 1% of the exact values"""
+    samples = np.random.default_rng(0).lognormal(mean=15, sigma=1, size=10_000).astype(np.int64)
+    histogram = LatencyHistogram()
+    for sample in samples:
+        histogram.record(int(sample))
+
+    assert all(
+        abs(histogram.percentile(q) - np.percentile(samples, q)) / np.percentile(samples, q) < 0.02
+        for q in (50, 95, 99)
+    ) and (histogram.percentile(100) == samples.max())
+
+
+def run_against_app(**kwargs):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await run_load_test("", TEST_SET, client=client, **kwargs)
+    return asyncio.run(run())
+
+
+def test_closed_loop_load_test():
+    """Every payload is sent once and its prediction is kept at its index"""
+    with TestClient(app) as client:
+        expected = client.post("/predict_batch", json={"observations": TEST_SET}).json()["species"]
+        report = run_against_app(concurrency=4)
+
+    assert (report["requests"] == len(TEST_SET)) and (report["errorRate"] == 0) and \
+        (report["predictions"] == expected) and (0 < report["p50Ms"] <= report["p99Ms"] <= report["maxMs"])
+
+
+def test_open_loop_load_test():
+    """At a target rate, requests keep being sent until the duration elapses"""
+    with TestClient(app):
+        report = run_against_app(concurrency=4, target_rps=200, duration_sec=0.25)
+
+    assert (40 <= report["requests"] <= 50) and (report["errors"] == 0) and (report["targetRps"] == 200)
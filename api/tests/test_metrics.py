@@ -0,0 +1,38 @@
+from fastapi.testclient import TestClient
+
+from api.main import app
+
+
+VALID_PAYLOAD_EXAMPLE = {"sepallength": 5.1, "sepalwidth": 3.5, "petallength": 1.4, "petalwidth": 0.2}
+INVALID_PAYLOAD_EXAMPLE = {**VALID_PAYLOAD_EXAMPLE, "petalwidth": -1}
+
+
+def parse_samples(text):
+    """Map each sample line of the exposition format to its value"""
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines() if line and not line.startswith("#")
+    }
+
+
+def test_metrics_endpoint():
+    """Requests, stages, predicted classes and the served model are exported"""
+    with TestClient(app) as client:
+        client.post("/predict", json=VALID_PAYLOAD_EXAMPLE)
+        client.post("/predict", json=VALID_PAYLOAD_EXAMPLE)
+        client.post("/predict", json=INVALID_PAYLOAD_EXAMPLE)
+        response = client.get("/metrics")
+    samples = parse_samples(response.text)
+
+    assert (response.status_code == 200) and \
+        (samples['iris_api_requests_total{route="/predict",status="200"}'] == 2) and \
+        (samples['iris_api_requests_total{route="/predict",status="400"}'] == 1) and \
+        (samples['iris_api_request_duration_seconds_count{route="/predict"}'] == 3) and \
+        (samples['iris_api_stage_duration_seconds_count{stage="validation"}'] == 3) and \
+        (samples['iris_api_stage_duration_seconds_count{stage="model_predict"}'] == 1) and \
+        (samples['iris_api_predictions_total{species="0"}'] == 2) and \
+        (samples['iris_api_model_info{model="rf-12-base",version="1.0"}'] == 1) and \
+        (samples["iris_api_model_swap_duration_seconds_count"] == 1) and \
+        (samples["iris_api_prediction_cache_hits_total"] == 1) and \
+        ("# TYPE iris_api_prediction_cache_hits_total counter" in response.text) and \
+        ("# TYPE iris_api_inference_pool_rejected_total counter" in response.text)
@@ -0,0 +1,58 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.metrics import accuracy_score, f1_score, log_loss, precision_score, recall_score
+
+from scheduled_task.scheduled_task_utils.evaluation_utils import MetricsAccumulator, evaluate_model
+
+
+RETRAINED_MODELS_DIR = "scheduled_task/retrained_models"
+AVAILABLE_MODELS = os.listdir(RETRAINED_MODELS_DIR)
+DATA_PATH = "api/tests/data"
+TEST_FEATURES = np.load(f'{DATA_PATH}/X_test.npy')
+TEST_LABELS = np.load(f'{DATA_PATH}/y_test.npy')
+
+
+def sklearn_metrics(labels, predictions, proba, classes=None):
+    return {
+        "f1_macro": f1_score(labels, predictions, average="macro"),
+        "accuracy": accuracy_score(labels, predictions),
+        "precision_macro": precision_score(labels, predictions, average="macro", zero_division=0),
+        "recall_macro": recall_score(labels, predictions, average="macro", zero_division=0),
+        "f1_micro": f1_score(labels, predictions, average="micro"),
+        "precision_micro": precision_score(labels, predictions, average="micro", zero_division=0),
+        "recall_micro": recall_score(labels, predictions, average="micro", zero_division=0),
+        "log_loss": log_loss(labels, proba, labels=classes)
+    }
+
+
+@pytest.mark.parametrize("test_model", AVAILABLE_MODELS)
+def test_metrics_match_sklearn(test_model):
+    """Chunked single-pass metrics match the scikit-learn metrics functions"""
+    model = joblib.load(f"{RETRAINED_MODELS_DIR}/{test_model}")
+    expected = sklearn_metrics(TEST_LABELS, model.predict(TEST_FEATURES), model.predict_proba(TEST_FEATURES))
+    metrics, _ = evaluate_model(f"{RETRAINED_MODELS_DIR}/{test_model}", TEST_FEATURES, TEST_LABELS, chunk_size=7)
+
+    assert metrics.keys() == expected.keys() and \
+        all(np.isclose(metrics[name], expected[name], rtol=1e-12) for name in expected)
+
+
+def test_metrics_with_missing_and_wrong_classes():
+    """Classes absent from both labels and predictions are left out of macro averages, like sklearn"""
+    labels = np.array([0, 0, 1, 1, 1, 3])
+    predictions = np.array([0, 1, 1, 1, 0, 0])
+    proba = np.eye(4)[predictions] * 0.7 + 0.075
+    accumulator = MetricsAccumulator(classes=[0, 1, 2, 3])
+    accumulator.update(labels[:4], proba=proba[:4])
+    accumulator.update(labels[4:], proba=proba[4:])
+    expected = sklearn_metrics(labels, predictions, proba, classes=[0, 1, 2, 3])
+    metrics = accumulator.compute()
+
+    assert all(np.isclose(metrics[name], expected[name], rtol=1e-12) for name in expected)
+
+
+def test_unknown_labels_are_rejected():
+    with pytest.raises(ValueError):
+        MetricsAccumulator(classes=[0, 1, 2]).update([0, 5], predictions=[0, 1])
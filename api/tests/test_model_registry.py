@@ -0,0 +1,82 @@
+import asyncio
+import os
+import shutil
+import time
+
+import joblib
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import api.main
+from api.main import app
+from api.model_registry import ModelRegistry
+from api.schema_config import FEATURE_NAMES
+
+
+DATA_PATH = "api/tests/data"
+TEST_FEATURES = np.load(f'{DATA_PATH}/X_test.npy')
+TEST_SET = [dict(zip(FEATURE_NAMES, row)) for row in TEST_FEATURES.tolist()]
+RETRAINED_MODELS_DIR = "scheduled_task/retrained_models"
+
+
+@pytest.fixture(autouse=True)
+def models_dir(tmp_path, monkeypatch):
+    """Serve from a directory holding every retrained model"""
+    for model_file in os.listdir(RETRAINED_MODELS_DIR):
+        shutil.copy(f"{RETRAINED_MODELS_DIR}/{model_file}", tmp_path)
+    monkeypatch.setattr(api.main, "MODELS_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_header_and_weighted_routing(models_dir):
+    """X-Model and traffic weights answer with resident registry models, the default stays served"""
+    expected = joblib.load(f"{models_dir}/rf-96.joblib").predict(TEST_FEATURES).tolist()
+    with TestClient(app) as client:
+        default = client.post("/predict", json=TEST_SET[0]).json()
+        routed = client.post("/predict_batch", json={"observations": TEST_SET}, headers={"X-Model": "rf-96"}).json()
+        client.post("/registry/routes", json={"weights": {"rf-24.joblib": 1}})
+        weighted = [client.post("/predict", json=row).json()["model"] for row in TEST_SET[:5]]
+        client.post("/registry/routes", json={"weights": {}})
+        unrouted = client.post("/predict", json=TEST_SET[0]).json()
+        missing = client.post("/predict", json=TEST_SET[0], headers={"X-Model": "rf-0"})
+        registry = client.get("/registry").json()
+
+    assert (default["model"] == "rf-12-base") and (routed["model"] == "rf-96") and \
+        (routed["species"] == expected) and (weighted == ["rf-24"] * 5) and (unrouted["model"] == "rf-12-base") and \
+        (missing.status_code == 404) and {"rf-96.joblib", "rf-24.joblib"} <= {m["name"] for m in registry["resident"]} and \
+        (registry["models"]["rf-96.joblib"]["rows"] == len(TEST_SET))
+
+
+def test_shadow_scoring_records_agreement():
+    """A shadow model scores sampled requests off the response path and its agreement is recorded"""
+    with TestClient(app) as client:
+        client.post("/registry/shadow", json={"model": "rf-96.joblib", "fraction": 1.0})
+        client.post("/predict_batch", json={"observations": TEST_SET})
+        for _ in range(100):
+            agreement = client.get("/registry").json()["shadowAgreement"]
+            if agreement and agreement[0]["compared"]:
+                break
+            time.sleep(0.01)
+
+    assert (agreement[0]["primary"] == "rf-12-base.joblib") and (agreement[0]["shadow"] == "rf-96.joblib") and \
+        (agreement[0]["compared"] == len(TEST_SET)) and (0.8 <= agreement[0]["agreementRate"] <= 1)
+
+
+def test_registry_evicts_least_recently_used():
+    loads = []
+
+    async def loader(name):
+        loads.append(name)
+        return np.zeros(1000, dtype=np.uint8)  # about 1 kB pickled
+
+    async def run():
+        registry = ModelRegistry(loader, memory_budget_bytes=2500)
+        for name in ["a", "b", "a", "c", "a", "b"]:
+            await registry.get(name)
+        return registry
+
+    registry = asyncio.run(run())
+
+    assert (loads == ["a", "b", "c", "b"]) and ([m["name"] for m in registry.stats()["resident"]] == ["a", "b"]) and \
+        (registry.evictions == 2)
@@ -0,0 +1,61 @@
+import os
+import shutil
+
+import numpy as np
+
+from scheduled_task.scheduled_task_utils import evaluation_utils
+from scheduled_task.scheduled_task_utils.evaluation_utils import (
+    evaluate_model,
+    load_metrics_cache,
+    run_model_tournament
+)
+
+
+RETRAINED_MODELS_DIR = "scheduled_task/retrained_models"
+DATA_PATH = "api/tests/data"
+TEST_FEATURES = np.load(f'{DATA_PATH}/X_test.npy')
+TEST_LABELS = np.load(f'{DATA_PATH}/y_test.npy')
+
+
+def test_tournament_scores_all_models_in_parallel(tmp_path):
+    """Every model is scored across the process pool with the same metrics as evaluate_model"""
+    cache_path = str(tmp_path / "metrics_cache.json")
+    # Memory-mapped test sets are sent to the workers by path
+    test_features = np.load(f'{DATA_PATH}/X_test.npy', mmap_mode="r")
+    winner, leaderboard = run_model_tournament(
+        RETRAINED_MODELS_DIR, "rf-12-base.joblib", test_features, TEST_LABELS, max_workers=2, cache_path=cache_path
+    )
+    expected, _ = evaluate_model(f"{RETRAINED_MODELS_DIR}/rf-48.joblib", TEST_FEATURES, TEST_LABELS)
+
+    assert (set(leaderboard) == set(os.listdir(RETRAINED_MODELS_DIR))) and (winner != "rf-12-base.joblib") and \
+        (leaderboard["rf-48.joblib"] == expected) and (len(load_metrics_cache(cache_path)) == len(leaderboard))
+
+
+def test_tournament_reuses_cached_metrics(tmp_path, monkeypatch):
+    """Unchanged models are not re-scored, and the delta rule can keep the current model"""
+    cache_path = str(tmp_path / "metrics_cache.json")
+    _, leaderboard = run_model_tournament(
+        RETRAINED_MODELS_DIR, "rf-12-base.joblib", TEST_FEATURES, TEST_LABELS, max_workers=1, cache_path=cache_path
+    )
+
+    def fail_to_score(model_path):
+        raise AssertionError(f"{model_path} was re-scored")
+    monkeypatch.setattr(evaluation_utils, "_score_model", fail_to_score)
+    monkeypatch.setattr(evaluation_utils, "ALWAYS_UPDATE_MODEL", False)
+    monkeypatch.setattr(evaluation_utils, "DELTA_THRESHOLD", 1.0)
+    winner, cached_leaderboard = run_model_tournament(
+        RETRAINED_MODELS_DIR, "rf-12-base.joblib", TEST_FEATURES, TEST_LABELS, max_workers=1, cache_path=cache_path
+    )
+
+    assert (winner is None) and (cached_leaderboard == leaderboard)
+
+
+def test_tournament_ignores_files_that_are_not_models(tmp_path):
+    """Partial writes and stray files next to the models are not scored"""
+    models_dir = tmp_path / "models"
+    shutil.copytree(RETRAINED_MODELS_DIR, models_dir)
+    (models_dir / ".upload-rf-192.joblib.tmp").write_bytes(b"partial")
+    (models_dir / "README.txt").write_text("not a model")
+    _, leaderboard = run_model_tournament(str(models_dir), "rf-12-base.joblib", TEST_FEATURES, TEST_LABELS, max_workers=2)
+
+    assert set(leaderboard) == set(os.listdir(RETRAINED_MODELS_DIR))
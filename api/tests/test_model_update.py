@@ -33,3 +33,19 @@ def test_update_model(test_model, tmp_path):
     }
     assert (response.status_code == 200) and (response.json() == expected_response)
 
+
+
+def test_update_publishes_new_snapshot():
+    """A model update warms up the candidate and publishes a new snapshot,
+    leaving the snapshot held by in-flight requests untouched"""
+    model_b64 = encode_model_file_to_b64(MODELS_DIR, "rf-96.joblib")
+
+    with TestClient(app) as client:
+        previous = app.state.served
+        client.post("/update_model", json={"modelFilename": "rf-96.joblib", "modelObject": model_b64})
+        current = app.state.served
+
+    assert (previous.model_file, previous.model_version) == ("rf-12-base.joblib", "1.0") and \
+        (current.model_file, current.model_version) == ("rf-96.joblib", "1.1") and \
+        (current.model is not previous.model) and (current.warmup_ms > 0) and \
+        (current.swap_ms >= current.load_ms + current.warmup_ms)
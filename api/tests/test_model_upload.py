@@ -0,0 +1,66 @@
+import asyncio
+import httpx
+import os
+import pytest
+from fastapi.testclient import TestClient
+
+import api.main
+from api.main import app
+from scheduled_task.scheduled_task_utils.http_client import create_api_client
+from scheduled_task.scheduled_task_utils.model_update_utils import file_sha256, update_model_served
+
+
+RETRAINED_MODELS_DIR = "scheduled_task/retrained_models"
+AVAILABLE_MODELS = os.listdir(RETRAINED_MODELS_DIR)
+
+
+@pytest.mark.parametrize("test_model", AVAILABLE_MODELS)
+def test_streaming_model_upload(test_model):
+    """The scheduler streams the raw model file and the API serves it after one load"""
+    async def upload():
+        async with create_api_client(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await update_model_served(client, "", RETRAINED_MODELS_DIR, test_model)
+
+    with TestClient(app):
+        updated_model_name, updated_model_version = asyncio.run(upload())
+
+    assert (updated_model_name == test_model) and (updated_model_version == "1.1") and \
+        (file_sha256(f"{api.main.MODELS_DIR}/{test_model}") == file_sha256(f"{RETRAINED_MODELS_DIR}/{test_model}"))
+
+
+def test_upload_checksum_mismatch():
+    """A corrupted upload is rejected and leaves no file behind"""
+    with open(f"{RETRAINED_MODELS_DIR}/rf-24.joblib", "rb") as f:
+        model_bytes = f.read()
+    files_before = set(os.listdir(api.main.MODELS_DIR))
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/upload_model",
+            params={"modelFilename": "corrupted.joblib"},
+            content=model_bytes[:-10],
+            headers={"X-Content-SHA256": file_sha256(f"{RETRAINED_MODELS_DIR}/rf-24.joblib")}
+        )
+        current_model = client.get("/current_model").json()
+
+    assert (response.status_code == 400) and (set(os.listdir(api.main.MODELS_DIR)) == files_before) and \
+        (current_model["currentModelVersion"] == "1.0")
+
+
+def test_upload_rejects_path_traversal():
+    with TestClient(app) as client:
+        response = client.post("/upload_model", params={"modelFilename": "../main.py"}, content=b"model")
+
+    assert response.status_code == 400
+
+
+def test_upload_without_a_served_model():
+    """If the default model never loaded, the first uploaded model is served as version 1.0"""
+    with open(f"{RETRAINED_MODELS_DIR}/rf-24.joblib", "rb") as f:
+        model_bytes = f.read()
+
+    with TestClient(app) as client:
+        app.state.served = None
+        response = client.post("/upload_model", params={"modelFilename": "rf-24.joblib"}, content=model_bytes)
+
+    assert (response.status_code == 200) and (response.json()["updatedModelVersion"] == "1.0")
@@ -0,0 +1,41 @@
+import joblib
+from fastapi.testclient import TestClient
+import numpy as np
+
+from api.main import app, MODELS_DIR, DEFAULT_MODEL_FILE
+from api.schema_config import FEATURE_NAMES
+
+
+DATA_PATH = "api/tests/data"
+TEST_FEATURES = np.load(f'{DATA_PATH}/X_test.npy')
+TEST_SET = [dict(zip(FEATURE_NAMES, row)) for row in TEST_FEATURES.tolist()]
+EXPECTED_PREDICTIONS = joblib.load(f"{MODELS_DIR}/{DEFAULT_MODEL_FILE}").predict(TEST_FEATURES).tolist()
+
+
+def test_predict_batch_rows():
+    """A list of observations is scored in one call, matching the model row by row"""
+    with TestClient(app) as client:
+        response = client.post("/predict_batch", json={"observations": TEST_SET})
+
+    assert (response.status_code == 200) and \
+        (response.json() == {"species": EXPECTED_PREDICTIONS, "model": "rf-12-base"})
+
+
+def test_predict_batch_columns():
+    """A columnar payload gives the same predictions as the row-wise payload"""
+    columns = {name: TEST_FEATURES[:, idx].tolist() for idx, name in enumerate(FEATURE_NAMES)}
+    with TestClient(app) as client:
+        response = client.post("/predict_batch", json={"columns": columns})
+
+    assert (response.status_code == 200) and (response.json()["species"] == EXPECTED_PREDICTIONS)
+
+
+def test_predict_batch_errors_by_index():
+    """Invalid rows are reported with their index in the batch"""
+    observations = TEST_SET[:3] + [{**TEST_SET[3], "petalwidth": -1}]
+    with TestClient(app) as client:
+        response = client.post("/predict_batch", json={"observations": observations})
+
+    assert (response.status_code == 400) and (response.json()["errorDetails"] == [
+        {"field": "observations.3.petalwidth", "message": "Input should be greater than 0"}
+    ])
@@ -0,0 +1,97 @@
+import json
+import joblib
+from fastapi.testclient import TestClient
+import numpy as np
+
+import api.main
+from api.main import app, MODELS_DIR, DEFAULT_MODEL_FILE
+from api.bulk_score import main as bulk_score
+from api.ndjson_scoring import LineSplitter, OversizedLine, score_ndjson_lines
+from api.schema_config import FEATURE_NAMES
+
+
+DATA_PATH = "api/tests/data"
+TEST_FEATURES = np.load(f'{DATA_PATH}/X_test.npy')
+TEST_LINES = [json.dumps(dict(zip(FEATURE_NAMES, row))) for row in TEST_FEATURES.tolist()]
+EXPECTED_PREDICTIONS = joblib.load(f"{MODELS_DIR}/{DEFAULT_MODEL_FILE}").predict(TEST_FEATURES).tolist()
+
+# Line 3 is not JSON and line 5 has a negative feature, both reported inline
+BODY_LINES = TEST_LINES[:2] + ["{not json"] + TEST_LINES[2:3] + [TEST_LINES[3].replace('"petalwidth": ', '"petalwidth": -')] + TEST_LINES[4:]
+EXPECTED_PREDICTION_LINES = [1, 2, 4] + list(range(6, len(BODY_LINES) + 1))
+
+
+def check_results(results):
+    predictions = [r["species"] for r in results if r["species"] is not None]
+    errors = [r for r in results if r["species"] is None]
+    return (
+        ([r["line"] for r in results] == list(range(1, len(BODY_LINES) + 1))) and
+        ([r["line"] for r in results if r["species"] is not None] == EXPECTED_PREDICTION_LINES) and
+        (predictions == EXPECTED_PREDICTIONS[:3] + EXPECTED_PREDICTIONS[4:]) and
+        ([e["line"] for e in errors] == [3, 5]) and ("petalwidth" in errors[1]["errorMessage"])
+    )
+
+
+def test_predict_stream(monkeypatch):
+    """NDJSON lines are scored in chunks and malformed lines are reported in place"""
+    monkeypatch.setattr(api.main, "STREAM_CHUNK_SIZE", 4)
+    with TestClient(app) as client:
+        response = client.post(
+            "/predict_stream",
+            content="\n".join(BODY_LINES).encode(),
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+    results = [json.loads(line) for line in response.text.splitlines()]
+
+    assert (response.status_code == 200) and (response.headers["X-Model"] == "rf-12-base") and \
+        check_results(results)
+
+
+def test_bulk_score_cli(tmp_path):
+    """The CLI writes the same NDJSON results for a file on disk"""
+    input_path, output_path = tmp_path / "observations.jsonl", tmp_path / "predictions.jsonl"
+    input_path.write_text("\n".join(BODY_LINES) + "\n")
+
+    bulk_score([str(input_path), "-o", str(output_path), "--chunk-size", "4"])
+    results = [json.loads(line) for line in output_path.read_text().splitlines()]
+
+    assert check_results(results)
+
+
+def test_invalid_lines_are_flushed_chunk_by_chunk():
+    """A stream of only malformed lines is written out one chunk at a time, without calling predict"""
+    def predict(features):
+        raise AssertionError("predict called without valid rows")
+
+    chunks = list(score_ndjson_lines([b"{not json"] * 25, predict, chunk_size=10))
+    results = [[json.loads(line) for line in chunk.decode().splitlines()] for chunk in chunks]
+
+    assert ([len(chunk) for chunk in results] == [10, 10, 5]) and \
+        all(r["species"] is None for chunk in results for r in chunk) and \
+        ([r["line"] for chunk in results for r in chunk] == list(range(1, 26)))
+
+
+def test_oversized_line_is_dropped_and_reported(monkeypatch):
+    """A line past the length limit is not buffered whole: it is reported inline and the next lines are scored"""
+    monkeypatch.setattr(api.main, "STREAM_MAX_LINE_BYTES", 200)
+    body = TEST_LINES[0] + "\n" + "x" * 100_000 + "\n" + TEST_LINES[1]
+
+    def chunks():
+        # Delivered in small pieces, so the long line spans many of them
+        for start in range(0, len(body), 1000):
+            yield body[start:start + 1000].encode()
+
+    with TestClient(app) as client:
+        response = client.post("/predict_stream", content=chunks(), headers={"Content-Type": "application/x-ndjson"})
+    results = [json.loads(line) for line in response.text.splitlines()]
+
+    assert ([r["line"] for r in results] == [1, 2, 3]) and \
+        ([r["species"] for r in results] == [EXPECTED_PREDICTIONS[0], None, EXPECTED_PREDICTIONS[1]]) and \
+        ("200 byte limit" in results[1]["errorMessage"])
+
+
+def test_line_splitter_keeps_at_most_the_limit():
+    splitter = LineSplitter(max_line_bytes=4)
+    lines = splitter.feed(b"ab\nabcdefgh") + splitter.feed(b"ijk\ncd") + splitter.finish()
+
+    assert (lines == [b"ab", b"abcd", b"cd"]) and isinstance(lines[1], OversizedLine) and \
+        not isinstance(lines[2], OversizedLine) and (len(splitter.partial) == 0)
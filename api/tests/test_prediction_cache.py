@@ -0,0 +1,55 @@
+import time
+from fastapi.testclient import TestClient
+import numpy as np
+
+from api.main import app
+from api.prediction_cache import PredictionCache
+from api.schema_config import FEATURE_NAMES
+from scheduled_task.scheduled_task_utils.model_update_utils import encode_model_file_to_b64
+
+
+DATA_PATH = "api/tests/data"
+TEST_FEATURES = np.load(f'{DATA_PATH}/X_test.npy')
+TEST_SET = [dict(zip(FEATURE_NAMES, row)) for row in TEST_FEATURES.tolist()]
+
+
+def test_cache_lru_and_ttl_eviction():
+    """Least recently used entries are evicted first and expired entries miss"""
+    cache = PredictionCache(max_size=2)
+    cache.put((1.0,), "1.0", 0)
+    cache.put((2.0,), "1.0", 1)
+    cache.get((1.0,), "1.0")
+    cache.put((3.0,), "1.0", 2)
+
+    expiring = PredictionCache(max_size=2, ttl_sec=0.01)
+    expiring.put((1.0,), "1.0", 0)
+    time.sleep(0.02)
+
+    assert (cache.get((2.0,), "1.0") is None) and (cache.get((1.0,), "1.0") == 0) and \
+        (cache.get((1.0,), "1.1") is None) and (cache.stats()["evictions"] == 1) and \
+        (expiring.get((1.0,), "1.0") is None)
+
+
+def test_repeated_predictions_hit_cache():
+    """Replaying the test set is answered from the cache, with identical predictions"""
+    with TestClient(app) as client:
+        first = [client.post("/predict", json=payload).json() for payload in TEST_SET]
+        second = [client.post("/predict", json=payload).json() for payload in TEST_SET]
+        batch = client.post("/predict_batch", json={"observations": TEST_SET}).json()
+        stats = client.get("/cache_stats").json()
+
+    assert (first == second) and (batch["species"] == [r["species"] for r in first]) and \
+        (stats["hits"] == 2 * len(TEST_SET)) and (stats["size"] == len(set(map(tuple, TEST_FEATURES.tolist()))))
+
+
+def test_cache_cleared_on_model_update():
+    """Swapping the served model invalidates every cached prediction"""
+    with TestClient(app) as client:
+        client.post("/predict", json=TEST_SET[0])
+        client.post("/update_model", json={
+            "modelFilename": "rf-24.joblib",
+            "modelObject": encode_model_file_to_b64("scheduled_task/retrained_models", "rf-24.joblib")
+        })
+        stats = client.get("/cache_stats").json()
+
+    assert (stats["enabled"] is True) and (stats["size"] == 0)
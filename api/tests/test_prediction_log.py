@@ -0,0 +1,47 @@
+import asyncio
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import api.main
+from api.main import app
+from api.prediction_log import PredictionLog, load_prediction_logs
+from api.schema_config import FEATURE_NAMES
+
+
+DATA_PATH = "api/tests/data"
+TEST_FEATURES = np.load(f'{DATA_PATH}/X_test.npy')
+TEST_SET = [dict(zip(FEATURE_NAMES, row)) for row in TEST_FEATURES.tolist()]
+
+
+def test_predictions_are_logged_to_shards():
+    """Served predictions are flushed to shards with their features, model version and latency"""
+    with TestClient(app) as client:
+        batch = client.post("/predict_batch", json={"observations": TEST_SET}).json()
+        single = client.post("/predict", json=TEST_SET[0]).json()
+        stats = client.get("/prediction_log_stats").json()
+    # The log directory is redirected to tmp_path by conftest.py
+    logs = load_prediction_logs(api.main.PREDICTION_LOG_DIR)
+
+    assert (stats["logged"] == len(TEST_SET) + 1) and (stats["dropped"] == 0) and \
+        np.array_equal(logs["features"], np.vstack([TEST_FEATURES, TEST_FEATURES[:1]])) and \
+        (logs["predictions"].tolist() == batch["species"] + [single["species"]]) and \
+        set(logs["model_versions"]) == {"1.0"} and (logs["latency_ms"] > 0).all()
+
+
+def test_ring_buffer_drop_and_block_policies(tmp_path):
+    """A full buffer drops rows under "drop" and waits for a flush under "block", keeping row order"""
+    async def run(policy, directory):
+        prediction_log = PredictionLog(str(directory), len(FEATURE_NAMES), capacity=8, flush_interval_sec=60, policy=policy)
+        prediction_log.start()
+        for start in range(0, 20, 5):
+            await prediction_log.log(TEST_FEATURES[start:start + 5], np.arange(start, start + 5), "1.0", 1.0)
+        await prediction_log.stop()
+        return prediction_log.stats(), load_prediction_logs(str(directory))
+
+    drop_stats, drop_logs = asyncio.run(run("drop", tmp_path / "drop"))
+    block_stats, block_logs = asyncio.run(run("block", tmp_path / "block"))
+
+    assert (drop_stats["dropped"] == 12) and (drop_logs["predictions"].tolist() == list(range(8))) and \
+        (block_stats["dropped"] == 0) and (block_logs["predictions"].tolist() == list(range(20))) and \
+        np.array_equal(block_logs["features"], TEST_FEATURES[:20])
@@ -0,0 +1,70 @@
+import threading
+import time
+
+import joblib
+import numpy as np
+from fastapi.testclient import TestClient
+
+import api.main
+from api.forest_engine import CompiledForest
+from api.main import app
+from api.schema_config import FEATURE_NAMES
+
+
+DATA_PATH = "api/tests/data"
+TEST_FEATURES = np.load(f'{DATA_PATH}/X_test.npy')
+TEST_SET = [dict(zip(FEATURE_NAMES, row)) for row in TEST_FEATURES.tolist()]
+
+
+def test_background_startup_reports_starting_until_ready(monkeypatch):
+    """Requests are accepted at once, answered "starting" (503) until the default model is loaded"""
+    release = threading.Event()
+    load_default_model_file = api.main.load_default_model_file
+
+    def slow_load():
+        release.wait(5)
+        return load_default_model_file()
+
+    monkeypatch.setattr(api.main, "STARTUP_MODE", "background")
+    monkeypatch.setattr(api.main, "load_default_model_file", slow_load)
+    with TestClient(app) as client:
+        starting = client.get("/")
+        predict_starting = client.post("/predict", json=TEST_SET[0])
+        release.set()
+        for _ in range(500):
+            health = client.get("/")
+            if health.status_code == 200:
+                break
+            time.sleep(0.01)
+        prediction = client.post("/predict", json=TEST_SET[0])
+        profile = client.get("/startup_profile").json()
+
+    assert (starting.status_code == 503) and (starting.json() == {"health_check": "starting"}) and \
+        (starting.headers["Retry-After"] == "1") and (predict_starting.status_code == 503) and \
+        (health.json() == {"health_check": "success"}) and (prediction.status_code == 200) and \
+        profile["ready"] and (profile["mode"] == "background") and \
+        {"defaultModelLoad", "defaultModelWarmup"} <= set(profile["phasesMs"])
+
+
+def test_startup_profile_in_blocking_mode():
+    """The default startup loads the model before serving and reports import time and each phase"""
+    with TestClient(app) as client:
+        health = client.get("/")
+        profile = client.get("/startup_profile").json()
+
+    assert (health.status_code == 200) and profile["ready"] and (profile["mode"] == "blocking") and \
+        (profile["importMs"] > 0) and (profile["timeToReadyMs"] >= profile["importMs"]) and \
+        {"state", "defaultModel", "services"} <= set(profile["phasesMs"])
+
+
+def test_fast_load_serves_identical_predictions(tmp_path, monkeypatch):
+    """The default model loaded from its memory-mapped flat artifact predicts exactly like the joblib file"""
+    expected = joblib.load(f"{api.main.MODELS_DIR}/{api.main.DEFAULT_MODEL_FILE}").predict(TEST_FEATURES).tolist()
+    monkeypatch.setattr(api.main, "STARTUP_FAST_LOAD", True)
+    monkeypatch.setattr(api.main, "MODEL_CACHE_DIR", str(tmp_path))
+    for _ in range(2):  # The first start builds the artifact, the second only maps it
+        with TestClient(app) as client:
+            predictions = client.post("/predict_batch", json={"observations": TEST_SET}).json()["species"]
+            served = app.state.served.model
+
+    assert isinstance(served, CompiledForest) and (predictions == expected)
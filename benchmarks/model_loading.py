@@ -0,0 +1,112 @@
+"""
+Startup-time and memory benchmark of the joblib loader against the memory-mapped and compact loaders.
+
+    python -m benchmarks.model_loading [--models-dir scheduled_task/retrained_models] [--workers 4]
+
+Every measurement runs in a fresh process, like a cold uvicorn worker: it loads one
+model, runs one prediction and reports load time, resident memory (RSS) and
+proportional set size (PSS, resident memory with shared pages divided between the
+processes mapping them). The mmap and compact loaders' copies are built before timing, as
+they would be by the first worker on a node. joblib load times include importing
+scikit-learn on first unpickle, which the other loaders never need. Memory figures
+need Linux's /proc.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+LOADERS = ("joblib", "mmap", "compact")
+
+
+def memory_kb() -> dict:
+    """Current RSS and PSS of this process in KiB."""
+    usage = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, value = line.split(":", 1)
+            if key in ("Rss", "Pss"):
+                usage[key.lower()] = int(value.split()[0])
+    return usage
+
+
+def measure(loader, models_dir, model_file, cache_dir) -> dict:
+    """Load a model the given way in this process and report its cost."""
+    from api.serving_utils import load_compact_model, load_mmap_model, load_model
+
+    before = memory_kb()
+    start = time.perf_counter()
+    if loader == "mmap":
+        model = load_mmap_model(models_dir, model_file, cache_dir)
+    elif loader == "compact":
+        model = load_compact_model(models_dir, model_file, cache_dir)
+    else:
+        model = load_model(models_dir, model_file)
+    load_ms = (time.perf_counter() - start) * 1000
+    # One prediction touches the tree arrays, as the first request would
+    start = time.perf_counter()
+    model.predict(np.full((1, model.n_features_in_), 1.0))
+    first_predict_ms = (time.perf_counter() - start) * 1000
+    after = memory_kb()
+    return {
+        "loadMs": round(load_ms, 3),
+        "firstPredictMs": round(first_predict_ms, 3),
+        "rssKb": after["rss"] - before["rss"],
+        "pssKb": after["pss"] - before["pss"]
+    }
+
+
+def run_workers(loader, models_dir, model_file, cache_dir, workers) -> list:
+    """Start workers processes at once, each loading the model and holding it until all are measured."""
+    script = (
+        "import json, sys; from benchmarks.model_loading import measure; "
+        f"print(json.dumps(measure({loader!r}, {models_dir!r}, {model_file!r}, {cache_dir!r})), flush=True); "
+        "sys.stdin.read()"
+    )
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", script], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, text=True
+        )
+        for _ in range(workers)
+    ]
+    results = [json.loads(process.stdout.readline()) for process in processes]
+    for process in processes:
+        process.communicate("")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare joblib, memory-mapped and compact model loading.")
+    parser.add_argument("--models-dir", default="scheduled_task/retrained_models")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent worker processes per measurement")
+    args = parser.parse_args(argv)
+
+    from api.serving_utils import load_compact_model, load_mmap_model
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        report = {}
+        for model_file in sorted(os.listdir(args.models_dir)):
+            load_mmap_model(args.models_dir, model_file, cache_dir)
+            load_compact_model(args.models_dir, model_file, cache_dir)
+            report[model_file] = {}
+            for loader in LOADERS:
+                results = run_workers(loader, args.models_dir, model_file, cache_dir, args.workers)
+                report[model_file][loader] = {
+                    "medianLoadMs": round(float(np.median([r["loadMs"] for r in results])), 3),
+                    "medianFirstPredictMs": round(float(np.median([r["firstPredictMs"] for r in results])), 3),
+                    "totalRssKb": sum(r["rssKb"] for r in results),
+                    "totalPssKb": sum(r["pssKb"] for r in results)
+                }
+                print(f"{model_file:<20} {loader:<7} {json.dumps(report[model_file][loader])}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
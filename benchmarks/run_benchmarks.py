@@ -0,0 +1,183 @@
+"""
+Reproducible benchmarks of the serving and evaluation hot paths.
+
+    python -m benchmarks.run_benchmarks --save benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --compare benchmarks/baseline.json --max-regression 0.25
+
+Runs in-process against api.main.app through FastAPI's TestClient and covers:
+- /predict (single row) and /predict_batch (whole test set) for every model in
+  scheduled_task/retrained_models, with the prediction cache disabled
+- model load and swap through /update_model
+- the base64 serialization round trip of encode_model_file_to_b64 / save_retrained_model
+- evaluate_model metric computation
+
+Each case is warmed up and then timed for a fixed number of rounds. Results are
+written as JSON, and --compare exits with status 1 if any case's median time
+regressed by more than --max-regression (a fraction) against a saved baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+
+RETRAINED_MODELS_DIR = "scheduled_task/retrained_models"
+DATA_PATH = "scheduled_task/test_dataset"
+
+
+def time_case(fn, rounds: int, warmup: int) -> dict:
+    """Time fn() for a number of rounds after warming it up, in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter_ns()
+        fn()
+        timings.append((time.perf_counter_ns() - start) / 1e6)
+    timings = np.array(timings)
+    return {
+        "rounds": rounds,
+        "minMs": round(float(timings.min()), 4),
+        "medianMs": round(float(np.median(timings)), 4),
+        "meanMs": round(float(timings.mean()), 4),
+        "p95Ms": round(float(np.percentile(timings, 95)), 4),
+        "maxMs": round(float(timings.max()), 4)
+    }
+
+
+def collect_cases(models_dir: str, tmp_dir: str):
+    """Yield (name, fn, rounds scale) for every benchmark case."""
+    import joblib
+    from fastapi.testclient import TestClient
+
+    import api.main
+    from api.schema_config import FEATURE_NAMES
+    from api.serving_utils import save_retrained_model
+    from scheduled_task.scheduled_task_utils.evaluation_utils import evaluate_model
+    from scheduled_task.scheduled_task_utils.model_update_utils import encode_model_file_to_b64
+
+    test_features = np.load(f"{DATA_PATH}/X_test.npy")
+    test_labels = np.load(f"{DATA_PATH}/y_test.npy")
+    test_set = [dict(zip(FEATURE_NAMES, row)) for row in test_features.tolist()]
+    model_files = sorted(os.listdir(models_dir))
+
+    # Serve from a scratch models directory so benchmarks never touch api/prod_models
+    serving_dir = os.path.join(tmp_dir, "prod_models")
+    os.makedirs(serving_dir)
+    shutil.copy(os.path.join(api.main.MODELS_DIR, api.main.DEFAULT_MODEL_FILE), serving_dir)
+    api.main.MODELS_DIR = serving_dir
+    # The app's own state lives in the scratch directory too
+    api.main.PREDICTION_LOG_DIR = os.path.join(tmp_dir, "prediction_logs")
+    api.main.ARTIFACTS_DIR = os.path.join(tmp_dir, "artifacts")
+    api.main.PREDICTION_CACHE_SIZE = 0
+
+    with TestClient(api.main.app) as client:
+        for model_file in model_files:
+            api.main.set_served_model(model_file, model=joblib.load(os.path.join(models_dir, model_file)))
+            name = model_file.split(".")[0]
+            yield (
+                f"predict_single[{name}]",
+                lambda: client.post("/predict", json=test_set[0]).raise_for_status(),
+                1
+            )
+            yield (
+                f"predict_batch[{name}]",
+                lambda: client.post("/predict_batch", json={"observations": test_set}).raise_for_status(),
+                1
+            )
+
+        for model_file in model_files:
+            model_b64 = encode_model_file_to_b64(models_dir, model_file)
+            yield (
+                f"update_model[{model_file.split('.')[0]}]",
+                lambda: client.post(
+                    "/update_model", json={"modelFilename": model_file, "modelObject": model_b64}
+                ).raise_for_status(),
+                0.2
+            )
+
+    for model_file in model_files:
+        name = model_file.split(".")[0]
+        yield (
+            f"serialization_round_trip[{name}]",
+            lambda: save_retrained_model(encode_model_file_to_b64(models_dir, model_file), tmp_dir, model_file),
+            0.2
+        )
+        yield (
+            f"evaluate_model[{name}]",
+            lambda: evaluate_model(os.path.join(models_dir, model_file), test_features, test_labels),
+            0.2
+        )
+
+
+def run(rounds: int, warmup: int, name_filter: str = None, models_dir: str = RETRAINED_MODELS_DIR) -> dict:
+    import sklearn
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, fn, scale in collect_cases(models_dir, tmp_dir):
+            if name_filter and name_filter not in name:
+                continue
+            results[name] = time_case(fn, max(int(rounds * scale), 3), warmup)
+            print(f"{name:<40} median {results[name]['medianMs']:>10.4f} ms  p95 {results[name]['p95Ms']:>10.4f} ms")
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "sklearn": sklearn.__version__,
+            "rounds": rounds,
+            "warmup": warmup
+        },
+        "results": results
+    }
+
+
+def compare(current: dict, baseline: dict, max_regression: float, stat: str = "medianMs") -> list:
+    """Return a description of every case slower than the baseline by more than max_regression."""
+    regressions = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before, after = baseline["results"][name][stat], result[stat]
+        change = (after - before) / before if before else 0.0
+        print(f"{name:<40} {before:>10.4f} -> {after:>10.4f} ms ({change:+.1%})")
+        if change > max_regression:
+            regressions.append(f"{name}: {stat} {before:.4f} -> {after:.4f} ms ({change:+.1%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the serving and evaluation hot paths.")
+    parser.add_argument("--rounds", type=int, default=50, help="Timed rounds per fast case")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed rounds before timing")
+    parser.add_argument("--filter", dest="name_filter", help="Only run cases whose name contains this")
+    parser.add_argument("--save", help="Write results as a JSON baseline to this path")
+    parser.add_argument("--compare", help="Baseline JSON to compare results against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed slowdown, as a fraction")
+    args = parser.parse_args(argv)
+
+    current = run(args.rounds, args.warmup, args.name_filter)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(current, f, indent=4)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.max_regression)
+        if regressions:
+            print("\nRegressions above threshold:\n" + "\n".join(f" - {r}" for r in regressions))
+            sys.exit(1)
+        print("\nNo regressions above threshold.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
+import json
 import logging
+import os
+from typing import List, Optional, Sequence
 
 import numpy as np
 
@@ -6,13 +9,275 @@ import numpy as np
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
 
+VALID_LABELS = (0, 1, 2)  # Iris classes expected in the test labels
+PROFILE_CHUNK_SIZE = 100_000  # Rows profiled at a time
+SKETCH_SIZE = 256  # Items kept per level of each quantile sketch, about 1% rank error
+MAX_INVALID_LABELS = 20  # Distinct invalid label values kept for the report
+MEAN_SHIFT_WARNING = 0.5  # Warn when a feature mean moves by this many standard deviations between runs
 
-def check_test_set(X_test: np.ndarray, y_test: np.ndarray) -> bool:
+
+class QuantileSketch:
+    """
+    Mergeable approximate quantile sketch in the style of KLL. Level i holds
+    items that each stand for 2**i values; when a level grows past `k` it is
+    sorted and every other item is promoted to the next level, so memory is
+    O(k log n) and the rank error is about 1/k per level.
+    """
+
+    def __init__(self, k: int = SKETCH_SIZE, seed: int = 0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values: np.ndarray):
+        self.levels[0] = np.concatenate([self.levels[0], np.asarray(values, dtype=np.float64)])
+        self._compact()
+
+    def merge(self, other: "QuantileSketch"):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compact()
+
+    def _compact(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.k:
+                items = np.sort(items)
+                # An odd item out stays at this level, the rest are halved into the next one
+                leftover, items = items[len(items) - len(items) % 2:], items[:len(items) - len(items) % 2]
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level] = leftover
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[self.rng.integers(2)::2]])
+            level += 1
+
+    def quantiles(self, qs: Sequence[float]) -> List[Optional[float]]:
+        items = np.concatenate(self.levels)
+        if items.size == 0:
+            return [None] * len(qs)
+        weights = np.concatenate([np.full(len(level_items), 2.0 ** level) for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items)
+        cumulative = np.cumsum(weights[order])
+        ranks = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1]).clip(0, len(items) - 1)
+        return items[order][ranks].tolist()
+
+    def to_dict(self) -> dict:
+        return {"k": self.k, "levels": [items.tolist() for items in self.levels]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuantileSketch":
+        sketch = cls(k=data["k"])
+        sketch.levels = [np.asarray(items, dtype=np.float64) for items in data["levels"]]
+        return sketch
+
+
+class DataProfile:
+    """
+    Statistics of a test set gathered in one chunked pass: per-feature NaN/inf
+    counts, min/max, mean and variance (Welford, combined per chunk with Chan's
+    formula), approximate quantiles, and a class histogram of the labels.
+    Profiles of separate chunks or workers can be merged, and saved as JSON
+    to compare with the next run. Labels above max_label are reported as
+    invalid rather than counted, so one huge label cannot blow up the histogram.
+    """
+
+    def __init__(self, n_features: int, sketch_size: int = SKETCH_SIZE, max_label: int = max(VALID_LABELS)):
+        self.n_features = n_features
+        self.max_label = max_label
+        self.rows = 0
+        self.nan_count = np.zeros(n_features, dtype=np.int64)
+        self.inf_count = np.zeros(n_features, dtype=np.int64)
+        self.finite_count = np.zeros(n_features, dtype=np.int64)
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+        self.min = np.full(n_features, np.inf)
+        self.max = np.full(n_features, -np.inf)
+        self.sketches = [QuantileSketch(sketch_size) for _ in range(n_features)]
+        self.label_nan_count = 0
+        self.label_counts = np.zeros(0, dtype=np.int64)
+        self.invalid_labels = []
+
+    def update(self, X_chunk: np.ndarray, y_chunk: np.ndarray):
+        """Add a chunk of rows: every statistic is updated from this single read"""
+        X_chunk = np.asarray(X_chunk, dtype=np.float64)
+        y_chunk = np.asarray(y_chunk)
+        finite = np.isfinite(X_chunk)
+        nan = np.isnan(X_chunk)
+
+        chunk = DataProfile(self.n_features, self.sketches[0].k, self.max_label)
+        chunk.rows = len(X_chunk)
+        chunk.nan_count = nan.sum(axis=0)
+        chunk.inf_count = (~finite & ~nan).sum(axis=0)
+        chunk.finite_count = finite.sum(axis=0)
+        finite_values = np.where(finite, X_chunk, 0.0)
+        chunk.mean = finite_values.sum(axis=0) / np.maximum(chunk.finite_count, 1)
+        chunk.m2 = (np.where(finite, X_chunk - chunk.mean, 0.0) ** 2).sum(axis=0)
+        chunk.min = np.where(finite, X_chunk, np.inf).min(axis=0, initial=np.inf)
+        chunk.max = np.where(finite, X_chunk, -np.inf).max(axis=0, initial=-np.inf)
+        for feature, sketch in enumerate(chunk.sketches):
+            sketch.update(X_chunk[finite[:, feature], feature])
+
+        # Labels must be integers from 0 to max_label to be counted by class
+        if y_chunk.dtype.kind == "f":
+            chunk.label_nan_count = int(np.isnan(y_chunk).sum())
+            y_chunk = y_chunk[~np.isnan(y_chunk)]
+            countable = np.isfinite(y_chunk) & (y_chunk == np.round(y_chunk))
+        else:
+            countable = np.ones(len(y_chunk), dtype=bool)
+        countable &= (y_chunk >= 0) & (y_chunk <= self.max_label)
+        chunk.label_counts = np.bincount(y_chunk[countable].astype(np.int64))
+        chunk.invalid_labels = np.unique(y_chunk[~countable]).tolist()[:MAX_INVALID_LABELS]
+
+        self.merge(chunk)
+
+    def merge(self, other: "DataProfile"):
+        """Combine with the profile of other rows, as if both had been profiled together"""
+        n_a, n_b = self.finite_count, other.finite_count
+        n = n_a + n_b
+        delta = other.mean - self.mean
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.mean = np.where(n > 0, self.mean + delta * n_b / n, 0.0)
+            self.m2 = np.where(n > 0, self.m2 + other.m2 + delta ** 2 * n_a * n_b / n, 0.0)
+        self.finite_count = n
+        self.rows += other.rows
+        self.nan_count = self.nan_count + other.nan_count
+        self.inf_count = self.inf_count + other.inf_count
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        for sketch, other_sketch in zip(self.sketches, other.sketches):
+            sketch.merge(other_sketch)
+
+        self.label_nan_count += other.label_nan_count
+        size = max(len(self.label_counts), len(other.label_counts))
+        self.label_counts = np.pad(self.label_counts, (0, size - len(self.label_counts))) + \
+            np.pad(other.label_counts, (0, size - len(other.label_counts)))
+        self.invalid_labels = sorted(set(self.invalid_labels) | set(other.invalid_labels))[:MAX_INVALID_LABELS]
+        return self
+
+    @property
+    def variance(self) -> np.ndarray:
+        return np.where(self.finite_count > 0, self.m2 / np.maximum(self.finite_count, 1), np.nan)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.variance)
+
+    def quantiles(self, qs: Sequence[float]) -> List[List[Optional[float]]]:
+        """Approximate quantiles per feature"""
+        return [sketch.quantiles(qs) for sketch in self.sketches]
+
+    def class_counts(self, labels: Sequence[int] = VALID_LABELS) -> dict:
+        return {label: int(self.label_counts[label]) if label < len(self.label_counts) else 0 for label in labels}
+
+    def to_dict(self) -> dict:
+        return {
+            "nFeatures": self.n_features,
+            "maxLabel": self.max_label,
+            "rows": self.rows,
+            "nanCount": self.nan_count.tolist(),
+            "infCount": self.inf_count.tolist(),
+            "finiteCount": self.finite_count.tolist(),
+            "mean": self.mean.tolist(),
+            "m2": self.m2.tolist(),
+            "min": [float(value) if np.isfinite(value) else None for value in self.min],
+            "max": [float(value) if np.isfinite(value) else None for value in self.max],
+            "sketches": [sketch.to_dict() for sketch in self.sketches],
+            "labelNanCount": self.label_nan_count,
+            "labelCounts": self.label_counts.tolist(),
+            "invalidLabels": self.invalid_labels
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DataProfile":
+        profile = cls(data["nFeatures"], max_label=data.get("maxLabel", max(VALID_LABELS)))
+        profile.rows = data["rows"]
+        profile.nan_count = np.asarray(data["nanCount"], dtype=np.int64)
+        profile.inf_count = np.asarray(data["infCount"], dtype=np.int64)
+        profile.finite_count = np.asarray(data["finiteCount"], dtype=np.int64)
+        profile.mean = np.asarray(data["mean"], dtype=np.float64)
+        profile.m2 = np.asarray(data["m2"], dtype=np.float64)
+        profile.min = np.asarray([np.inf if value is None else value for value in data["min"]])
+        profile.max = np.asarray([-np.inf if value is None else value for value in data["max"]])
+        profile.sketches = [QuantileSketch.from_dict(sketch) for sketch in data["sketches"]]
+        profile.label_nan_count = data["labelNanCount"]
+        profile.label_counts = np.asarray(data["labelCounts"], dtype=np.int64)
+        profile.invalid_labels = data["invalidLabels"]
+        return profile
+
+    def save(self, path: str):
+        """Write the profile atomically, so a crash never leaves it half written"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["DataProfile"]:
+        """Read a saved profile, None if it is missing or unreadable"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                return cls.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable data profile {path}: {e}")
+            return None
+
+
+def profile_test_set(
+        X_test: np.ndarray,
+        y_test: np.ndarray,
+        chunk_size: int = PROFILE_CHUNK_SIZE,
+        valid_labels: Sequence[int] = VALID_LABELS
+    ) -> DataProfile:
+    """Profile a (possibly memory-mapped) test set with one sequential read"""
+    profile = DataProfile(X_test.shape[1], max_label=max(valid_labels))
+    for start in range(0, len(X_test), chunk_size):
+        profile.update(X_test[start:start + chunk_size], y_test[start:start + chunk_size])
+    return profile
+
+
+def compare_profiles(previous: DataProfile, current: DataProfile, max_mean_shift: float = MEAN_SHIFT_WARNING) -> List[str]:
+    """Describe notable changes in a test set since the previous profile"""
+    changes = []
+    if previous.n_features != current.n_features:
+        return [f"Number of features changed: {previous.n_features} -> {current.n_features}"]
+    if previous.rows != current.rows:
+        changes.append(f"Number of samples changed: {previous.rows} -> {current.rows}")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shift = np.abs(current.mean - previous.mean) / previous.std
+    for idx in np.where(shift > max_mean_shift)[0]:
+        changes.append(
+            f"Feature {idx} mean moved by {shift[idx]:.2f} standard deviations: "
+            f"{previous.mean[idx]:.4f} -> {current.mean[idx]:.4f}"
+        )
+    previous_share = previous.label_counts / max(previous.label_counts.sum(), 1)
+    current_share = current.label_counts / max(current.label_counts.sum(), 1)
+    size = max(len(previous_share), len(current_share))
+    share_change = np.pad(current_share, (0, size - len(current_share))) - np.pad(previous_share, (0, size - len(previous_share)))
+    for label in np.where(np.abs(share_change) > 0.05)[0]:
+        changes.append(f"Share of class {label} changed by {share_change[label]:+.1%}")
+    return changes
+
+
+def check_test_set(
+        X_test: np.ndarray,
+        y_test: np.ndarray,
+        chunk_size: int = PROFILE_CHUNK_SIZE,
+        valid_labels: Sequence[int] = VALID_LABELS,
+        profile_path: Optional[str] = None
+    ) -> bool:
     """
     Perform data quality and integrity checks for a multi-class test set.
     Parameters:
-    - X_test: 2D numpy array of float features
-    - y_test: 1D numpy array of integer labels (0, 1, 2)
+    - X_test: 2D numpy array of float features (may be memory-mapped)
+    - y_test: 1D numpy array of integer labels
+    - chunk_size: rows profiled at a time, all statistics come from one pass
+    - valid_labels: labels the test set may contain
+    - profile_path: if set, the profile is saved there and compared with the previous run's
     Returns: True if the test set is valid, meaning no issues, and otherwise False.
     """
     issues_found = []
@@ -24,40 +289,52 @@ def check_test_set(X_test: np.ndarray, y_test: np.ndarray) -> bool:
         issues_found.append(f"y_test should be 1D, found shape: {y_test.shape}")
     if X_test.shape[0] != y_test.shape[0]:
         issues_found.append(f"Number of samples mismatch: X_test={X_test.shape[0]}, y_test={y_test.shape[0]}")
+    if issues_found:
+        logger.info(f"\nIssues found: {issues_found}")
+        return False
 
+    profile = profile_test_set(X_test, y_test, chunk_size, valid_labels)
     n_samples, n_features = X_test.shape
 
-    # Missing values
-    if np.isnan(X_test).any():
-        issues_found.append("X_test contains NaN values")
-    if np.isnan(y_test).any():
+    # Missing and infinite values
+    if profile.nan_count.any():
+        issues_found.append(f"X_test contains NaN values (per column: {profile.nan_count.tolist()})")
+    if profile.inf_count.any():
+        issues_found.append(f"X_test contains infinite values (per column: {profile.inf_count.tolist()})")
+    if profile.label_nan_count:
         issues_found.append("y_test contains NaN values")
 
     # Label validity
-    unique_labels = np.unique(y_test)
-    if not np.all(np.isin(unique_labels, [0, 1, 2])):
-        issues_found.append(f"y_test contains invalid labels: {unique_labels}")
-    
-    # Check class balance
-    class_counts = {label: int(np.sum(y_test == label)) for label in [0, 1, 2]}
-    
-    # Feature ranges
-    X_min = np.min(X_test, axis=0)
-    X_max = np.max(X_test, axis=0)
+    observed_labels = np.nonzero(profile.label_counts)[0].tolist()
+    invalid_labels = sorted(set(observed_labels) - set(valid_labels)) + profile.invalid_labels
+    if invalid_labels:
+        issues_found.append(f"y_test contains invalid labels: {invalid_labels}")
 
     # Warn if any feature has zero variance
-    zero_variance_features = np.where(X_min == X_max)[0]
+    zero_variance_features = np.where(profile.min == profile.max)[0]
     if len(zero_variance_features) > 0:
         issues_found.append(f"Features with zero variance (columns): {zero_variance_features.tolist()}")
 
     # Summary report
+    quantiles = profile.quantiles([0.01, 0.5, 0.99])
     logger.info("\n===== Test Set Data Quality Report =====")
     logger.info(f"Number of samples: {n_samples}, Number of features: {n_features}")
-    logger.info(f"Class counts: {class_counts}")
-    logger.info(f"Unique labels: {unique_labels}")
-    logger.info(f"Feature ranges (min-max) per column:")
+    logger.info(f"Class counts: {profile.class_counts(valid_labels)}")
+    logger.info(f"Unique labels: {observed_labels}")
+    logger.info(f"Feature ranges (min-max), mean, std and approximate P1/P50/P99 per column:")
     for idx in range(n_features):
-        logger.info(f"  Feature {idx}: {X_min[idx]:.4f} - {X_max[idx]:.4f}")
+        p1, p50, p99 = (f"{q:.4f}" if q is not None else "n/a" for q in quantiles[idx])
+        logger.info(
+            f"  Feature {idx}: {profile.min[idx]:.4f} - {profile.max[idx]:.4f}, "
+            f"mean {profile.mean[idx]:.4f}, std {profile.std[idx]:.4f}, P1/P50/P99 {p1}/{p50}/{p99}"
+        )
+
+    if profile_path:
+        previous = DataProfile.load(profile_path)
+        if previous is not None:
+            for change in compare_profiles(previous, profile):
+                logger.warning(f"Test set changed since last run: {change}")
+        profile.save(profile_path)
 
     if issues_found:
         logger.info("\nIssues found:")
@@ -67,4 +344,4 @@ def check_test_set(X_test: np.ndarray, y_test: np.ndarray) -> bool:
         logger.info("\nNo issues detected. Test set passed integrity checks.\n")
 
     test_set_valid = True if not issues_found else False
-    return test_set_valid
\ No newline at end of file
+    return test_set_valid
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from scipy.stats import ks_2samp
 
 
@@ -14,3 +16,18 @@ def monitor_label_drift(test_labels, predictions, alpha=0.05) -> bool:
     drift_detected = (p_value < alpha)
 
     return drift_detected
+
+
+async def check_production_drift(client, api_url) -> Optional[bool]:
+    """
+    Ask the API whether production traffic has drifted from its reference profile.
+    The API keeps streaming histograms of the features and predicted classes it serves,
+    so this costs one request. Returns None if there is no reference or too little data.
+    """
+    response = await client.get(f"{api_url}/drift_report")
+    if response.status_code != 200:
+        return None
+    report = response.json()
+    if not report["enoughData"]:
+        return None
+    return report["driftDetected"]
@@ -1,41 +1,124 @@
+import hashlib
 import joblib
 import json
 import logging
+import multiprocessing
 import os
-from typing import Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional, Tuple
 
-from sklearn.metrics import (
-    accuracy_score,
-    f1_score,
-    precision_score,
-    recall_score,
-    log_loss
-)
+import numpy as np
+
+from .model_update_utils import file_sha256, list_model_files
 
 # Define model update rule
 PRIMARY_METRIC = "f1_macro" # Good metric when classes are balanced
 DELTA_THRESHOLD = 0.001  # Only update if candidate is meaningfully better
 ALWAYS_UPDATE_MODEL = True  # Use if we want to replace the model no matter what
+LOWER_IS_BETTER = {"log_loss"}  # Metrics where a smaller value is an improvement
+
+# Tournament mode: every candidate is scored in parallel, one process per core
+TOURNAMENT_WORKERS = os.cpu_count() or 1
+# Rows scored at a time, which bounds evaluation memory on large holdout sets
+EVALUATION_CHUNK_SIZE = 100_000
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
 
 
-def evaluate_model(model_path: str, test_features, test_labels) -> Tuple[dict, dict]:
-    """Load model and compute metrics on test set."""
-    model = joblib.load(model_path)
-    predictions = model.predict(test_features)
+class MetricsAccumulator:
+    """
+    Single-pass classification metrics, accumulated chunk by chunk.
+    Each chunk adds to one confusion matrix (built with np.bincount) and to a
+    running log loss sum, so memory does not grow with the number of rows.
+    Macro/micro precision, recall and F1 and accuracy are all derived from the
+    confusion matrix, matching scikit-learn with zero_division=0.
+    """
 
-    # For log_loss we need probabilities
-    y_proba = model.predict_proba(test_features) if hasattr(model, "predict_proba") else None
+    def __init__(self, classes):
+        self.classes = np.asarray(classes)
+        self.confusion = np.zeros((len(self.classes), len(self.classes)), dtype=np.int64)
+        self.log_loss_sum = 0.0
+        self.has_proba = True
 
-    metrics = {
-        "f1_macro": f1_score(test_labels, predictions, average="macro"),
-        "accuracy": accuracy_score(test_labels, predictions),
-        "precision_macro": precision_score(test_labels, predictions, average="macro", zero_division=0),
-        "recall_macro": recall_score(test_labels, predictions, average="macro", zero_division=0),
-        "log_loss": log_loss(test_labels, y_proba) if y_proba is not None else None
-    }
+    def _class_indices(self, labels) -> np.ndarray:
+        labels = np.asarray(labels)
+        indices = np.searchsorted(self.classes, labels).clip(0, len(self.classes) - 1)
+        if not np.array_equal(self.classes[indices], labels):
+            unknown = np.setdiff1d(labels, self.classes)
+            raise ValueError(f"Labels {unknown.tolist()} are not among the model classes {self.classes.tolist()}")
+        return indices
+
+    def update(self, labels, proba: Optional[np.ndarray] = None, predictions=None):
+        """Add a chunk from class probabilities (predictions are their argmax) or from predictions alone"""
+        label_idx = self._class_indices(labels)
+        if proba is not None:
+            pred_idx = proba.argmax(axis=1)
+            # Clip and renormalize like sklearn.metrics.log_loss
+            eps = np.finfo(proba.dtype).eps
+            clipped = np.clip(proba, eps, 1 - eps)
+            true_proba = clipped[np.arange(len(label_idx)), label_idx] / clipped.sum(axis=1)
+            self.log_loss_sum -= float(np.log(true_proba).sum())
+        else:
+            pred_idx = self._class_indices(predictions)
+            self.has_proba = False
+
+        n_classes = len(self.classes)
+        self.confusion += np.bincount(
+            label_idx * n_classes + pred_idx, minlength=n_classes * n_classes
+        ).reshape(n_classes, n_classes)
+
+    def compute(self) -> dict:
+        """Metrics over every row seen so far"""
+        total = self.confusion.sum()
+        true_positives = np.diag(self.confusion).astype(np.float64)
+        support, predicted = self.confusion.sum(axis=1), self.confusion.sum(axis=0)
+        # Like sklearn, macro averages cover the classes present in the labels or predictions
+        present = (support + predicted) > 0
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            precision = np.where(predicted > 0, true_positives / predicted, 0.0)[present]
+            recall = np.where(support > 0, true_positives / support, 0.0)[present]
+            f1 = np.where(
+                (support + predicted) > 0, 2 * true_positives / (support + predicted), 0.0
+            )[present]
+        micro = float(true_positives.sum() / total) if total else 0.0
+
+        return {
+            "f1_macro": float(f1.mean()) if f1.size else 0.0,
+            "accuracy": micro,
+            "precision_macro": float(precision.mean()) if precision.size else 0.0,
+            "recall_macro": float(recall.mean()) if recall.size else 0.0,
+            "f1_micro": micro,
+            "precision_micro": micro,
+            "recall_micro": micro,
+            "log_loss": self.log_loss_sum / total if (self.has_proba and total) else None
+        }
+
+
+def score_model(model, chunks: Iterable[Tuple[np.ndarray, np.ndarray]]) -> dict:
+    """Compute metrics for a loaded model over (features, labels) chunks.
+    The forest runs once per chunk: predictions are derived from predict_proba."""
+    accumulator = MetricsAccumulator(model.classes_)
+    has_proba = hasattr(model, "predict_proba")
+    for features, labels in chunks:
+        if has_proba:
+            accumulator.update(labels, proba=model.predict_proba(features))
+        else:
+            accumulator.update(labels, predictions=model.predict(features))
+    return accumulator.compute()
+
+
+def iter_array_chunks(test_features, test_labels, chunk_size=EVALUATION_CHUNK_SIZE):
+    """Slice features and labels into aligned chunks, as views without copying"""
+    for start in range(0, len(test_labels), chunk_size):
+        yield test_features[start:start + chunk_size], test_labels[start:start + chunk_size]
+
+
+def evaluate_model(model_path: str, test_features, test_labels, chunk_size=EVALUATION_CHUNK_SIZE) -> Tuple[dict, dict]:
+    """Load model and compute metrics on test set."""
+    model = joblib.load(model_path)
+    metrics = score_model(model, iter_array_chunks(test_features, test_labels, chunk_size))
     rounded_metrics = {k: round(v, 2) if v is not None else None for k, v in metrics.items()}
     return metrics, json.dumps(rounded_metrics, indent=4)
 
@@ -61,7 +144,136 @@ def assess_model_update(
     logger.info(f"\nCandidate model {candidate_model_file} metrics:\n{ candidate_metrics_rounded }\n")
 
     # Assessing if we should replace the served model
-    update_model = True if ALWAYS_UPDATE_MODEL else (
-        candidate_metrics[PRIMARY_METRIC] > current_metrics[PRIMARY_METRIC] + DELTA_THRESHOLD
-    )
+    update_model = True if ALWAYS_UPDATE_MODEL else is_improvement(candidate_metrics, current_metrics)
     return update_model
+
+
+def test_set_sha256(test_features, test_labels) -> str:
+    """Hash the test set's values, shapes and dtypes so metrics are only reused for the same data"""
+    digest = hashlib.sha256()
+    for array in (test_features, test_labels):
+        digest.update(f"{array.dtype.str}{array.shape}".encode())
+        # Hashed in chunks, so a memory-mapped test set is never copied whole
+        for start in range(0, len(array), EVALUATION_CHUNK_SIZE):
+            digest.update(np.ascontiguousarray(array[start:start + EVALUATION_CHUNK_SIZE]).tobytes())
+    return digest.hexdigest()
+
+
+def load_metrics_cache(cache_path: Optional[str]) -> dict:
+    """Read cached metrics keyed by "<model sha256>:<test set sha256>", empty if missing or unreadable"""
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable metrics cache {cache_path}: {e}")
+        return {}
+
+
+def save_metrics_cache(cache_path: Optional[str], cache: dict):
+    """Write the metrics cache atomically, so a crash never leaves it half written"""
+    if not cache_path:
+        return
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+
+
+# Test set held by each tournament worker process, sent once rather than with every model
+_worker_test_set = None
+
+
+def _portable_array(array):
+    """A memory-mapped .npy file is sent to workers by path, since pickling it would copy the data"""
+    filename = getattr(array, "filename", None)
+    if isinstance(array, np.memmap) and filename:
+        mapped = np.load(filename, mmap_mode="r")
+        if (mapped.shape == array.shape) and (mapped.offset == array.offset):
+            return filename
+    return array
+
+
+def _init_tournament_worker(test_features, test_labels):
+    global _worker_test_set
+    _worker_test_set = tuple(
+        np.load(array, mmap_mode="r") if isinstance(array, str) else array
+        for array in (test_features, test_labels)
+    )
+
+
+def _score_model(model_path: str) -> dict:
+    metrics, _ = evaluate_model(model_path, *_worker_test_set)
+    return {k: float(v) if v is not None else None for k, v in metrics.items()}
+
+
+def is_improvement(candidate_metrics: dict, current_metrics: dict) -> bool:
+    """Apply the update rule: the candidate must beat the current model by DELTA_THRESHOLD"""
+    candidate, current = candidate_metrics[PRIMARY_METRIC], current_metrics[PRIMARY_METRIC]
+    if PRIMARY_METRIC in LOWER_IS_BETTER:
+        return candidate < current - DELTA_THRESHOLD
+    return candidate > current + DELTA_THRESHOLD
+
+
+def run_model_tournament(
+        models_dir,
+        current_model_file,
+        test_features,
+        test_labels,
+        max_workers: int = TOURNAMENT_WORKERS,
+        cache_path: Optional[str] = None
+    ) -> Tuple[Optional[str], dict]:
+    """
+    Score every model in models_dir and pick the best candidate to replace the current model.
+    - Models are scored in parallel across a process pool, so wall-clock time scales
+      with the number of cores rather than the number of candidates
+    - Metrics are cached by model file hash and test set hash in cache_path (if given),
+      so unchanged models, including the current one, are not re-scored on later runs
+    Returns the winning candidate file (None if no candidate qualifies under the
+    PRIMARY_METRIC/DELTA_THRESHOLD rule) and the metrics of every model by file name.
+    """
+    model_files = list_model_files(models_dir)
+    data_hash = test_set_sha256(test_features, test_labels)
+    cache_keys = {
+        file: f"{file_sha256(os.path.join(models_dir, file))}:{data_hash}" for file in model_files
+    }
+    cache = load_metrics_cache(cache_path)
+    to_score = [file for file in model_files if cache_keys[file] not in cache]
+    logger.info(f"\nTournament: {len(model_files)} models, {len(model_files) - len(to_score)} cached, {len(to_score)} to score")
+
+    if to_score:
+        paths = [os.path.join(models_dir, file) for file in to_score]
+        workers = min(max_workers, len(to_score))
+        if workers > 1:
+            # Spawned, not forked: the scheduler calls this from a thread of a running event loop,
+            # and a forked worker could inherit a lock another thread was holding
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_tournament_worker,
+                initargs=(_portable_array(test_features), _portable_array(test_labels))
+            ) as pool:
+                scores = list(pool.map(_score_model, paths))
+        else:
+            _init_tournament_worker(test_features, test_labels)
+            scores = [_score_model(path) for path in paths]
+        for file, metrics in zip(to_score, scores):
+            cache[cache_keys[file]] = metrics
+        save_metrics_cache(cache_path, cache)
+
+    leaderboard = {file: cache[cache_keys[file]] for file in model_files}
+    for file, metrics in leaderboard.items():
+        rounded_metrics = {k: round(v, 2) if v is not None else None for k, v in metrics.items()}
+        logger.info(f"\nModel {file} metrics:\n{json.dumps(rounded_metrics, indent=4)}\n")
+
+    candidates = [file for file in model_files if file != current_model_file]
+    if not candidates:
+        return None, leaderboard
+    reverse = PRIMARY_METRIC not in LOWER_IS_BETTER
+    best_file = sorted(candidates, key=lambda file: leaderboard[file][PRIMARY_METRIC], reverse=reverse)[0]
+
+    current_metrics = leaderboard.get(current_model_file)
+    if ALWAYS_UPDATE_MODEL or current_metrics is None or is_improvement(leaderboard[best_file], current_metrics):
+        return best_file, leaderboard
+    return None, leaderboard
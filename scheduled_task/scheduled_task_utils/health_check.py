@@ -1,4 +1,4 @@
-import time
+import asyncio
 import httpx
 import logging
 
@@ -6,10 +6,11 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(me
 logger = logging.getLogger(__name__)
 
 
-def ping_api_health(url, retries=3, delay=2) -> bool:
+async def ping_api_health(client: httpx.AsyncClient, url, retries=3, delay=2) -> bool:
     """
     Ping the API health route with retries.
     Parameters:
+        - client: shared, pooled AsyncClient
         - url: health check URL
         - retries: number of attempts
         - delay: seconds to wait between retries
@@ -18,17 +19,16 @@ def ping_api_health(url, retries=3, delay=2) -> bool:
     """
     for attempt in range(1, retries + 1):
         try:
-            with httpx.Client(timeout=5) as client:
-                resp = client.get(url)
-                if resp.status_code == 200:
-                    return True
-                else:
-                    logger.info(f"Attempt {attempt}: Health check returned {resp.status_code}")
+            resp = await client.get(url)
+            if resp.status_code == 200:
+                return True
+            else:
+                logger.info(f"Attempt {attempt}: Health check returned {resp.status_code}")
         except Exception as e:
             logger.info(f"Attempt {attempt}: Health check error: {e}")
         
         if attempt < retries:
-            time.sleep(delay)  # wait before next try
+            await asyncio.sleep(delay)  # wait before next try
     return False
 
 
@@ -0,0 +1,87 @@
+import logging
+import os
+from collections.abc import Sequence
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+from api.schema_config import FEATURE_NAMES
+
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+logger = logging.getLogger(__name__)
+
+DATASET_CHUNK_SIZE = 100_000  # Rows handled at a time by checks and evaluation
+
+
+class PayloadSequence(Sequence):
+    """Read-only view of feature rows as /predict payloads, each built when it is accessed"""
+
+    def __init__(self, features: np.ndarray, feature_names=FEATURE_NAMES):
+        self.features = features
+        self.feature_names = list(feature_names)
+
+    def __len__(self) -> int:
+        return len(self.features)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return PayloadSequence(self.features[idx], self.feature_names)
+        return dict(zip(self.feature_names, self.features[idx].tolist()))
+
+
+class HoldoutDataset:
+    """
+    Test features and labels memory-mapped from .npy files, so only the pages
+    being read are resident, however large the holdout set grows.
+    Consumers iterate it in chunks; reload_if_changed picks up new files
+    between runs without restarting the scheduler.
+    """
+
+    def __init__(
+            self,
+            data_path: str,
+            features_file: str = "X_test.npy",
+            labels_file: str = "y_test.npy",
+            feature_names=FEATURE_NAMES,
+            chunk_size: int = DATASET_CHUNK_SIZE
+        ):
+        self.features_path = os.path.join(data_path, features_file)
+        self.labels_path = os.path.join(data_path, labels_file)
+        self.feature_names = list(feature_names)
+        self.chunk_size = chunk_size
+        self.load()
+
+    def _signature(self) -> Tuple:
+        return tuple(
+            (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            for stat in (os.stat(self.features_path), os.stat(self.labels_path))
+        )
+
+    def load(self):
+        """Map both files; arrays already handed out keep reading the files they were mapped from"""
+        self.signature = self._signature()
+        self.features = np.load(self.features_path, mmap_mode="r")
+        self.labels = np.load(self.labels_path, mmap_mode="r")
+
+    def reload_if_changed(self) -> bool:
+        """Remap the files if either was replaced or modified since the last load"""
+        if self._signature() == self.signature:
+            return False
+        self.load()
+        logger.info(f"Reloaded holdout dataset: {len(self)} rows from {self.features_path}")
+        return True
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def iter_chunks(self, chunk_size: Optional[int] = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield aligned (features, labels) chunks as views into the mapped files"""
+        chunk_size = chunk_size or self.chunk_size
+        features, labels = self.features, self.labels
+        for start in range(0, len(labels), chunk_size):
+            yield features[start:start + chunk_size], labels[start:start + chunk_size]
+
+    def payloads(self, limit: Optional[int] = None) -> PayloadSequence:
+        """Lazy /predict payloads for the first `limit` rows (all rows if None)"""
+        return PayloadSequence(self.features[:limit], self.feature_names)
@@ -0,0 +1,90 @@
+import logging
+import os
+from typing import Optional
+
+import httpx
+
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+logger = logging.getLogger(__name__)
+
+# Pool limits and timeouts of the client shared by every scheduler call to the API
+API_MAX_CONNECTIONS = int(os.getenv("API_MAX_CONNECTIONS", "16"))
+API_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("API_MAX_KEEPALIVE_CONNECTIONS", "16"))
+API_KEEPALIVE_EXPIRY_SEC = float(os.getenv("API_KEEPALIVE_EXPIRY_SEC", "60"))
+API_CONNECT_TIMEOUT_SEC = float(os.getenv("API_CONNECT_TIMEOUT_SEC", "2"))
+API_TIMEOUT_SEC = float(os.getenv("API_TIMEOUT_SEC", "5"))
+# HTTP/2 needs the optional h2 package and an API served over TLS (or with prior knowledge)
+API_HTTP2 = os.getenv("API_HTTP2", "0") == "1"
+
+
+class ConnectionStats:
+    """
+    Counts requests and newly opened connections of a client, from the
+    httpcore trace extension, to confirm that connections are being reused.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+
+    async def on_request(self, request: httpx.Request):
+        self.requests += 1
+        request.extensions["trace"] = self.trace
+
+    async def trace(self, event_name: str, info: dict):
+        if event_name.endswith(("connect_tcp.started", "connect_unix_socket.started")):
+            self.new_connections += 1
+
+    @property
+    def reuse_rate(self) -> float:
+        """Fraction of requests sent on an already open connection"""
+        if self.requests == 0:
+            return 0.0
+        return max(self.requests - self.new_connections, 0) / self.requests
+
+    def log(self, context: str = "API client"):
+        logger.info(
+            f"{context}: {self.requests} requests over {self.new_connections} new connections, "
+            f"connection reuse rate {self.reuse_rate:.1%}"
+        )
+
+
+def create_api_client(
+        stats: Optional[ConnectionStats] = None,
+        max_connections: int = API_MAX_CONNECTIONS,
+        max_keepalive_connections: int = API_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = API_KEEPALIVE_EXPIRY_SEC,
+        connect_timeout: float = API_CONNECT_TIMEOUT_SEC,
+        timeout: float = API_TIMEOUT_SEC,
+        http2: bool = API_HTTP2,
+        **kwargs
+    ) -> httpx.AsyncClient:
+    """
+    Create the long-lived, pooled client the scheduler shares across jobs.
+    - stats: if given, records requests and new connections of the client
+    - http2: falls back to HTTP/1.1 keep-alive if the h2 package is not installed
+    Other keyword arguments (e.g. transport, base_url) are passed to httpx.AsyncClient.
+    """
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP/2 requested but the h2 package is not installed, using HTTP/1.1")
+            http2 = False
+
+    event_hooks = kwargs.pop("event_hooks", {"request": [], "response": []})
+    if stats is not None:
+        event_hooks.setdefault("request", []).append(stats.on_request)
+
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        ),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        http2=http2,
+        event_hooks=event_hooks,
+        **kwargs
+    )
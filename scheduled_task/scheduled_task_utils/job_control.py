@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+from watchfiles import Change, awatch
+
+from .model_update_utils import MODEL_FILE_SUFFIX
+
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+logger = logging.getLogger(__name__)
+
+
+async def run_stage(name: str, awaitable: Awaitable, budget_sec: float):
+    """
+    Await one pipeline stage within its time budget.
+    Returns the stage's result, or None if it ran out of time or failed, so one
+    slow or broken stage cannot hold up or crash the rest of the run.
+    Work handed to a thread keeps running after a timeout, but is no longer waited on.
+    """
+    start = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(awaitable, budget_sec)
+    except asyncio.TimeoutError:
+        logger.warning(f"Stage {name} exceeded its {budget_sec:g} s budget, skipped")
+        return None
+    except Exception as e:
+        logger.warning(f"Stage {name} failed: {e}")
+        return None
+    logger.info(f"Stage {name} finished in {time.perf_counter() - start:.2f} s")
+    return result
+
+
+class JobTrigger:
+    """
+    Runs a scheduler job on demand as well as on its interval.
+    Events that arrive while the job is running are coalesced into a single
+    follow-up run once it finishes, rather than skipped by max_instances=1.
+    The interval restarts from each triggered run.
+    """
+
+    def __init__(self, scheduler, job_id: str):
+        self.scheduler = scheduler
+        self.job_id = job_id
+        self.running = False
+        self.pending_reason = None
+
+    def wrap(self, func: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+        """The job function to schedule, tracking whether a run is in progress"""
+        async def run(*args, **kwargs):
+            # Events before this run are covered by it
+            self.running, self.pending_reason = True, None
+            try:
+                await func(*args, **kwargs)
+                # Follow-up runs happen in this job instance, which the scheduler still counts as running
+                while self.pending_reason is not None:
+                    reason, self.pending_reason = self.pending_reason, None
+                    logger.info(f"Running {self.job_id} again: {reason} during the previous run")
+                    await func(*args, **kwargs)
+            finally:
+                self.running = False
+        run.__name__ = getattr(func, "__name__", "job")
+        return run
+
+    def fire(self, reason: str):
+        """Run the job as soon as possible, or once more after the run in progress"""
+        if self.running:
+            self.pending_reason = self.pending_reason or reason
+            return
+        job = self.scheduler.get_job(self.job_id)
+        if job is None:
+            return
+        logger.info(f"Triggering {self.job_id}: {reason}")
+        job.modify(next_run_time=datetime.now(job.trigger.timezone))
+
+
+def is_model_file(change: Change, path: str) -> bool:
+    """Completed model files only: partial writes use other names and deletions need no run"""
+    return (change != Change.deleted) and path.endswith(MODEL_FILE_SUFFIX)
+
+
+async def watch_models_dir(
+        models_dir: str,
+        on_new_models: Callable[[list], None],
+        debounce_ms: int = 1600,
+        stop_event: Optional[asyncio.Event] = None
+    ):
+    """Call on_new_models with the model files added or replaced in models_dir, batched per debounce window"""
+    os.makedirs(models_dir, exist_ok=True)
+    async for changes in awatch(models_dir, watch_filter=is_model_file, debounce=debounce_ms, stop_event=stop_event):
+        on_new_models(sorted({os.path.basename(path) for _, path in changes}))
+
+
+class DriftAlarm:
+    """Polls the API's drift verdict and raises an alarm when it turns to drifted, not on every poll while it stays so"""
+
+    def __init__(self, check: Callable[[], Awaitable[Optional[bool]]], on_alarm: Callable[[str], None]):
+        self.check = check
+        self.on_alarm = on_alarm
+        self.drifted = False
+
+    async def poll(self):
+        drift_detected = await self.check()
+        if drift_detected is None:
+            return
+        if drift_detected and not self.drifted:
+            self.on_alarm("production drift alarm")
+        self.drifted = drift_detected
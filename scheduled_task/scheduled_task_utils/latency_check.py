@@ -1,56 +1,78 @@
-import time
-import httpx
 import logging
-from typing import Tuple
+from typing import Tuple, Union
+
+import httpx
 
 import numpy as np
 
+from scheduled_task_utils.load_generator import run_load_test
+
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
 
+# Load level used to replay the test set against the API
+LOAD_TEST_CONCURRENCY = 8
+LOAD_TEST_TARGET_RPS = None  # e.g. 200 for an open-loop test at a fixed request rate
+LOAD_TEST_DURATION_SEC = None  # Replay the test set until this elapses, None sends it once
 
-def sample_predict_requests(test_set, api_url) -> Tuple[list, list]:
-    """Sends prediction requests for an entire test dataset 
-    to gather a sample of predictions and latencies."""
-    predictions, latencies = [], []
-
-    with httpx.Client(timeout=5) as client:
-        for payload in test_set:
-            start_time = time.time()
-            response = client.post(f"{api_url}/predict", json=payload)
-            end_time = time.time()
 
-            latency = end_time - start_time
-            prediction = response.json()["species"]
-            latencies.append(latency)
-            predictions.append(prediction)
+async def sample_predict_requests(client: httpx.AsyncClient, test_set, api_url) -> Tuple[list, dict]:
+    """Sends prediction requests for an entire test dataset concurrently over the
+    shared client to gather a sample of predictions and a latency report under load."""
+    report = await run_load_test(
+        api_url,
+        test_set,
+        concurrency=LOAD_TEST_CONCURRENCY,
+        target_rps=LOAD_TEST_TARGET_RPS,
+        duration_sec=LOAD_TEST_DURATION_SEC,
+        client=client
+    )
+    logger.info(
+        f"\nLoad test: {report['requests']} requests at concurrency {report['concurrency']}, "
+        f"{report['throughputRps']:.1f} req/s, error rate {report['errorRate']:.2%}"
+    )
+    return report["predictions"], report
 
-            if response.status_code != 200:
-                logger.warning(f"Prediction failed for sample {payload}: {response.status_code}, {response.text}")
 
-    latencies = [lat * 1000 for lat in latencies] # Convert to milliseconds
-
-    return predictions, latencies
-
-
-def measure_prediction_latency(latencies, max_p50=50, max_p95=100) -> bool:
+def measure_prediction_latency(
+        latencies: Union[list, dict],
+        max_p50=50,
+        max_p95=100,
+        max_p99=None,
+        max_error_rate=None
+    ) -> bool:
     """
-    Send each sample individually to the /predict endpoint and measure latency.
+    Check latency of /predict requests against thresholds.
     Return True if latency is acceptable, False otherwise.
+    - latencies: per-request latencies in milliseconds, or a report from run_load_test
+      to gate on latency (and error rate) at the load level it was measured under
     - max_p50: maximum median latency in milliseconds
     - max_p95: maximum 95th percentile latency in milliseconds
+    - max_p99: optional maximum 99th percentile latency in milliseconds
+    - max_error_rate: optional maximum fraction of failed requests (reports only)
     """
-    median_latency = np.median(latencies)
-    p95_latency = np.percentile(latencies, 95)
+    if isinstance(latencies, dict):
+        median_latency, p95_latency, p99_latency = latencies["p50Ms"], latencies["p95Ms"], latencies["p99Ms"]
+        error_rate = latencies["errorRate"]
+    else:
+        median_latency, p95_latency, p99_latency = np.percentile(latencies, [50, 95, 99])
+        error_rate = None
 
     logger.info(f"\nMedian (P50) latency: {median_latency:.4f} ms")
-    logger.info(f"P95 latency: {p95_latency:.4f} ms\n")
+    logger.info(f"P95 latency: {p95_latency:.4f} ms")
+    logger.info(f"P99 latency: {p99_latency:.4f} ms\n")
 
     if median_latency > max_p50:
-        logger.warning(f"Median (P50) latency too high: {median_latency:.4f}s (threshold {max_p50} ms)")
+        logger.warning(f"Median (P50) latency too high: {median_latency:.4f} ms (threshold {max_p50} ms)")
         return False
     if p95_latency > max_p95:
-        logger.warning(f"P95 latency too high: {p95_latency:.4f}s (threshold {max_p95} ms)")
+        logger.warning(f"P95 latency too high: {p95_latency:.4f} ms (threshold {max_p95} ms)")
+        return False
+    if max_p99 is not None and p99_latency > max_p99:
+        logger.warning(f"P99 latency too high: {p99_latency:.4f} ms (threshold {max_p99} ms)")
+        return False
+    if max_error_rate is not None and error_rate is not None and error_rate > max_error_rate:
+        logger.warning(f"Error rate too high: {error_rate:.2%} (threshold {max_error_rate:.2%})")
         return False
-    return True
\ No newline at end of file
+    return True
@@ -0,0 +1,139 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections.abc import Sequence
+from typing import Iterable, Optional
+
+import httpx
+import numpy as np
+
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+logger = logging.getLogger(__name__)
+
+
+class LatencyHistogram:
+    """
+    Fixed, preallocated histogram of latencies in nanoseconds.
+    Buckets are log-spaced from 1 microsecond to 60 seconds, so percentiles
+    are exact to within about 1% without keeping every sample.
+    """
+
+    def __init__(self, min_ns: float = 1e3, max_ns: float = 60e9, n_buckets: int = 2000):
+        self.bounds = np.geomspace(min_ns, max_ns, n_buckets)
+        self.counts = np.zeros(n_buckets + 1, dtype=np.int64)
+        self.count = 0
+        self.max_ns = 0
+
+    def record(self, latency_ns: int):
+        self.counts[np.searchsorted(self.bounds, latency_ns)] += 1
+        self.count += 1
+        self.max_ns = max(self.max_ns, latency_ns)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile, in nanoseconds."""
+        if self.count == 0:
+            return float("nan")
+        rank = int(np.ceil(q / 100 * self.count))
+        idx = int(np.searchsorted(np.cumsum(self.counts), max(rank, 1)))
+        return float(min(self.bounds[idx], self.max_ns)) if idx < len(self.bounds) else float(self.max_ns)
+
+
+async def run_load_test(
+        api_url: str,
+        payloads: Iterable[dict],
+        concurrency: int = 8,
+        target_rps: Optional[float] = None,
+        duration_sec: Optional[float] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        timeout: float = 5
+    ) -> dict:
+    """
+    Send prediction requests concurrently and summarize their latency.
+    - concurrency: maximum requests in flight
+    - target_rps: if set, requests are started on a fixed schedule (open loop) and
+      latency is measured from the scheduled start, so queueing delay is included;
+      otherwise each worker sends its next request as soon as the last one returns
+    - duration_sec: if set, payloads are replayed until the duration elapses,
+      otherwise every payload is sent once
+    - payloads: a Sequence is read by index, so its payloads can be built lazily
+    - client: shared AsyncClient to use, one is created if not given
+    Returns a report with P50/P95/P99/max latency in ms, throughput, error rate
+    and the prediction for each payload index (None where the request failed).
+    """
+    if not isinstance(payloads, Sequence):
+        payloads = list(payloads)
+    histogram = LatencyHistogram()
+    predictions = [None] * len(payloads)
+    errors = 0
+
+    start = time.perf_counter_ns()
+    deadline = start + int(duration_sec * 1e9) if duration_sec else None
+    n_payloads = len(payloads)
+    indices = (i % n_payloads for i in itertools.count()) if (duration_sec and n_payloads) else range(n_payloads)
+    schedule = ((idx, payloads[idx]) for idx in indices)
+    slots = asyncio.Semaphore(concurrency)
+    own_client = client is None
+    client = client or httpx.AsyncClient(timeout=timeout)
+
+    async def send(idx, payload, scheduled_ns):
+        nonlocal errors
+        try:
+            response = await client.post(f"{api_url}/predict", json=payload)
+            if response.status_code == 200:
+                predictions[idx] = response.json()["species"]
+            else:
+                errors += 1
+                logger.warning(f"Prediction failed for sample {payload}: {response.status_code}, {response.text}")
+        except httpx.HTTPError as e:
+            errors += 1
+            logger.warning(f"Prediction request error for sample {payload}: {e}")
+        histogram.record(time.perf_counter_ns() - scheduled_ns)
+
+    async def closed_loop_worker():
+        for idx, payload in schedule:
+            if deadline and time.perf_counter_ns() >= deadline:
+                return
+            await send(idx, payload, time.perf_counter_ns())
+
+    async def open_loop():
+        tasks = set()
+        for sent, (idx, payload) in enumerate(schedule):
+            scheduled_ns = start + int(sent * 1e9 / target_rps)
+            if deadline and scheduled_ns >= deadline:
+                break
+            await asyncio.sleep(max(scheduled_ns - time.perf_counter_ns(), 0) / 1e9)
+
+            async def send_in_slot(idx=idx, payload=payload, scheduled_ns=scheduled_ns):
+                async with slots:
+                    await send(idx, payload, scheduled_ns)
+            task = asyncio.create_task(send_in_slot())
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+
+    try:
+        if target_rps:
+            await open_loop()
+        else:
+            await asyncio.gather(*(closed_loop_worker() for _ in range(concurrency)))
+    finally:
+        if own_client:
+            await client.aclose()
+
+    elapsed_sec = (time.perf_counter_ns() - start) / 1e9
+    return {
+        "requests": histogram.count,
+        "errors": errors,
+        "errorRate": errors / histogram.count if histogram.count else 0.0,
+        "durationSec": elapsed_sec,
+        "throughputRps": histogram.count / elapsed_sec if elapsed_sec else 0.0,
+        "concurrency": concurrency,
+        "targetRps": target_rps,
+        "p50Ms": histogram.percentile(50) / 1e6,
+        "p95Ms": histogram.percentile(95) / 1e6,
+        "p99Ms": histogram.percentile(99) / 1e6,
+        "maxMs": histogram.max_ns / 1e6,
+        "predictions": predictions
+    }
@@ -1,7 +1,13 @@
+import asyncio
 import base64
+import hashlib
 import joblib
+import os
 import pickle
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Bytes read at a time when hashing or streaming a model file
+MODEL_FILE_SUFFIX = ".joblib"  # Partial writes and other files in the models directory use other names
+
 def encode_model_file_to_b64(models_dir, model_file, tmp_path=None, is_pickle=False):
     """Encodes model file to a transportable format"""
     # Load an existing trained model
@@ -24,9 +30,39 @@ def encode_model_file_to_b64(models_dir, model_file, tmp_path=None, is_pickle=Fa
     return base64.b64encode(model_bytes).decode("utf-8")
 
 
-def get_current_model(client, api_url):
+def list_model_files(models_dir):
+    """Model files in models_dir, sorted, skipping temporary and unrelated files"""
+    return sorted(
+        file for file in os.listdir(models_dir) if file.endswith(MODEL_FILE_SUFFIX) and not file.startswith(".")
+    )
+
+
+def file_sha256(file_path, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Hash a model file without reading it into memory at once"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_file_chunks(file_path, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Stream a model file in fixed-size chunks for upload"""
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            yield chunk
+
+
+async def aiter_file_chunks(file_path, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Stream a model file in fixed-size chunks for upload from an AsyncClient, reading them in a thread"""
+    with open(file_path, "rb") as f:
+        while chunk := await asyncio.to_thread(f.read, chunk_size):
+            yield chunk
+
+
+async def get_current_model(client, api_url):
     """Send a GET request to API to learn what model it's currently using"""
-    current_model_resp = client.get(f"{api_url}/current_model").json()
+    current_model_resp = (await client.get(f"{api_url}/current_model")).json()
     current_model_file, current_model_version = (
         current_model_resp.get("currentModelName"),
         current_model_resp.get("currentModelVersion")
@@ -34,19 +70,27 @@ def get_current_model(client, api_url):
     return current_model_file, current_model_version
 
 
-def update_model_served(client, api_url, models_dir, model_file):
+async def update_model_served(client, api_url, models_dir, model_file):
     """Request a change to the model being served by the API"""
-    # Model is encoded into Base64, for transport purposes as JSON plain text
-    model_b64 = encode_model_file_to_b64(models_dir, model_file)
-
-    # Requesting a model update to the API
-    response = client.post(
-        f"{api_url}/update_model", 
-        json={
-            "modelFilename": model_file, 
-            "modelObject": model_b64
-        }
-    )
+    # The raw joblib file is streamed with its checksum, rather than base64 in JSON
+    file_path = f"{models_dir}/{model_file}"
+    # Hashing reads the whole file, which would block the scheduler's event loop
+    checksum = await asyncio.to_thread(file_sha256, file_path)
+
+    # The API stores models by content hash: one it already has is promoted without uploading it
+    response = None
+    if (await client.get(f"{api_url}/artifacts/{checksum}")).status_code == 200:
+        response = await client.post(
+            f"{api_url}/promote_model", params={"modelFilename": model_file, "sha256": checksum}
+        )
+    # Requesting a model update to the API, also if the artifact was collected in the meantime
+    if response is None or response.status_code == 404:
+        response = await client.post(
+            f"{api_url}/upload_model",
+            params={"modelFilename": model_file},
+            content=aiter_file_chunks(file_path),
+            headers={"Content-Type": "application/octet-stream", "X-Content-SHA256": checksum}
+        )
     update_model_resp = response.json()
     updated_model_name, updated_model_version = (
         update_model_resp.get("updatedModelName"),
@@ -1,38 +1,81 @@
+import asyncio
 import logging
+import os
 
 from scheduled_task_utils.health_check import ping_api_health
 from scheduled_task_utils.data_quality_check import check_test_set
 from scheduled_task_utils.latency_check import sample_predict_requests, measure_prediction_latency
-from scheduled_task_utils.drift_check import monitor_label_drift
+from scheduled_task_utils.drift_check import check_production_drift, monitor_label_drift
+from scheduled_task_utils.job_control import run_stage
 
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
 
+LATENCY_SAMPLE_ROWS = 10_000  # Rows of the holdout set replayed against the API
+# Profile of the last run's test set, kept outside /app/scheduled_task which watchfiles watches
+DATA_PROFILE_PATH = os.getenv("DATA_PROFILE_PATH", "/tmp/holdout_profile.json")
+# Seconds each stage may take before the run moves on without it
+STAGE_BUDGETS_SEC = {
+    "health": float(os.getenv("STAGE_BUDGET_HEALTH_SEC", "15")),
+    "dataQuality": float(os.getenv("STAGE_BUDGET_DATA_QUALITY_SEC", "60")),
+    "latency": float(os.getenv("STAGE_BUDGET_LATENCY_SEC", "120")),
+    "productionDrift": float(os.getenv("STAGE_BUDGET_DRIFT_SEC", "10"))
+}
 
-def perform_routine_checks(api_url, test_features, test_labels, test_set):
-    """Basic checks for dataset quality, API performance and model drift"""
+
+async def perform_routine_checks(client, api_url, dataset):
+    """Basic checks for dataset quality, API performance and model drift,
+    streaming through the memory-mapped holdout dataset in chunks.
+    After the health check, data quality, the latency replay and the production
+    drift query are independent, so they run concurrently, each within its budget."""
     # Ping health check with retries
-    if not ping_api_health(f"{api_url}/", retries=3, delay=2):
+    if not await run_stage("health", ping_api_health(client, f"{api_url}/", retries=3, delay=2), STAGE_BUDGETS_SEC["health"]):
         logger.warning("API health check failed after retries. Skipping this job run.")
         return
 
-    # Run data quality checks on test set
-    test_set_valid = check_test_set(test_features, test_labels)
-    if not test_set_valid:
-        logger.warning("Test set issues detected. Skipping model evaluation.")
-        return
-  
-    predictions, latencies = sample_predict_requests(test_set=test_set, api_url=api_url)
-
-    # Test predict requests for P50 and P95 latency
-    passing_latency_check = measure_prediction_latency(latencies)
-    if not passing_latency_check:
-      logger.warning("Latency is too high. Skipping model evaluation.")
-      return
-    
-    # Check current model for label drift
-    label_drift_detected = monitor_label_drift(test_labels=test_labels, predictions=predictions, alpha=0.05)
-    if label_drift_detected:
-        logger.warning("Label drift detected - consider monitoring before updating model.")
+    test_set = dataset.payloads(limit=LATENCY_SAMPLE_ROWS)
+    test_labels = dataset.labels[:len(test_set)]
+    # Run data quality checks on test set, off the event loop while requests are in flight
+    data_quality = asyncio.create_task(run_stage("dataQuality", asyncio.to_thread(
+        check_test_set, dataset.features, dataset.labels, chunk_size=dataset.chunk_size, profile_path=DATA_PROFILE_PATH
+    ), STAGE_BUDGETS_SEC["dataQuality"]))
+    latency = asyncio.create_task(run_stage(
+        "latency", sample_predict_requests(client, test_set=test_set, api_url=api_url), STAGE_BUDGETS_SEC["latency"]
+    ))
+    # Check production traffic seen by the API against its reference profile
+    production_drift = asyncio.create_task(run_stage(
+        "productionDrift", check_production_drift(client, api_url), STAGE_BUDGETS_SEC["productionDrift"]
+    ))
+
+    try:
+        test_set_valid = await data_quality
+        if not test_set_valid:
+            logger.warning("Test set issues detected. Skipping model evaluation.")
+            return
+
+        replay = await latency
+        if replay is None:
+            logger.warning("Latency replay did not complete. Skipping model evaluation.")
+            return
+        predictions, load_report = replay
+
+        # Test predict requests for P50, P95 and P99 latency and errors under load
+        passing_latency_check = measure_prediction_latency(load_report, max_p99=250, max_error_rate=0.01)
+        if not passing_latency_check:
+          logger.warning("Latency is too high. Skipping model evaluation.")
+          return
+
+        # Check current model for label drift
+        predictions = [prediction for prediction in predictions if prediction is not None]
+        label_drift_detected = monitor_label_drift(test_labels=test_labels, predictions=predictions, alpha=0.05)
+        if label_drift_detected:
+            logger.warning("Label drift detected - consider monitoring before updating model.")
 
+        production_drift_detected = await production_drift
+        if production_drift_detected:
+            logger.warning("Production drift detected by the API - see /drift_report.")
+    finally:
+        # Stages whose results are no longer needed stop sending requests
+        for task in (data_quality, latency, production_drift):
+            task.cancel()
@@ -1,14 +1,16 @@
+import asyncio
 import os
 import random
-import httpx
 import logging
 
-import numpy as np
-from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from api.schema_config import FEATURE_NAMES
-from scheduled_task_utils.evaluation_utils import assess_model_update
-from scheduled_task_utils.model_update_utils import get_current_model, update_model_served
+from scheduled_task_utils.drift_check import check_production_drift
+from scheduled_task_utils.evaluation_utils import assess_model_update, run_model_tournament
+from scheduled_task_utils.holdout_dataset import HoldoutDataset
+from scheduled_task_utils.http_client import ConnectionStats, create_api_client
+from scheduled_task_utils.job_control import DriftAlarm, JobTrigger, watch_models_dir
+from scheduled_task_utils.model_update_utils import get_current_model, list_model_files, update_model_served
 from scheduled_task_utils.validation_pipeline import perform_routine_checks
 
 
@@ -17,52 +19,81 @@ API_URL = "http://api:8000"  # Service name "api" from docker-compose
 BASE_DIR = "/app/scheduled_task"
 MODELS_DIR, DATA_PATH = f"{BASE_DIR}/retrained_models", f"{BASE_DIR}/test_dataset"
 
-TEST_FEATURES = np.load(f'{DATA_PATH}/X_test.npy')
-TEST_LABELS = np.load(f'{DATA_PATH}/y_test.npy')
-TEST_SET = [dict(zip(FEATURE_NAMES, row)) for row in TEST_FEATURES]
+# Memory-mapped and read in chunks, reloaded when the files change
+HOLDOUT_DATASET = HoldoutDataset(DATA_PATH)
 
 RETRAINING_SEC_INTERVAL = 10  # Used During Development
 RETRAINING_HOURS_INTERVAL = 24   # Example Re-training Frequency in Production
+# Runs later than this are dropped rather than started late; missed runs are coalesced into one
+RETRAINING_MISFIRE_GRACE_SEC = 30
+
+# Also run re-training as soon as new models land in MODELS_DIR or the API reports drift
+EVENT_TRIGGERS = os.getenv("EVENT_TRIGGERS", "1") == "1"
+DRIFT_POLL_SEC = float(os.getenv("DRIFT_POLL_SEC", "60"))
+
+# Score every retrained model in parallel and promote the best, rather than one random candidate
+TOURNAMENT_MODE = os.getenv("TOURNAMENT_MODE", "1") == "1"
+# Kept outside /app/scheduled_task, whose changes restart the scheduler under watchfiles
+METRICS_CACHE_PATH = os.getenv("METRICS_CACHE_PATH", "/tmp/model_metrics_cache.json")
 
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
 
 
-def scheduled_retraining():
+async def scheduled_retraining(client, connection_stats):
     """
     A simulated re-training task that runs regularly, conducts tests, 
     and deploys a model to replace the model served in the API when needed.
+    All API calls share the service's pooled client, so connections are reused across runs.
     """
     logging.info("Starting scheduled re-training job...")
-    # Checking API health, data quality, P95 & P50 latency, and label drift
-    # Separated into validation_pipeline.py for readability, see file
-    perform_routine_checks(API_URL, TEST_FEATURES, TEST_LABELS, TEST_SET)
-
-    with httpx.Client(timeout=5) as client:
+    HOLDOUT_DATASET.reload_if_changed()
+    test_features, test_labels = HOLDOUT_DATASET.features, HOLDOUT_DATASET.labels
+    try:
+        # Checking API health, data quality, P95 & P50 latency, and label drift
+        # Separated into validation_pipeline.py for readability, see file
+        await perform_routine_checks(client, API_URL, HOLDOUT_DATASET)
 
         # Get current model from API
-        current_model_file, current_model_version = get_current_model(client, API_URL)
+        current_model_file, current_model_version = await get_current_model(client, API_URL)
         logger.info(f"\nCurrent model name: {current_model_file}\nCurrent model version: {current_model_version}\n")
         
-        # Pick a random candidate model
-        candidate_models = [file for file in os.listdir(MODELS_DIR) if file != current_model_file]
-        candidate_model_file = random.choice(candidate_models)
-        logger.info(f"\nCandidate model chosen: {candidate_model_file}")
-
-        # Examine the randomly chosen model's performance
-        update_model = assess_model_update(
-            MODELS_DIR, 
-            current_model_file, 
-            candidate_model_file,
-            TEST_FEATURES, 
-            TEST_LABELS
-        )
+        if TOURNAMENT_MODE:
+            # Score all models (cached ones are skipped) and pick the best candidate
+            candidate_model_file, _ = await asyncio.to_thread(
+                run_model_tournament,
+                MODELS_DIR,
+                current_model_file,
+                test_features,
+                test_labels,
+                cache_path=METRICS_CACHE_PATH
+            )
+            if candidate_model_file is None:
+                logger.info("\nNo candidate surpassed the current model's primary metric. Keeping current model.")
+                return
+            logger.info(f"\nTournament winner: {candidate_model_file}")
+            update_model = True
+        else:
+            # Pick a random candidate model
+            candidate_models = [file for file in list_model_files(MODELS_DIR) if file != current_model_file]
+            candidate_model_file = random.choice(candidate_models)
+            logger.info(f"\nCandidate model chosen: {candidate_model_file}")
+
+            # Examine the randomly chosen model's performance
+            update_model = await asyncio.to_thread(
+                assess_model_update,
+                MODELS_DIR, 
+                current_model_file, 
+                candidate_model_file,
+                test_features, 
+                test_labels
+            )
         # Perform a model update if it qualifies
         if update_model:
             logger.info(f"\nCandidate {candidate_model_file} exceeds primary metric threshold. Updating API.")
             # Sending the request to update the model being served
-            updated_model_name, updated_model_version = update_model_served(
+            updated_model_name, updated_model_version = await update_model_served(
                 client, 
                 API_URL, 
                 MODELS_DIR, 
@@ -72,12 +103,44 @@ def scheduled_retraining():
         else:
             # Keep the model the same, since the metrics were not good enough
             logger.info(f"\nCandidate {candidate_model_file} did not surpass primary metric. Keeping current model.")
+    finally:
+        connection_stats.log("Scheduler API client")
 
 
-if __name__ == "__main__":
-    scheduler = BlockingScheduler()
-    # scheduler.add_job(scheduled_retraining, "interval", hours=RETRAINING_HOURS_INTERVAL)
-    scheduler.add_job(scheduled_retraining, "interval", seconds=RETRAINING_SEC_INTERVAL)
+async def main():
+    """
+    Runs the scheduler on an event loop with one pooled API client for its lifetime.
+    Only one re-training run is ever in progress: overdue runs are coalesced, and
+    events arriving during a run (new model files, a drift alarm) start one more after it.
+    """
+    connection_stats = ConnectionStats()
+    async with create_api_client(stats=connection_stats) as client:
+        scheduler = AsyncIOScheduler(job_defaults={
+            "max_instances": 1, "coalesce": True, "misfire_grace_time": RETRAINING_MISFIRE_GRACE_SEC
+        })
+        retraining_trigger = JobTrigger(scheduler, "scheduled_retraining")
+        job_args = [client, connection_stats]
+        retraining = retraining_trigger.wrap(scheduled_retraining)
+        # scheduler.add_job(retraining, "interval", hours=RETRAINING_HOURS_INTERVAL, id="scheduled_retraining", args=job_args)
+        scheduler.add_job(retraining, "interval", seconds=RETRAINING_SEC_INTERVAL, id="scheduled_retraining", args=job_args)
+
+        watcher = None
+        if EVENT_TRIGGERS:
+            drift_alarm = DriftAlarm(lambda: check_production_drift(client, API_URL), retraining_trigger.fire)
+            scheduler.add_job(drift_alarm.poll, "interval", seconds=DRIFT_POLL_SEC, id="drift_alarm")
+            watcher = asyncio.create_task(watch_models_dir(
+                MODELS_DIR, lambda model_files: retraining_trigger.fire(f"new models {model_files}")
+            ))
+        scheduler.start()
+
+        logging.info("Scheduler started. Waiting for jobs...")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            scheduler.shutdown(wait=False)
+
 
-    logging.info("Scheduler started. Waiting for jobs...")
-    scheduler.start()
+if __name__ == "__main__":
+    asyncio.run(main())